@@ -1,7 +1,7 @@
 import argparse
 import os
 from ragchecker import RAGResults, RAGChecker
-from ragchecker.metrics import all_metrics
+from ragchecker.metrics import all_metrics, METRIC_GROUP_MAP, METRIC_REQUIREMENTS
 
 
 def main():
@@ -41,8 +41,22 @@ def main():
     )
     
     print(f"PROGRESS:30:평가 실행 중...", flush=True)
+    # map the per-batch checking progress to 30~95%
+    check_types = {
+        requirement
+        for metric in METRIC_GROUP_MAP.get(args.metrics, [args.metrics])
+        for requirement in METRIC_REQUIREMENTS[metric]
+    }
+    check_progress = {}
+    def progress_callback(stage, name, done, total):
+        if stage != "check":
+            return
+        check_progress[name] = done / max(total, 1)
+        percent = 30 + int(65 * sum(check_progress.values()) / len(check_types))
+        print(f"PROGRESS:{percent}:{name} 검사 중 ({done}/{total})", flush=True)
+
     # evaluate results with selected metrics or certain groups, e.g., retriever_metrics, generator_metrics, all_metrics
-    evaluator.evaluate(rag_results, args.metrics, args.output_file)
+    evaluator.evaluate(rag_results, args.metrics, args.output_file, progress_callback=progress_callback)
     
     print(f"PROGRESS:100:평가 완료! 결과가 {args.output_file}에 저장되었습니다.", flush=True)
     print(rag_results)
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so that trivially reformatted texts share a cache entry."""
+    return " ".join(text.split())
+
+
+def content_hash(*parts) -> str:
+    """Stable SHA-256 digest of JSON-serializable parts."""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def claim_cache_key(model: str, max_new_tokens: int, question: str, text: str) -> str:
+    return content_hash("claims", model, max_new_tokens, question, normalize_text(text))
+
+
+def verdict_cache_key(
+    model: str, question: str | None, claim, reference: str, merge_psg: bool, joint_check: bool,
+    joint_check_num: int, strategy: str | None = None
+) -> str:
+    """
+    Key of a single (claim, reference) verdict for a question, which is part of the
+    checking prompt. `strategy` names a checking strategy whose verdicts differ from
+    checking the pair on its own, e.g. labels inferred by group testing, so that they
+    are only shared with runs of the same strategy.
+    """
+    parts = [
+        "verdict", model, normalize_text(question or ""), content_hash(claim),
+        content_hash(normalize_text(reference)), merge_psg, joint_check, joint_check_num
+    ]
+    if strategy is not None:
+        parts.append(strategy)
+    return content_hash(*parts)
+
+
+class SQLiteCache:
+    """
+    Persistent key-value store with size-bounded LRU eviction.
+
+    Values are JSON-serialized and kept in a single SQLite table. Every hit
+    refreshes the entry's access time; when the table grows beyond
+    ``max_entries`` the least recently used entries are evicted. The number of
+    entries is kept up to date in the `cache_sizes` table, shared by all processes
+    using the cache, so that writes do not count the table.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache database. Created if missing.
+    table : str
+        Name of the table, one per kind of cached object.
+    max_entries : int, optional
+        Maximum number of entries kept in the table. Default: 1,000,000.
+    """
+    def __init__(self, cache_dir: str, table: str, max_entries: int = 1_000_000):
+        assert table.isidentifier(), f"Invalid cache table name: {table}"
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "ragchecker_cache.sqlite")
+        self.table = table
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_sizes (name TEXT PRIMARY KEY, size INTEGER NOT NULL)"
+            )
+            # counted once, for a table created before its size was kept
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO cache_sizes VALUES (?, (SELECT COUNT(*) FROM {table}))", (table,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT size FROM cache_sizes WHERE name = ?", (self.table,)).fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, object]:
+        """Return the cached values of the given keys, omitting misses."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._conn:
+            # stay well below SQLite's limit on the number of bound variables
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+        return found
+
+    def set_many(self, items: Dict[str, object]):
+        """Insert or overwrite entries, then evict the least recently used ones if needed."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(value, ensure_ascii=False), now) for key, value in items.items()]
+        with self._lock, self._conn:
+            inserted = self._conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (key, value, last_access) VALUES (?, ?, ?)", rows
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET value = ?, last_access = ? WHERE key = ?",
+                    [(value, access, key) for key, value, access in rows]
+                )
+            self._conn.execute("UPDATE cache_sizes SET size = size + ? WHERE name = ?", (inserted, self.table))
+            size = self._conn.execute("SELECT size FROM cache_sizes WHERE name = ?", (self.table,)).fetchone()[0]
+            if size > self.max_entries:
+                evicted = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                    (size - self.max_entries,)
+                ).rowcount
+                self._conn.execute("UPDATE cache_sizes SET size = size - ? WHERE name = ?", (evicted, self.table))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,68 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from .prefilter import claim_text
+
+
+# label order of the default NLI model, the same as refchecker's NLIChecker
+NLI_LABELS = ["Entailment", "Neutral", "Contradiction"]
+
+
+class LocalNLIChecker:
+    """
+    Local NLI checker returning the probability of entailment along with each verdict,
+    used as the first tier of a cascaded checker.
+
+    Parameters
+    ----------
+    model : str, optional
+        NLI model on the Hugging Face hub.
+        Default: "ynie/roberta-large-snli_mnli_fever_anli_R1_R2_R3-nli".
+    device : str | int, optional
+        Device to run the model on. Default: None (CUDA if available, else CPU).
+    batch_size : int, optional
+        Batch size for inference. Default: 16.
+    """
+    def __init__(
+        self,
+        model="ynie/roberta-large-snli_mnli_fever_anli_R1_R2_R3-nli",
+        device=None,
+        batch_size=16
+    ):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.torch = torch
+        self.device = device
+        self.batch_size = batch_size
+        self.model = AutoModelForSequenceClassification.from_pretrained(model).to(device)
+        self.model.eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+
+    def predict(self, claims: List, references: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Check claims against references.
+
+        Returns
+        -------
+        labels : List[str]
+            Most likely label of each pair.
+        p_entailment : np.ndarray
+            Probability of entailment of each pair.
+        """
+        claims = [claim_text(c) for c in claims]
+        probs = []
+        with self.torch.no_grad():
+            for i in range(0, len(claims), self.batch_size):
+                inputs = self.tokenizer(
+                    references[i:i + self.batch_size], claims[i:i + self.batch_size],
+                    max_length=512, truncation=True, return_tensors="pt", padding=True
+                )
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                probs.append(self.model(**inputs).logits.softmax(dim=-1).cpu().numpy())
+        probs = np.concatenate(probs) if probs else np.zeros((0, len(NLI_LABELS)))
+        labels = [NLI_LABELS[p] for p in probs.argmax(axis=-1)]
+        return labels, probs[:, NLI_LABELS.index("Entailment")]
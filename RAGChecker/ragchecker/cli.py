@@ -3,19 +3,26 @@ import json
 from argparse import ArgumentParser, RawTextHelpFormatter
 
 from .evaluator import RAGChecker
-from .container import RAGResults
+from .sharding import evaluate_sharded
+from .jsonl import is_jsonl, load_results
+from .export import export_tables
+from .systems import evaluate_systems, load_systems, metrics_table
+from .sampling import evaluate_adaptive
 from .metrics import *
 
 
 def get_args():
     parser = ArgumentParser(formatter_class=RawTextHelpFormatter)
     parser.add_argument(
-        "--input_path", type=str, required=True,
-        help="Input path to the json file."
+        "--input_path", type=str, nargs="+", required=True,
+        help="Input path to the json file, or to a .jsonl(.zst) file with one RAG result per line. With several "
+             "input files, one per system, the systems are evaluated together, sharing their common work."
     )
     parser.add_argument(
         "--output_path", type=str, required=True,
-        help="Output path to the result json file."
+        help="Output path to the result json file, or to a .jsonl(.zst) file. With JSONL input and output, "
+             "the results are evaluated as a stream in windows of --window_size. With several input files, "
+             "the output directory of the results of every system and of their metrics."
     )
     parser.add_argument(
         '--extractor_name', type=str, default="bedrock/meta.llama3-70b-instruct-v1:0",
@@ -62,14 +69,185 @@ def get_args():
     parser.add_argument(
         "--joint_check_num", type=int, default=5
     )
+    parser.add_argument(
+        "--adaptive_joint_check", action="store_true",
+        help="Pack as many claims per joint checking prompt as fit the token budget, shrinking on parse failures."
+    )
+    parser.add_argument(
+        "--joint_check_max_tokens", type=int, default=8000,
+        help="Token budget of a joint checking prompt and its output. Default: 8000"
+    )
+    parser.add_argument(
+        "--joint_check_max_num", type=int, default=32,
+        help="Maximum number of claims per joint checking prompt with --adaptive_joint_check. Default: 32"
+    )
+    parser.add_argument(
+        "--packed_checking", action="store_true",
+        help="Check several retrieved passages per prompt, with a verdict per (claim, passage)."
+    )
+    parser.add_argument(
+        "--packed_max_tokens", type=int, default=4000,
+        help="Token budget of a packed checking prompt and its output. Default: 4000"
+    )
+    parser.add_argument(
+        "--packed_max_passages", type=int, default=10,
+        help="Maximum number of passages per packed checking prompt. Default: 10"
+    )
+    parser.add_argument(
+        "--prefix_cache_ordering", action="store_true",
+        help="Send the LLM requests sharing a prompt prefix back to back, for the prefix cache of self-hosted endpoints."
+    )
+    parser.add_argument(
+        "--cache_dir", type=str, default=None,
+        help="Directory of the persistent cache for extracted claims and checker verdicts. "
+             "Default: None (no caching)."
+    )
+    parser.add_argument(
+        "--cache_max_entries", type=int, default=1_000_000,
+        help="Maximum number of entries per cache table before LRU eviction. Default: 1000000"
+    )
+    parser.add_argument(
+        "--max_concurrency", type=int, default=1,
+        help="Maximum number of checking batches in flight across all check types. Default: 1"
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="Start checking each batch as soon as its claims are extracted."
+    )
+    parser.add_argument(
+        "--queue_size", type=int, default=8,
+        help="Maximum number of extracted batches waiting for the checker in streaming mode. Default: 8"
+    )
+    parser.add_argument(
+        "--deduplicate", action="store_true",
+        help="Extract claims once per distinct text and check each distinct (claim, reference) pair once."
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Resume an interrupted run from the journal next to the output file."
+    )
+    parser.add_argument(
+        "--async_llm", action="store_true",
+        help="Send LLM requests through the asyncio executor with rate limiting and adaptive concurrency."
+    )
+    parser.add_argument(
+        "--requests_per_minute", type=float, default=None,
+        help="Request rate limit per LLM endpoint with --async_llm."
+    )
+    parser.add_argument(
+        "--tokens_per_minute", type=float, default=None,
+        help="Token rate limit per LLM endpoint with --async_llm."
+    )
+    parser.add_argument(
+        "--max_inflight_requests", type=int, default=64,
+        help="Maximum number of requests in flight per LLM endpoint with --async_llm. Default: 64"
+    )
+    parser.add_argument(
+        "--prefilter", type=str, choices=["bm25", "embedding"], default=None,
+        help="Skip unrelated (claim, passage) pairs of the retrieved context checks by a cheap similarity score."
+    )
+    parser.add_argument(
+        "--prefilter_threshold", type=float, default=0.1,
+        help="Score below which the prefilter marks a pair as Neutral, uncalibrated; the logged "
+             "prefilter report suggests one for 99%% recall of the entailed pairs. Default: 0.1"
+    )
+    parser.add_argument(
+        "--prefilter_audit_rate", type=float, default=0.05,
+        help="Fraction of the skipped pairs still checked to estimate the prefilter agreement. Default: 0.05"
+    )
+    parser.add_argument(
+        "--cascade_checker", type=str, choices=["nli"], default=None,
+        help="Local checker deciding confident pairs before escalating the others to the LLM checker."
+    )
+    parser.add_argument(
+        "--cascade_band", type=float, nargs=2, default=[0.1, 0.9],
+        help="Probability of entailment band of the local checker escalated to the LLM checker. Default: 0.1 0.9"
+    )
+    parser.add_argument(
+        "--lazy_checking", action="store_true",
+        help="Check passages in rank order and stop at the first entailing passage of each claim "
+             "when the requested metrics allow it."
+    )
+    parser.add_argument(
+        "--group_testing", action="store_true",
+        help="Check claims against the merged passages first and bisect only the entailed ones."
+    )
+    parser.add_argument(
+        "--group_testing_max_tokens", type=int, default=6000,
+        help="Estimated token budget of the merged passages of a group test. Default: 6000"
+    )
+    parser.add_argument(
+        "--compact_output", action="store_true",
+        help="Save the checking results as base64 packed 2-bit codes to shrink the output file."
+    )
+    parser.add_argument(
+        "--shared_passages", action="store_true",
+        help="Save each distinct retrieved passage once and reference it by index from the RAG results."
+    )
+    parser.add_argument(
+        "--window_size", type=int, default=1000,
+        help="Number of RAG results evaluated together when streaming JSONL files. Default: 1000"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes, each evaluating shards of the results partitioned by query id. Default: 1"
+    )
+    parser.add_argument(
+        "--previous_output", type=str, default=None,
+        help="Output file of a previous evaluation. Claims and verdicts whose inputs are unchanged are "
+             "carried over from it and only the invalidated ones are recomputed."
+    )
+    parser.add_argument(
+        "--ci_half_width", type=float, default=None,
+        help="Estimate the metrics from a growing random sample of the RAG results, until the confidence "
+             "interval of every metric is within this many points of its estimate. Default: None (evaluate all)."
+    )
+    parser.add_argument(
+        "--max_requests", type=int, default=None,
+        help="Budget of extractor and checker requests when sampling with --ci_half_width."
+    )
+    parser.add_argument(
+        "--max_tokens", type=int, default=None,
+        help="Budget of LLM tokens, prompt plus generated, when sampling with --ci_half_width. "
+             "Requires --async_llm, which counts the tokens of its requests."
+    )
+    parser.add_argument(
+        "--max_seconds", type=float, default=None,
+        help="Wall-clock budget in seconds when sampling with --ci_half_width."
+    )
+    parser.add_argument(
+        "--export_dir", type=str, default=None,
+        help="Directory to export the result, claim and verdict tables of the evaluated results to. Default: None"
+    )
+    parser.add_argument(
+        "--export_format", type=str, choices=["parquet", "arrow"], default="parquet",
+        help="File format of the exported tables. Default: parquet"
+    )
+
+
+    args = parser.parse_args()
 
+    def reject(names, message):
+        given = [f"--{name}" for name in names if getattr(args, name) != parser.get_default(name)]
+        if given:
+            parser.error(message.format(", ".join(given)))
 
-    return parser.parse_args()
+    # options of a full evaluation of a single input, which the other modes do not support
+    full_run_options = ["resume", "previous_output", "workers", "export_dir", "window_size"]
+    if len(args.input_path) > 1:
+        reject(full_run_options + ["ci_half_width"], "{} cannot be combined with several --input_path files.")
+    if args.ci_half_width is not None:
+        reject(full_run_options, "{} cannot be combined with --ci_half_width.")
+    else:
+        reject(["max_requests", "max_tokens", "max_seconds"], "{} only apply with --ci_half_width.")
+    if args.max_tokens is not None and not args.async_llm:
+        parser.error("--max_tokens requires --async_llm.")
+    return args
 
 
 def main():
     args = get_args()
-    evaluator = RAGChecker(
+    evaluator_kwargs = dict(
         extractor_name=args.extractor_name,
         checker_name=args.checker_name,
         extractor_max_new_tokens=args.extractor_max_new_tokens,
@@ -79,14 +257,77 @@ def main():
         batch_size_checker=args.batch_size_checker,
         openai_api_key=args.openai_api_key,
         joint_check=args.joint_check,
-        joint_check_num=args.joint_check_num
+        joint_check_num=args.joint_check_num,
+        cache_dir=args.cache_dir,
+        cache_max_entries=args.cache_max_entries,
+        max_concurrency=args.max_concurrency,
+        streaming=args.streaming,
+        queue_size=args.queue_size,
+        deduplicate=args.deduplicate,
+        async_llm=args.async_llm,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        max_inflight_requests=args.max_inflight_requests,
+        prefilter=args.prefilter,
+        prefilter_threshold=args.prefilter_threshold,
+        prefilter_audit_rate=args.prefilter_audit_rate,
+        cascade_checker=args.cascade_checker,
+        cascade_band=args.cascade_band,
+        lazy_checking=args.lazy_checking,
+        group_testing=args.group_testing,
+        group_testing_max_tokens=args.group_testing_max_tokens,
+        compact_output=args.compact_output,
+        shared_passages=args.shared_passages,
+        adaptive_joint_check=args.adaptive_joint_check,
+        joint_check_max_tokens=args.joint_check_max_tokens,
+        joint_check_max_num=args.joint_check_max_num,
+        packed_checking=args.packed_checking,
+        packed_max_tokens=args.packed_max_tokens,
+        packed_max_passages=args.packed_max_passages,
+        prefix_cache_ordering=args.prefix_cache_ordering
     )
-    with open(args.input_path, "r") as f:
-        rag_results = RAGResults.from_json(f.read())
-    evaluator.evaluate(rag_results, metrics=args.metrics, save_path=args.output_path)
+    if len(args.input_path) > 1:
+        with RAGChecker(**evaluator_kwargs) as evaluator:
+            system_metrics = evaluate_systems(
+                evaluator, load_systems(args.input_path), metrics=args.metrics, output_dir=args.output_path
+            )
+        print(metrics_table(system_metrics))
+        return
+    input_path = args.input_path[0]
+    if args.ci_half_width is not None:
+        with RAGChecker(**evaluator_kwargs) as evaluator:
+            estimated = evaluate_adaptive(
+                evaluator, load_results(input_path), metrics=args.metrics,
+                ci_half_width=args.ci_half_width, max_requests=args.max_requests, max_tokens=args.max_tokens,
+                max_seconds=args.max_seconds, save_path=args.output_path
+            )
+        print(json.dumps(estimated, indent=2))
+        return
+    if is_jsonl(input_path) and is_jsonl(args.output_path) and args.workers == 1:
+        with RAGChecker(**evaluator_kwargs) as evaluator:
+            metrics = evaluator.evaluate_stream(
+                input_path, args.output_path, metrics=args.metrics,
+                window_size=args.window_size, resume=args.resume, previous=args.previous_output
+            )
+        if args.export_dir:
+            export_tables(load_results(args.output_path), args.export_dir, args.export_format)
+        print(json.dumps(metrics, indent=2))
+        return
+    rag_results = load_results(input_path)
+    if args.workers > 1:
+        evaluate_sharded(
+            evaluator_kwargs, rag_results, metrics=args.metrics, workers=args.workers,
+            save_path=args.output_path, resume=args.resume, previous=args.previous_output
+        )
+    else:
+        with RAGChecker(**evaluator_kwargs) as evaluator:
+            evaluator.evaluate(
+                rag_results, metrics=args.metrics, save_path=args.output_path, resume=args.resume,
+                previous=args.previous_output
+            )
+    if args.export_dir:
+        export_tables(rag_results, args.export_dir, args.export_format)
     print(json.dumps(rag_results.metrics, indent=2))
-    with open(args.output_path, "w") as f:
-        f.write(rag_results.to_json(indent=2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Fast (de)serialization of RAG results, bypassing the reflection of dataclasses_json.
+
+The encoders build the same dicts as `to_dict(encode_json=False)` of dataclasses_json
+and render them with the same `json.dumps` arguments, so their output is byte-for-byte
+the same as `to_json`. The decoders accept everything `from_json` accepts, including
+the compact encoding of checking results, and parse with orjson when it is installed.
+
+With `shared_passages`, every distinct passage is written once in a top-level
+"passages" list and the retrieved context of each result holds indices into it.
+Such documents are read by `loads_results`, not by `RAGResults.from_json`.
+"""
+
+import json
+import math
+from dataclasses import fields
+from typing import Dict, List, Optional, Union
+
+from .container import RAGResults, RAGResult, RetrievedDoc, PassageTable
+from .encoding import VERDICT_FIELDS, encode_verdicts, decode_verdicts
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_RESULT_FIELDS = [f.name for f in fields(RAGResult)]
+
+
+def loads(s: str | bytes):
+    """Parse JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN written by json.dumps, which orjson rejects
+    return json.loads(s)
+
+
+def result_to_dict(result: RAGResult, compact: bool = False) -> dict:
+    """Dict of a RAG result, with its checking results packed as 2-bit codes if `compact`."""
+    data = {name: getattr(result, name) for name in _RESULT_FIELDS}
+    if data["verdict_tiers"] is None:
+        del data["verdict_tiers"]  # as excluded by `RAGResult.to_dict`
+    if result.retrieved_context is not None:
+        data["retrieved_context"] = [{"doc_id": doc.doc_id, "text": doc.text} for doc in result.retrieved_context]
+    if compact:
+        for name in VERDICT_FIELDS:
+            data[name] = encode_verdicts(data[name])
+    return data
+
+
+def doc_from_dict(data: dict) -> RetrievedDoc:
+    return RetrievedDoc(doc_id=data.get("doc_id"), text=data.get("text", ""))
+
+
+def result_from_dict(
+    data: dict,
+    passages: Optional[Union[List[RetrievedDoc], Dict[int, RetrievedDoc]]] = None,
+    table: Optional[PassageTable] = None
+) -> RAGResult:
+    """
+    RAG result of a dict, resolving passage indices in its retrieved context against
+    `passages` and interning inline passages in `table` if given.
+    """
+    kwargs = {name: data[name] for name in _RESULT_FIELDS if name in data}
+    if kwargs.get("retrieved_context") is not None:
+        context = []
+        for doc in kwargs["retrieved_context"]:
+            if isinstance(doc, int):
+                if passages is None:
+                    raise ValueError("Passage index in a retrieved context without a passage table.")
+                context.append(passages[doc])
+            elif table is not None:
+                context.append(table.intern(doc_from_dict(doc)))
+            else:
+                context.append(doc_from_dict(doc))
+        kwargs["retrieved_context"] = context
+    for name in VERDICT_FIELDS:
+        if kwargs.get(name) is not None:
+            kwargs[name] = decode_verdicts(kwargs[name])
+    return RAGResult(**kwargs)
+
+
+def results_to_dict(results: RAGResults, compact: bool = False, shared_passages: bool = False) -> dict:
+    if not shared_passages:
+        return {
+            "results": [result_to_dict(result, compact) for result in results.results],
+            "metrics": results.metrics
+        }
+    table = PassageTable()
+    items = []
+    for result in results.results:
+        item = result_to_dict(result, compact)
+        if result.retrieved_context is not None:
+            item["retrieved_context"] = [table.add(doc) for doc in result.retrieved_context]
+        items.append(item)
+    return {
+        "passages": [{"doc_id": doc.doc_id, "text": doc.text} for doc in table.docs],
+        "results": items,
+        "metrics": results.metrics
+    }
+
+
+def dumps_result(result: RAGResult, compact: bool = False, **kwargs) -> str:
+    """Same as `result.to_json(**kwargs)`, or its compact form if `compact`."""
+    return json.dumps(result_to_dict(result, compact), **kwargs)
+
+
+def loads_result(s: str | bytes) -> RAGResult:
+    """Same as `RAGResult.from_json(s)`."""
+    return result_from_dict(loads(s))
+
+
+def _plain_numbers(metrics) -> bool:
+    """Whether the metrics hold only numbers that orjson renders like json.dumps."""
+    return all(
+        value is None or isinstance(value, int)
+        or isinstance(value, float) and math.isfinite(value) and "e" not in float.__repr__(value)
+        for value in metrics.values()
+    )
+
+
+def _dumps_indented(data: dict, metrics) -> str:
+    """Same as `json.dumps(data, indent=2)`, rendered by orjson when it gives the same text."""
+    if orjson is not None and _plain_numbers(metrics):
+        text = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        # json.dumps escapes non-ASCII characters and DEL, orjson escapes the other control characters
+        if text.isascii() and b"\x7f" not in text:
+            return text.decode("ascii")
+    return json.dumps(data, indent=2)
+
+
+def dumps_results(results: RAGResults, compact: bool = False, shared_passages: bool = False, **kwargs) -> str:
+    """
+    Same as `results.to_json(**kwargs)`, or `results.to_compact_json(**kwargs)` if
+    `compact`, with each distinct passage written once if `shared_passages`.
+    """
+    if compact or shared_passages or kwargs != {"indent": 2}:
+        return json.dumps(results_to_dict(results, compact, shared_passages), **kwargs)
+    # json.dumps falls back to its pure Python encoder with indent, render each result
+    # separately and indent it in place instead
+    items = [
+        _dumps_indented(result_to_dict(result), result.metrics).replace("\n", "\n    ")
+        for result in results.results
+    ]
+    rendered = "[\n    " + ",\n    ".join(items) + "\n  ]" if items else "[]"
+    metrics = json.dumps(results.metrics, indent=2).replace("\n", "\n  ")
+    return f'{{\n  "results": {rendered},\n  "metrics": {metrics}\n}}'
+
+
+def loads_results(s: str | bytes) -> RAGResults:
+    """
+    Same as `RAGResults.from_json(s)`, also reading shared passages. Passages are
+    interned, so that results retrieving the same passage share one `RetrievedDoc`.
+    """
+    data = loads(s)
+    table = PassageTable()
+    passages = [table.intern(doc_from_dict(doc)) for doc in data.get("passages", [])]
+    results = RAGResults(results=[result_from_dict(result, passages, table) for result in data.get("results", [])])
+    if "metrics" in data:
+        results.metrics = data["metrics"]
+    return results
@@ -0,0 +1,228 @@
+from itertools import chain
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from .container import RAGResult
+from .encoding import UNCHECKED, LABEL_CODES, decode_verdicts
+from . import metrics
+
+
+ENTAILMENT = LABEL_CODES["Entailment"]
+
+
+def segment_any(values: np.ndarray, segment_ids: np.ndarray, num_segments: int) -> np.ndarray:
+    """Logical or of boolean values per segment, False for empty segments."""
+    return np.bincount(segment_ids, weights=values, minlength=num_segments) > 0
+
+
+def segment_mean(values: np.ndarray, segment_ids: np.ndarray, num_segments: int) -> np.ndarray:
+    """Mean of values per segment, 0 for empty segments."""
+    sums = np.bincount(segment_ids, weights=values, minlength=num_segments)
+    counts = np.bincount(segment_ids, minlength=num_segments)
+    return np.divide(sums, counts, out=np.zeros(num_segments), where=counts > 0)
+
+
+class VerdictColumn:
+    """
+    Checking results of one check type for a whole dataset, as ragged columnar arrays.
+
+    The labels of every result are concatenated into one int8 buffer of `LABEL_CODES`,
+    where labels outside `LABEL_CODES` count as not entailed.
+    For claim-level checks (answer2response, response2answer) each cell is a claim and
+    `claim_offsets` delimits the claims of each result. For passage-level checks
+    (retrieved2answer, retrieved2response) each claim is a row of passage cells, and
+    `cell_offsets` additionally delimits the cells of each claim.
+    """
+    def __init__(self, checking_results: List[list], passage_level: bool):
+        self.num_results = len(checking_results)
+        num_claims = np.fromiter(map(len, checking_results), dtype=np.int64, count=self.num_results)
+        self.claim_offsets = np.concatenate([[0], np.cumsum(num_claims)])
+        self.num_claims = num_claims
+        self.result_of_claim = np.repeat(np.arange(self.num_results), num_claims)
+        labels = chain.from_iterable(checking_results)
+        if passage_level:
+            rows = list(labels)
+            num_cells = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+            self.cell_offsets = np.concatenate([[0], np.cumsum(num_cells)])
+            self.claim_of_cell = np.repeat(np.arange(len(rows)), num_cells)
+            self.passage_of_cell = np.arange(self.cell_offsets[-1]) - np.repeat(self.cell_offsets[:-1], num_cells)
+            # number of passages of each result, i.e. the longest row of its matrix
+            self.num_passages = np.zeros(self.num_results, dtype=np.int64)
+            np.maximum.at(self.num_passages, self.result_of_claim, num_cells)
+            labels = chain.from_iterable(rows)
+            num_labels = int(self.cell_offsets[-1])
+        else:
+            self.cell_offsets = None
+            num_labels = int(self.claim_offsets[-1])
+        self.codes = np.fromiter(
+            (LABEL_CODES.get(label, 0) for label in labels), dtype=np.int8, count=num_labels
+        )
+        self.entailed = self.codes == ENTAILMENT
+
+    @property
+    def num_total_claims(self) -> int:
+        return int(self.claim_offsets[-1])
+
+    def claim_entailed(self) -> np.ndarray:
+        """Whether each claim is entailed, by any passage for passage-level checks."""
+        if self.cell_offsets is None:
+            return self.entailed
+        return segment_any(self.entailed, self.claim_of_cell, self.num_total_claims)
+
+    def passage_ids(self, passage_offsets: np.ndarray) -> np.ndarray:
+        """Dataset-wide passage index of each cell, given the first passage index of each result."""
+        return passage_offsets[self.result_of_claim[self.claim_of_cell]] + self.passage_of_cell
+
+    def complete(self) -> np.ndarray:
+        """Whether no cell of each result was skipped by lazy checking."""
+        unchecked = self.codes == LABEL_CODES[UNCHECKED]
+        claim_ids = self.claim_of_cell if self.cell_offsets is not None else np.arange(len(self.codes))
+        return ~segment_any(unchecked, self.result_of_claim[claim_ids], self.num_results)
+
+
+class MetricEngine:
+    """
+    Dataset-level metric computation over columnar verdicts.
+
+    Every check type is converted once into a `VerdictColumn`, then each metric of
+    `computation.METRIC_FUNC_MAP` is computed for all results at once by vectorized
+    segment reductions. The values match the per-result functions of `computation`.
+
+    Parameters
+    ----------
+    results : List[RAGResult]
+        The RAG results to evaluate.
+    """
+    def __init__(self, results: List[RAGResult]):
+        self.results = results
+        self.num_results = len(results)
+        self._columns = {}
+        self._values = {}
+
+    def column(self, check_type: str) -> VerdictColumn:
+        if check_type not in self._columns:
+            checking_results = [decode_verdicts(getattr(result, check_type)) for result in self.results]
+            assert all(res is not None for res in checking_results), f"Missing {check_type} results."
+            self._columns[check_type] = VerdictColumn(
+                checking_results, passage_level=check_type.startswith("retrieved")
+            )
+        return self._columns[check_type]
+
+    def compute(self, metric_names: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Compute metrics for every result.
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            Value of each metric per result, NaN where a metric is undefined (context
+            precision of lazily checked results).
+        """
+        for metric in metric_names:
+            if metric not in self._values:
+                self._METRIC_GROUPS[metric](self)
+        return {metric: self._values[metric] for metric in metric_names}
+
+    def _claim_mean(self, values, column: VerdictColumn):
+        return segment_mean(values, column.result_of_claim, self.num_results)
+
+    def _precision(self):
+        a2r = self.column("answer2response")
+        self._values[metrics.precision] = self._claim_mean(a2r.entailed, a2r)
+
+    def _recall(self):
+        r2a = self.column("response2answer")
+        self._values[metrics.recall] = self._claim_mean(r2a.entailed, r2a)
+
+    def _f1(self):
+        precision, recall = self.compute([metrics.precision, metrics.recall]).values()
+        defined = (precision > 0) & (recall > 0)
+        self._values[metrics.f1] = np.divide(
+            2 * precision * recall, precision + recall, out=np.zeros(self.num_results), where=defined
+        )
+
+    def _retrieval(self):
+        r2a = self.column("retrieved2answer")
+        has_matrix = (r2a.num_claims > 0) & (r2a.num_passages > 0)
+        claim_recalled = r2a.claim_entailed()
+        self._values[metrics.claim_recall] = np.where(has_matrix, self._claim_mean(claim_recalled, r2a), 0.)
+
+        passage_offsets = np.concatenate([[0], np.cumsum(r2a.num_passages)])
+        psg_useful = segment_any(r2a.entailed, r2a.passage_ids(passage_offsets), int(passage_offsets[-1]))
+        result_of_passage = np.repeat(np.arange(self.num_results), r2a.num_passages)
+        context_precision = np.where(
+            has_matrix, segment_mean(psg_useful, result_of_passage, self.num_results), 0.
+        )
+        self._values[metrics.context_precision] = np.where(r2a.complete(), context_precision, np.nan)
+
+    def _context_utilization(self):
+        r2a = self.column("retrieved2answer")
+        response2answer = self.column("response2answer")
+        claim_recalled = r2a.claim_entailed()
+        claim_used = claim_recalled & response2answer.entailed
+        num_recalled = np.bincount(r2a.result_of_claim, weights=claim_recalled, minlength=self.num_results)
+        num_used = np.bincount(r2a.result_of_claim, weights=claim_used, minlength=self.num_results)
+        defined = (r2a.num_claims > 0) & (r2a.num_passages > 0) & (num_recalled > 0)
+        self._values[metrics.context_utilization] = np.divide(
+            num_used, num_recalled, out=np.zeros(self.num_results), where=defined
+        )
+
+    def _noise_sensitivity(self):
+        r2resp = self.column("retrieved2response")
+        a2r = self.column("answer2response")
+        r2a = self.column("retrieved2answer")
+        assert r2resp.complete().all() and r2a.complete().all(), \
+            "Noise sensitivity requires fully checked retrieved2response and retrieved2answer."
+
+        # both matrices share the passage layout of each result
+        num_passages = np.maximum(r2resp.num_passages, r2a.num_passages)
+        passage_offsets = np.concatenate([[0], np.cumsum(num_passages)])
+        relevant = segment_any(r2a.entailed, r2a.passage_ids(passage_offsets), int(passage_offsets[-1]))
+        relevant_cell = relevant[r2resp.passage_ids(passage_offsets)]
+        num_claims = r2resp.num_total_claims
+        relevant_faithful = segment_any(r2resp.entailed & relevant_cell, r2resp.claim_of_cell, num_claims)
+        irrelevant_faithful = segment_any(r2resp.entailed & ~relevant_cell, r2resp.claim_of_cell, num_claims)
+        irrelevant_faithful &= ~relevant_faithful  # to keep them exclusive
+
+        incorrect = ~a2r.entailed
+        defined = (a2r.num_claims > 0) & (r2resp.num_passages > 0) & (r2a.num_claims > 0)
+        self._values[metrics.noise_sensitivity_in_relevant] = np.where(
+            defined, self._claim_mean(relevant_faithful & incorrect, r2resp), 0.
+        )
+        self._values[metrics.noise_sensitivity_in_irrelevant] = np.where(
+            defined, self._claim_mean(irrelevant_faithful & incorrect, r2resp), 0.
+        )
+
+    def _unfaithfulness(self):
+        r2resp = self.column("retrieved2response")
+        a2r = self.column("answer2response")
+        unfaithful = ~r2resp.claim_entailed()
+        defined = (a2r.num_claims > 0) & (r2resp.num_passages > 0)
+        self._values[metrics.hallucination] = np.where(
+            defined, self._claim_mean(unfaithful & ~a2r.entailed, r2resp), 0.
+        )
+        self._values[metrics.self_knowledge] = np.where(
+            defined, self._claim_mean(unfaithful & a2r.entailed, r2resp), 0.
+        )
+
+    def _faithfulness(self):
+        r2resp = self.column("retrieved2response")
+        defined = (r2resp.num_claims > 0) & (r2resp.num_passages > 0)
+        self._values[metrics.faithfulness] = np.where(
+            defined, self._claim_mean(r2resp.claim_entailed(), r2resp), 0.
+        )
+
+    _METRIC_GROUPS = {
+        metrics.precision: _precision,
+        metrics.recall: _recall,
+        metrics.f1: _f1,
+        metrics.claim_recall: _retrieval,
+        metrics.context_precision: _retrieval,
+        metrics.context_utilization: _context_utilization,
+        metrics.noise_sensitivity_in_relevant: _noise_sensitivity,
+        metrics.noise_sensitivity_in_irrelevant: _noise_sensitivity,
+        metrics.hallucination: _unfaithfulness,
+        metrics.self_knowledge: _unfaithfulness,
+        metrics.faithfulness: _faithfulness,
+    }
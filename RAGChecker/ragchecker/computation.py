@@ -1,15 +1,35 @@
 import numpy as np
 
 from .container import RAGResult
+from .encoding import UNCHECKED, decode_verdicts
 from . import metrics
 
 
 def to_bool(checking_results):
+    checking_results = decode_verdicts(checking_results)
     if isinstance(checking_results, str):
         return checking_results == "Entailment"
     return np.array([to_bool(res) for res in checking_results])
 
 
+def is_complete(checking_results):
+    """Whether no cell of the checking results was skipped by lazy checking or left undecided."""
+    checking_results = decode_verdicts(checking_results)
+    if checking_results is None:
+        return False
+    if isinstance(checking_results, str):
+        return checking_results != UNCHECKED
+    return all(is_complete(res) for res in checking_results)
+
+
+def is_decided(checking_results):
+    """Whether every cell of the checking results holds a label, e.g. not invalidated by incremental evaluation."""
+    checking_results = decode_verdicts(checking_results)
+    if checking_results is None or isinstance(checking_results, str):
+        return checking_results is not None
+    return all(is_decided(res) for res in checking_results)
+
+
 def evaluate_precision(result: RAGResult):
     if metrics.precision in result.metrics:
         return
@@ -58,17 +78,24 @@ def evaluate_context_precision(result: RAGResult):
 
 
 def evaluate_retrieval(result: RAGResult):
-    """Evaluate retrieval metrics together as they share the same intermediate results."""
+    """
+    Evaluate retrieval metrics together as they share the same intermediate results.
+    Context precision is left out for lazily checked results, whose skipped cells may
+    hide useful passages.
+    """
     assert result.retrieved2answer is not None
     retrieved2answer = to_bool(result.retrieved2answer)
+    complete = is_complete(result.retrieved2answer)
     if len(retrieved2answer) > 0 and len(retrieved2answer[0]) > 0:
         claim_recalled = np.max(retrieved2answer, axis=1)
         result.metrics[metrics.claim_recall] = np.mean(claim_recalled)
-        psg_useful = np.max(retrieved2answer, axis=0)
-        result.metrics[metrics.context_precision] = np.mean(psg_useful)
+        if complete:
+            psg_useful = np.max(retrieved2answer, axis=0)
+            result.metrics[metrics.context_precision] = np.mean(psg_useful)
     else:
         result.metrics[metrics.claim_recall] = 0.
-        result.metrics[metrics.context_precision] = 0.
+        if complete:
+            result.metrics[metrics.context_precision] = 0.
 
 
 def evaluate_context_utilization(result: RAGResult):
@@ -104,6 +131,8 @@ def evaluate_noise_sensitivity(result: RAGResult):
     """Evaluate noise sensitivity metrics together as they share the same intermediate results."""
     assert result.retrieved2response is not None and result.answer2response is not None and \
         result.retrieved2answer is not None
+    assert is_complete(result.retrieved2response) and is_complete(result.retrieved2answer), \
+        "Noise sensitivity requires fully checked retrieved2response and retrieved2answer."
     retrieved2response = to_bool(result.retrieved2response)
     answer2response = to_bool(result.answer2response)
     retrieved2answer = to_bool(result.retrieved2answer)
@@ -1,18 +1,65 @@
 import json
+import hashlib
 from typing import List
 from dataclasses import dataclass, field
-from dataclasses_json import dataclass_json
+from dataclasses_json import dataclass_json, config
 from . import metrics
+from .encoding import decode_verdicts
+
+
+def verdict_field():
+    """Field of checking results, which are also read from their compact encoding."""
+    return field(default=None, metadata=config(decoder=decode_verdicts))
+
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class RetrievedDoc:
     doc_id: str | None = None
     text: str = ""
 
 
+class PassageTable:
+    """
+    Interned passages, each stored once and referenced by its index.
+
+    Passages are keyed by their doc id and a hash of their text, so that the same
+    passage retrieved for many queries is shared, while different texts under the
+    same doc id stay distinct. Interned `RetrievedDoc` objects are shared by every
+    result retrieving them and should not be modified in place.
+    """
+    __slots__ = ("docs", "_index")
+
+    def __init__(self):
+        self.docs: List[RetrievedDoc] = []
+        self._index: dict[tuple, int] = {}
+
+    @staticmethod
+    def key(doc: RetrievedDoc) -> tuple:
+        return doc.doc_id, hashlib.blake2b(doc.text.encode("utf-8"), digest_size=16).digest()
+
+    def add(self, doc: RetrievedDoc) -> int:
+        """Index of a passage, adding it to the table if it is new."""
+        key = self.key(doc)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.docs)
+            self.docs.append(doc)
+        return index
+
+    def intern(self, doc: RetrievedDoc) -> RetrievedDoc:
+        """The shared copy of a passage."""
+        return self.docs[self.add(doc)]
+
+    def __getitem__(self, index: int) -> RetrievedDoc:
+        return self.docs[index]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class RAGResult:
     query_id: str
     query: str
@@ -21,15 +68,17 @@ class RAGResult:
     retrieved_context: List[RetrievedDoc] | None = None # Retrieved documents
     response_claims: List[List[str]] | None = None  # List of claims for the response
     gt_answer_claims: List[List[str]] | None = None  # List of claims for the ground truth answer
-    answer2response: List[str] | None = None  # entailment results of answer -> response
-    response2answer: List[str] | None = None  # entailment results of response -> answer
-    retrieved2response: List[List[str]] | None = None  # entailment results of retrieved -> response
-    retrieved2answer: List[List[str]] | None = None  # entailment results of retrieved -> answer
+    answer2response: List[str] | None = verdict_field()  # entailment results of answer -> response
+    response2answer: List[str] | None = verdict_field()  # entailment results of response -> answer
+    retrieved2response: List[List[str]] | None = verdict_field()  # entailment results of retrieved -> response
+    retrieved2answer: List[List[str]] | None = verdict_field()  # entailment results of retrieved -> answer
+    # tier deciding each verdict per check type, with a cascaded checker, left out of the output when None
+    verdict_tiers: dict[str, list] | None = field(default=None, metadata=config(exclude=lambda tiers: tiers is None))
     metrics: dict[str, float] = field(default_factory=dict)
 
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class RAGResults:
     results: List[RAGResult] = field(default_factory=list)
     metrics: dict[str, dict[str, float]] = field(default_factory = lambda: {
@@ -45,6 +94,15 @@ class RAGResults:
             f"  Metrics:\n{metrics}\n)"
         )
 
+    def to_compact_json(self, **kwargs) -> str:
+        """
+        Serialize to JSON like `to_json`, with the checking results of every RAG result
+        packed as 2-bit codes in base64 (see `encoding.encode_verdicts`). `from_json`
+        reads both formats.
+        """
+        from .codec import dumps_results
+        return dumps_results(self, compact=True, **kwargs)
+
     def update(self, rag_result: List[RAGResult]):
         self.results.append(rag_result)
         self.metrics = {
@@ -0,0 +1,68 @@
+import math
+import base64
+from itertools import chain, product
+
+
+# label of the cells skipped by lazy checking
+UNCHECKED = "Unchecked"
+
+# 2-bit code of each checking label
+LABELS = ["Neutral", "Entailment", "Contradiction", UNCHECKED]
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# the checking results stored per RAG result
+VERDICT_FIELDS = ["answer2response", "response2answer", "retrieved2response", "retrieved2answer"]
+
+ENCODING = "2bit"
+
+# the four labels packed in each byte value, lowest bits first
+BYTE_LABELS = [tuple(reversed(labels)) for labels in product(LABELS, repeat=4)]
+BYTE_OF_LABELS = {labels: byte for byte, labels in enumerate(BYTE_LABELS)}
+
+
+def is_encoded(checking_results) -> bool:
+    return isinstance(checking_results, dict) and checking_results.get("encoding") == ENCODING
+
+
+def encode_verdicts(checking_results):
+    """
+    Encode a list of labels or a [claim, passage] matrix of labels as 2-bit codes,
+    four per byte, in base64:
+
+        {"encoding": "2bit", "shape": [num_claims] or [num_claims, num_passages], "data": "..."}
+
+    Checking results that cannot be encoded losslessly, i.e. with labels outside
+    `LABELS` or ragged rows, are returned unchanged.
+    """
+    if checking_results is None or is_encoded(checking_results):
+        return checking_results
+    if checking_results and isinstance(checking_results[0], list):
+        num_passages = len(checking_results[0])
+        if any(len(row) != num_passages for row in checking_results):
+            return checking_results
+        shape = [len(checking_results), num_passages]
+        labels = [label for row in checking_results for label in row]
+    else:
+        shape = [len(checking_results)]
+        labels = checking_results
+    labels = list(labels) + ["Neutral"] * (-len(labels) % 4)
+    try:
+        packed = bytes(map(BYTE_OF_LABELS.__getitem__, zip(*[iter(labels)] * 4)))
+    except (KeyError, TypeError):
+        return checking_results
+    return {"encoding": ENCODING, "shape": shape, "data": base64.b64encode(packed).decode("ascii")}
+
+
+def decode_verdicts(checking_results):
+    """Decode checking results encoded by `encode_verdicts`, other values are returned unchanged."""
+    if not is_encoded(checking_results):
+        return checking_results
+    shape = checking_results["shape"]
+    packed = base64.b64decode(checking_results["data"])
+    labels = list(chain.from_iterable(map(BYTE_LABELS.__getitem__, packed)))
+    del labels[math.prod(shape):]
+    if len(shape) == 1:
+        return labels
+    if shape[1] == 0:
+        return [[] for _ in range(shape[0])]
+    return [labels[i:i + shape[1]] for i in range(0, shape[0] * shape[1], shape[1])]
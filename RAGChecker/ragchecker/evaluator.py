@@ -1,16 +1,101 @@
 import os
-from typing import List
+import json
+import math
+import queue
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from itertools import groupby, islice, zip_longest
+from typing import Dict, Iterable, List
 
 from refchecker.extractor import LLMExtractor
 from refchecker.checker import (
     LLMChecker, NLIChecker, AlignScoreChecker
 )
+from refchecker.utils import get_model_batch_response
 from loguru import logger
 import numpy as np
 
 from .container import RAGResults, RAGResult
 from .metrics import *
-from .computation import METRIC_FUNC_MAP
+from .computation import UNCHECKED, is_complete, is_decided
+from .columnar import MetricEngine
+from .cache import SQLiteCache, normalize_text, claim_cache_key, verdict_cache_key
+from .progress import ProgressTracker
+from .journal import Journal, journal_path
+from .llm_executor import AsyncLLMExecutor, estimate_tokens
+from .prefilter import PairPrefilter
+from .cascade import LocalNLIChecker
+from .verdicts import VerdictGrid
+from .codec import dumps_results
+from .jsonl import is_jsonl, iter_results, load_results, save_results, metrics_path, ResultsWriter
+from .incremental import PreviousResult, index_previous, carry_over, format_report
+from .joint_grouping import JointGrouper, ParseMonitor
+from .packing import PassagePacker, PackedChecker
+from .prefix_cache import PrefixScheduler
+
+
+# the claims being checked by each type of checking
+CHECK_CLAIM_SOURCE = {
+    "answer2response": "response",
+    "response2answer": "gt_answer",
+    "retrieved2answer": "gt_answer",
+    "retrieved2response": "response",
+}
+
+
+def resolve_metrics(metrics):
+    """
+    Expand metric names and groups into the set of metrics to compute and the set of
+    intermediate results (check types) they require.
+    """
+    if isinstance(metrics, str):
+        metrics = [metrics]
+    ret_metrics = set()
+    requirements = set()
+    for metric in metrics:
+        if metric not in METRIC_REQUIREMENTS:
+            if metric not in METRIC_GROUP_MAP:
+                raise ValueError(f"Invalid metric: {metric}.")
+            ret_metrics.update(METRIC_GROUP_MAP[metric])
+        else:
+            ret_metrics.add(metric)
+    for metric in ret_metrics:
+        requirements.update(METRIC_REQUIREMENTS[metric])
+    return ret_metrics, requirements
+
+
+def compute_metrics(results: RAGResults, ret_metrics):
+    """
+    Compute the metrics of every RAG result from its checking results, keeping the
+    values already computed, then aggregate them over the dataset.
+    """
+    values = MetricEngine(results.results).compute(ret_metrics)
+    for metric in ret_metrics:
+        for result, value in zip(results.results, values[metric]):
+            if not np.isnan(value):
+                result.metrics.setdefault(metric, value)
+    aggregate_metrics(results, ret_metrics)
+
+
+def aggregate_metrics(results: RAGResults, ret_metrics):
+    """Set the dataset-level metrics of `results` from the metrics of every RAG result."""
+    for group, group_metrics in METRIC_GROUP_MAP.items():
+        if group == all_metrics:
+            continue
+        for metric in group_metrics:
+            if metric in ret_metrics:
+                results.metrics[group][metric] = round(np.mean(
+                    [result.metrics[metric] for result in results.results]
+                ) * 100, 1)
+
+
+# metrics that only use the maximum over passages of a passage-level check
+LAZY_CHECK_METRICS = {
+    "retrieved2answer": [claim_recall, context_utilization],
+    "retrieved2response": [hallucination, self_knowledge, faithfulness],
+}
 
 class RAGChecker():
     """
@@ -38,6 +123,113 @@ class RAGChecker():
         Enable joint checking of the claims. Default: True.
     joint_check_num: int, optional
         Number of claims to check jointly in one prompt. Default: 5.
+    cache_dir: str, optional
+        Directory of the persistent cache for intermediate results. Extracted claims and
+        (claim, reference) verdicts are looked up there before calling the extractor or the
+        checker. Default: None (no caching).
+    cache_max_entries: int, optional
+        Maximum number of entries kept per cache table, least recently used entries are
+        evicted first. Default: 1,000,000.
+    max_concurrency: int, optional
+        Maximum number of checking batches in flight at once across all check types. With a
+        value larger than 1, the check types required by `evaluate` run concurrently.
+        Default: 1 (check types run one after the other).
+    streaming: bool, optional
+        Pipeline claim extraction and checking per batch of RAG results instead of
+        extracting all claims before any checking starts. Default: False.
+    queue_size: int, optional
+        Maximum number of extracted batches waiting for the checker in streaming mode.
+        Default: 8.
+    deduplicate: bool, optional
+        Extract claims once per distinct normalized text and check each distinct
+        (claim, reference) pair once, then fan the results out to every RAG result. The
+        claims of a text are extracted with the question of its first occurrence. The
+        number of saved calls is recorded in `stats`. Default: False.
+    async_llm: bool, optional
+        Send the extractor and LLM checker requests through an `AsyncLLMExecutor`, which
+        keeps requests in flight under rate limits with adaptive concurrency, hedging and
+        retries, instead of refchecker's fixed-size batches. The achieved throughput is
+        logged at the end of `evaluate`. The executors run until `close`, or the end of a
+        `with RAGChecker(...)` block. Default: False.
+    requests_per_minute: float, optional
+        Request rate limit of each LLM endpoint with `async_llm`. Default: None (unlimited).
+    tokens_per_minute: float, optional
+        Token rate limit of each LLM endpoint with `async_llm`. Default: None (unlimited).
+    max_inflight_requests: int, optional
+        Upper bound of the adaptive number of requests in flight per LLM endpoint with
+        `async_llm`. Default: 64.
+    prefilter: str, optional
+        Score (claim, passage) pairs of the retrieved2answer / retrieved2response checks
+        with "bm25" or "embedding" similarity first, and mark the pairs below
+        `prefilter_threshold` as "Neutral" without calling the checker. Default: None.
+    prefilter_threshold: float, optional
+        Score below which a pair is skipped by the prefilter. The default is not
+        calibrated: the prefilter report at the end of `evaluate` estimates its recall
+        of the entailed pairs and suggests a threshold, see `PairPrefilter`. Default: 0.1.
+    prefilter_audit_rate: float, optional
+        Fraction of the skipped pairs still sent to the checker to estimate the agreement
+        of the prefilter with the checker. Default: 0.05.
+    cascade_checker: str, optional
+        Local checker used as the first tier of a cascade, currently "nli". Pairs whose
+        probability of entailment under the local checker falls inside `cascade_band` are
+        escalated to the LLM checker, the others keep the local verdict. The deciding tier
+        of every verdict is recorded in `RAGResult.verdict_tiers`. Default: None.
+    cascade_band: tuple[float, float], optional
+        Uncertainty band of the probability of entailment under the local checker.
+        Default: (0.1, 0.9).
+    lazy_checking: bool, optional
+        When every requested metric using retrieved2answer or retrieved2response only needs
+        the maximum over passages (e.g. claim recall, faithfulness), check the passages in
+        retrieval-rank order and stop for each claim at its first entailing passage. The
+        skipped cells are marked "Unchecked". Other metrics fall back to the full check.
+        Default: False.
+    group_testing: bool, optional
+        Check the passage-level claims by group testing: a claim is first checked against
+        all passages merged, and only the claims entailed or contradicted by the merged
+        passages are bisected over passage groups to find the deciding passages. The output is the
+        same [claim, passage] matrix. Default: False.
+    group_testing_max_tokens: int, optional
+        Estimated token budget of the merged passages of a group test, so that the merged
+        reference fits the context window of the checker. The passages of a RAG result
+        are split into consecutive groups within the budget before the first test.
+        Default: 6000.
+    compact_output: bool, optional
+        Save the checking results packed as 2-bit codes in base64 instead of lists of
+        labels, see `RAGResults.to_compact_json`. Default: False.
+    shared_passages: bool, optional
+        Save each distinct retrieved passage once, with the retrieved context of every
+        RAG result referencing it by index, see `codec.results_to_dict`. Default: False.
+    adaptive_joint_check: bool, optional
+        With joint checking by an LLM checker, size the claim groups of every joint
+        prompt to the token budget `joint_check_max_tokens` given the length of its
+        reference, instead of `joint_check_num` claims. Responses whose labels do not
+        match their claims shrink the groups and are checked again in smaller groups,
+        see `joint_grouping.JointGrouper`. The number of prompts is reported against the
+        fixed setting. Default: False.
+    joint_check_max_tokens: int, optional
+        Token budget of a joint checking prompt and its output, e.g. the context window
+        of the checker model. Default: 8000.
+    joint_check_max_num: int, optional
+        Maximum number of claims per joint prompt with `adaptive_joint_check`. Default: 32.
+    packed_checking: bool, optional
+        Check the passage-level claims of retrieved2answer / retrieved2response with an
+        LLM checker in packed prompts: several passages of a RAG result, labeled with
+        ids, are sent in one prompt with the claims to check against them, asking for a
+        verdict per (claim, passage id), see `packing.PassagePacker`. The verdicts are
+        parsed back into the same [claim, passage] matrices, and pairs missing from a
+        response are checked again passage by passage. Default: False.
+    packed_max_tokens: int, optional
+        Token budget of a packed prompt and its output. Default: 4000.
+    packed_max_passages: int, optional
+        Maximum number of passages per packed prompt. Default: 10.
+    prefix_cache_ordering: bool, optional
+        Order the LLM requests for the prefix cache of a self-hosted endpoint (e.g. vLLM
+        at `extractor_api_base` / `checker_api_base`): checking items are sorted by
+        question and reference, so that all claims checked against the same reference
+        are sent back to back, and every batch of prompts is sent in sorted order, see
+        `prefix_cache.PrefixScheduler`. The shared prefix of the prompts, and the prefix
+        cache hit rate of the servers exposing one on their `/metrics` endpoint, are
+        logged at the end of `evaluate`. Default: False.
     """
     def __init__(
         self,
@@ -55,6 +247,33 @@ class RAGChecker():
         sagemaker_params=None,
         sagemaker_get_response_func=None,
         custom_llm_api_func=None,
+        cache_dir=None,
+        cache_max_entries=1_000_000,
+        max_concurrency=1,
+        streaming=False,
+        queue_size=8,
+        deduplicate=False,
+        async_llm=False,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_inflight_requests=64,
+        prefilter=None,
+        prefilter_threshold=0.1,
+        prefilter_audit_rate=0.05,
+        cascade_checker=None,
+        cascade_band=(0.1, 0.9),
+        lazy_checking=False,
+        group_testing=False,
+        group_testing_max_tokens=6000,
+        compact_output=False,
+        shared_passages=False,
+        adaptive_joint_check=False,
+        joint_check_max_tokens=8000,
+        joint_check_max_num=32,
+        packed_checking=False,
+        packed_max_tokens=4000,
+        packed_max_passages=10,
+        prefix_cache_ordering=False,
         **kwargs
     ):
         if openai_api_key:
@@ -62,6 +281,21 @@ class RAGChecker():
         self.extractor_max_new_tokens = extractor_max_new_tokens
         self.joint_check = joint_check
         self.joint_check_num = joint_check_num
+        self.batch_size_checker = batch_size_checker
+        self.max_concurrency = max_concurrency
+        self.streaming = streaming
+        self.queue_size = queue_size
+        self.batch_size_extractor = batch_size_extractor
+        self.deduplicate = deduplicate
+        self.lazy_checking = lazy_checking
+        self.group_testing = group_testing
+        self.group_testing_max_tokens = group_testing_max_tokens
+        self.compact_output = compact_output
+        self.shared_passages = shared_passages
+        self._lazy_check_types = set()
+        self._journal = None
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
         self.kwargs = kwargs
         
         self.sagemaker_client = sagemaker_client
@@ -69,10 +303,62 @@ class RAGChecker():
         self.sagemaker_get_response_func = sagemaker_get_response_func
         
         self.custom_llm_api_func = custom_llm_api_func
+
+        self.extractor_name = extractor_name
+        self.checker_name = checker_name
+        self.claim_cache = None
+        self.verdict_cache = None
+        if cache_dir is not None:
+            self.claim_cache = SQLiteCache(cache_dir, "claims", max_entries=cache_max_entries)
+            self.verdict_cache = SQLiteCache(cache_dir, "verdicts", max_entries=cache_max_entries)
         
+
+        self.prefilter = None
+        if prefilter is not None:
+            self.prefilter = PairPrefilter(
+                method=prefilter, threshold=prefilter_threshold, audit_rate=prefilter_audit_rate
+            )
+
+        self.cascade = None
+        self.cascade_band = tuple(cascade_band)
+        if cascade_checker is not None:
+            if cascade_checker != "nli":
+                raise ValueError(f"Invalid cascade_checker: {cascade_checker}")
+            if checker_name in ["nli", "alignscore"]:
+                raise ValueError("The cascade escalates to an LLM checker, set checker_name to an LLM.")
+            self.cascade = LocalNLIChecker(batch_size=batch_size_checker)
+
+        self.extractor_llm_api_func = custom_llm_api_func
+        self.checker_llm_api_func = custom_llm_api_func
+        self.llm_executors = {}
+        llm_batch_size_extractor, llm_batch_size_checker = batch_size_extractor, batch_size_checker
+        if async_llm:
+            if custom_llm_api_func is not None or sagemaker_client is not None:
+                raise ValueError("async_llm cannot be combined with custom_llm_api_func or sagemaker_client.")
+            executor_kwargs = dict(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrency=max_inflight_requests
+            )
+            extractor_executor = AsyncLLMExecutor(extractor_name, api_base=extractor_api_base, **executor_kwargs)
+            self.llm_executors["extractor"] = extractor_executor
+            self.extractor_llm_api_func = partial(extractor_executor, max_new_tokens=extractor_max_new_tokens)
+            if checker_name not in ["nli", "alignscore"]:
+                # an endpoint shared by the extractor and the checker shares its rate limits
+                if (checker_name, checker_api_base) == (extractor_name, extractor_api_base):
+                    checker_executor = extractor_executor
+                else:
+                    checker_executor = AsyncLLMExecutor(checker_name, api_base=checker_api_base, **executor_kwargs)
+                    self.llm_executors["checker"] = checker_executor
+                self.checker_llm_api_func = partial(
+                    checker_executor, max_new_tokens=joint_check_num * 10 + 100 if joint_check else 10
+                )
+            # hand the executor enough prompts at once to keep its requests in flight
+            llm_batch_size_extractor = llm_batch_size_checker = max_inflight_requests * 4
+
         self.extractor = LLMExtractor(
             model=extractor_name, 
-            batch_size=batch_size_extractor,
+            batch_size=llm_batch_size_extractor,
             api_base=extractor_api_base
         )
         if checker_name == "nli":
@@ -82,9 +368,67 @@ class RAGChecker():
         else:
             self.checker = LLMChecker(
                 model=checker_name, 
-                batch_size=batch_size_checker,
+                batch_size=llm_batch_size_checker,
                 api_base=checker_api_base
             )
+
+        # the checker LLM as a batch function of prompts, for the prompts built or scheduled here
+        llm_checker_func = None
+        if checker_name not in ["nli", "alignscore"] and sagemaker_client is None:
+            llm_checker_func = self.checker_llm_api_func or partial(
+                get_model_batch_response, model=checker_name, api_base=checker_api_base, temperature=0,
+                max_new_tokens=joint_check_num * 10 + 100 if joint_check else 10, **kwargs
+            )
+
+        # requests sharing a prefix sent back to back, for the prefix cache of the endpoints
+        self.prefix_schedulers = {}
+        if prefix_cache_ordering:
+            if sagemaker_client is not None:
+                raise ValueError("prefix_cache_ordering cannot be combined with sagemaker_client.")
+            # with the request parameters of refchecker's extractor
+            self.extractor_llm_api_func = self.prefix_schedulers["extractor"] = PrefixScheduler(
+                self.extractor_llm_api_func or partial(
+                    get_model_batch_response, model=extractor_name, api_base=extractor_api_base, temperature=1e-5,
+                    max_new_tokens=extractor_max_new_tokens, **kwargs
+                ),
+                api_base=extractor_api_base
+            )
+            if llm_checker_func is not None:
+                llm_checker_func = self.prefix_schedulers["checker"] = PrefixScheduler(
+                    llm_checker_func, api_base=checker_api_base
+                )
+                self.checker_llm_api_func = llm_checker_func
+
+        # joint prompts sized to a token budget, with the responses checked for parse failures
+        self.joint_grouper = None
+        self.parse_monitor = None
+        if adaptive_joint_check and joint_check and checker_name not in ["nli", "alignscore"]:
+            self.joint_grouper = JointGrouper(joint_check_max_tokens, joint_check_max_num)
+            if llm_checker_func is not None:
+                self.checker_llm_api_func = self.parse_monitor = ParseMonitor(llm_checker_func, self.joint_grouper)
+
+        self.packed_checker = None
+        if packed_checking:
+            if llm_checker_func is None:
+                raise ValueError("packed_checking requires an LLM checker without sagemaker_client.")
+            self.packed_checker = PackedChecker(
+                llm_checker_func, PassagePacker(packed_max_tokens, max_passages=packed_max_passages),
+                batch_size=llm_batch_size_checker
+            )
+
+    def close(self):
+        """Stop the LLM executors and close the caches."""
+        for executor in self.llm_executors.values():
+            executor.close()
+        for cache in [self.claim_cache, self.verdict_cache]:
+            if cache is not None:
+                cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
     
     def extract_claims(self, results: List[RAGResult], extract_type="gt_answer"):
         """
@@ -108,25 +452,78 @@ class RAGChecker():
             texts = [result.response for result in results]
         if not results:
             return
-        questions = [result.query for result in results]
-        
-        logger.info(f"Extracting claims for {extract_type} of {len(results)} RAG results.")
-        extraction_results = self.extractor.extract(
-            batch_responses=texts,
-            batch_questions=questions,
-            max_new_tokens=self.extractor_max_new_tokens,
-            sagemaker_client=self.sagemaker_client,
-            sagemaker_params=self.sagemaker_params,
-            sagemaker_get_response_func=self.sagemaker_get_response_func,
-            custom_llm_api_func=self.custom_llm_api_func,
-            **self.kwargs
-        )
-        claims = [[c.content for c in res.claims] for res in extraction_results]
-        for i, result in enumerate(results):
+
+        # results sharing the same normalized text get their claims from a single extraction
+        if self.deduplicate:
+            grouped = defaultdict(list)
+            for result, text in zip(results, texts):
+                grouped[normalize_text(text)].append(result)
+            groups = list(grouped.values())
+            saved = len(results) - len(groups)
+            if saved > 0:
+                logger.info(f"Deduplication saved {saved} of {len(results)} {extract_type} extractions.")
+                self._count("dedup_saved_extractions", saved)
+        else:
+            groups = [[result] for result in results]
+        heads = [group[0] for group in groups]
+        texts = [result.gt_answer if extract_type == "gt_answer" else result.response for result in heads]
+        questions = [result.query for result in heads]
+
+        cache_keys = None
+        if self.claim_cache is not None:
+            cache_keys = [
+                claim_cache_key(self.extractor_name, self.extractor_max_new_tokens, q, t)
+                for q, t in zip(questions, texts)
+            ]
+            cached = self.claim_cache.get_many(cache_keys)
+            if cached:
+                logger.info(f"Found cached claims for {len(cached)} {extract_type} texts.")
+            misses = []
+            for group, key, text, question in zip(groups, cache_keys, texts, questions):
+                if key in cached:
+                    self._set_claims(group, cached[key], extract_type)
+                else:
+                    misses.append((group, key, text, question))
+            groups = [miss[0] for miss in misses]
+            cache_keys = [miss[1] for miss in misses]
+            texts = [miss[2] for miss in misses]
+            questions = [miss[3] for miss in misses]
+
+        if groups:
+            logger.info(f"Extracting claims for {extract_type} of {len(groups)} RAG results.")
+            self._count("extractor_requests", len(texts))
+            extraction_results = self.extractor.extract(
+                batch_responses=texts,
+                batch_questions=questions,
+                max_new_tokens=self.extractor_max_new_tokens,
+                sagemaker_client=self.sagemaker_client,
+                sagemaker_params=self.sagemaker_params,
+                sagemaker_get_response_func=self.sagemaker_get_response_func,
+                custom_llm_api_func=self.extractor_llm_api_func,
+                **self.kwargs
+            )
+            claims = [[c.content for c in res.claims] for res in extraction_results]
+            for group, group_claims in zip(groups, claims):
+                self._set_claims(group, group_claims, extract_type)
+            if cache_keys is not None:
+                self.claim_cache.set_many(dict(zip(cache_keys, claims)))
+        self._record(results, [f"{extract_type}_claims"])
+
+    @staticmethod
+    def _set_claims(results: List[RAGResult], claims, extract_type):
+        for result in results:
             if extract_type == "gt_answer":
-                result.gt_answer_claims = claims[i]
+                result.gt_answer_claims = list(claims)
             else:
-                result.response_claims = claims[i]
+                result.response_claims = list(claims)
+
+    def _record(self, results: List[RAGResult], fields):
+        if self._journal is not None:
+            self._journal.record(results, fields)
+
+    def _count(self, name, num=1):
+        with self._stats_lock:
+            self.stats[name] += num
 
     def check_claims(self, results: RAGResults, check_type="answer2response"):
         """
@@ -140,41 +537,220 @@ class RAGChecker():
             Type of checking, either 'answer2response', 'response2answer', 'retrieved2answer',
             or 'retrieved2response'. Default: 'answer2response'.
         """
+        if check_type not in CHECK_CLAIM_SOURCE:
+            raise ValueError(f"Invalid check_type: {check_type}")
+        results = [ret for ret in results.results if self._needs_check(ret, check_type)]
+        self.extract_claims(results, extract_type=CHECK_CLAIM_SOURCE[check_type])
+        self._check_results(results, check_type)
+
+    def _check_results(self, results: List[RAGResult], check_type):
+        """Run the checker for results whose claims have already been extracted."""
+        if not results:
+            return
         match check_type:
             case "answer2response":
-                results = [ret for ret in results.results if ret.answer2response is None]
-                self.extract_claims(results, extract_type="response")
                 claims = [ret.response_claims for ret in results]
                 references = [ret.gt_answer for ret in results]
                 merge_psg = True
             case "response2answer":
-                results = [ret for ret in results.results if ret.response2answer is None]
-                self.extract_claims(results, extract_type="gt_answer")
                 claims = [ret.gt_answer_claims for ret in results]
                 references = [ret.response for ret in results]
                 merge_psg = True
             case "retrieved2answer":
-                results = [ret for ret in results.results if ret.retrieved2answer is None]
-                self.extract_claims(results, extract_type="gt_answer")
                 claims = [ret.gt_answer_claims for ret in results]
                 references = [[doc.text for doc in ret.retrieved_context] for ret in results]
                 merge_psg = False
             case "retrieved2response":
-                results = [ret for ret in results.results if ret.retrieved2response is None]
-                self.extract_claims(results, extract_type="response")
                 claims = [ret.response_claims for ret in results]
                 references = [[doc.text for doc in ret.retrieved_context] for ret in results]
                 merge_psg = False
             case _:
                 raise ValueError(f"Invalid check_type: {check_type}")
-        if not results:
-            return
 
         logger.info(f"Checking {check_type} for {len(results)} RAG results.")
-        checking_results = self.checker.check(
+        # partial checking results (lazily checked or carried over) are completed, not redone
+        previous = [getattr(ret, check_type) for ret in results]
+        checking_results, tiers = self._check(
+            claims=claims,
+            references=references,
+            questions=[ret.query for ret in results],
+            merge_psg=merge_psg,
+            lazy=check_type in self._lazy_check_types,
+            previous=previous if any(labels is not None for labels in previous) else None
+        )
+        for result, labels in zip(results, checking_results):
+            setattr(result, check_type, labels)
+        if tiers is None:
+            self._record(results, [check_type])
+        else:
+            for result, result_tiers in zip(results, tiers):
+                result.verdict_tiers = {**(result.verdict_tiers or {}), check_type: result_tiers}
+            self._record(results, [check_type, "verdict_tiers"])
+
+    def _set_lazy_check_types(self, ret_metrics):
+        # passage-level checks can stop at the first entailing passage when every
+        # requested metric only takes the maximum over passages
+        self._lazy_check_types = set()
+        if self.lazy_checking:
+            self._lazy_check_types = {
+                check_type for check_type, lazy_metrics in LAZY_CHECK_METRICS.items()
+                if all(check_type not in METRIC_REQUIREMENTS[m] or m in lazy_metrics for m in ret_metrics)
+            }
+
+    def _needs_check(self, result: RAGResult, check_type):
+        checking_results = getattr(result, check_type)
+        if checking_results is None:
+            return True
+        # a lazily checked matrix has to be completed for metrics using every passage,
+        # and cells invalidated by incremental evaluation always have to be checked
+        if check_type in self._lazy_check_types:
+            return not is_decided(checking_results)
+        return not is_complete(checking_results)
+
+    def _pending_results(self, results: RAGResults, requirements):
+        return {
+            check_type: [ret for ret in results.results if self._needs_check(ret, check_type)]
+            for check_type in requirements
+        }
+
+    @staticmethod
+    def _claim_targets(pending, extract_type):
+        """Results pending for any check type over the claims of `extract_type`, deduplicated."""
+        targets = {
+            id(ret): ret
+            for check_type, rets in pending.items()
+            if CHECK_CLAIM_SOURCE[check_type] == extract_type
+            for ret in rets
+        }
+        return list(targets.values())
+
+    @staticmethod
+    def _save(results: RAGResults, save_path, compact=False, shared_passages=False):
+        if save_path is None:
+            return
+        if is_jsonl(save_path):
+            save_results(results, save_path, compact=compact, shared_passages=shared_passages)
+            return
+        tmp_path = save_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            if compact or shared_passages:
+                f.write(dumps_results(results, compact=compact, shared_passages=shared_passages))
+            else:
+                f.write(dumps_results(results, indent=2))
+        os.replace(tmp_path, save_path)
+
+    def _check_concurrently(self, pending, progress: ProgressTracker):
+        """
+        Compute several types of checking results at once.
+
+        Claims are extracted once for both the ground truth answers and the responses,
+        then the pending results of every check type are split into chunks of
+        `batch_size_checker` results and dispatched round-robin to a thread pool of
+        `max_concurrency` workers, so the wall-clock time is bounded by the largest
+        check type instead of the sum of all of them.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            extractions = []
+            for extract_type in ["gt_answer", "response"]:
+                targets = self._claim_targets(pending, extract_type)
+                if targets:
+                    extractions.append(pool.submit(self.extract_claims, targets, extract_type))
+            for future in extractions:
+                future.result()
+
+            streams = [
+                [
+                    (check_type, rets[i:i + self.batch_size_checker])
+                    for i in range(0, len(rets), self.batch_size_checker)
+                ]
+                for check_type, rets in pending.items()
+            ]
+            futures = {}
+            for round_chunks in zip_longest(*streams):
+                for chunk_info in round_chunks:
+                    if chunk_info is not None:
+                        check_type, chunk = chunk_info
+                        futures[pool.submit(self._check_results, chunk, check_type)] = chunk_info
+            for future in as_completed(futures):
+                future.result()
+                check_type, chunk = futures[future]
+                progress.update("check", check_type, len(chunk))
+
+    def _check_streaming(self, pending, progress: ProgressTracker):
+        """
+        Pipeline claim extraction and checking without a global barrier.
+
+        Claims are extracted in chunks of `batch_size_extractor` results. As soon as a
+        chunk is extracted, it is handed to the checking stage for every check type over
+        these claims, so a slow extraction only delays its own chunk. At most
+        `queue_size` checking batches wait between the two stages, which throttles the
+        extraction when the checker falls behind. Both stages run `max_concurrency` workers.
+        """
+        pending_ids = {check_type: {id(ret) for ret in rets} for check_type, rets in pending.items()}
+        extract_chunks = []
+        for extract_type in ["gt_answer", "response"]:
+            targets = self._claim_targets(pending, extract_type)
+            progress.set_total("extract", extract_type, len(targets))
+            extract_chunks.extend(
+                (extract_type, targets[i:i + self.batch_size_extractor])
+                for i in range(0, len(targets), self.batch_size_extractor)
+            )
+        slots = threading.BoundedSemaphore(self.queue_size)
+        check_futures = []
+        futures_lock = threading.Lock()
+
+        def check(check_type, chunk):
+            try:
+                self._check_results(chunk, check_type)
+            finally:
+                slots.release()
+            progress.update("check", check_type, len(chunk))
+
+        def extract(extract_type, chunk):
+            self.extract_claims(chunk, extract_type=extract_type)
+            progress.update("extract", extract_type, len(chunk))
+            for check_type in pending:
+                if CHECK_CLAIM_SOURCE[check_type] != extract_type:
+                    continue
+                to_check = [ret for ret in chunk if id(ret) in pending_ids[check_type]]
+                if to_check:
+                    slots.acquire()  # blocks while the checking stage is `queue_size` batches behind
+                    future = check_pool.submit(check, check_type, to_check)
+                    with futures_lock:
+                        check_futures.append(future)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as check_pool, \
+                ThreadPoolExecutor(max_workers=self.max_concurrency) as extract_pool:
+            extract_futures = [
+                extract_pool.submit(extract, extract_type, chunk)
+                for extract_type, chunk in extract_chunks
+            ]
+            for future in as_completed(extract_futures):
+                future.result()
+            for future in as_completed(check_futures):
+                future.result()
+
+    def _run_checker(self, claims, references, questions, merge_psg):
+        if "checker" in self.prefix_schedulers and len(claims) > 1:
+            # items with the same question and reference in a row, so their prompts are sent back to back
+            order = sorted(range(len(claims)), key=lambda i: (questions[i] or "", references[i]))
+            results = self._dispatch_checker(
+                [claims[i] for i in order], [references[i] for i in order], [questions[i] for i in order], merge_psg
+            )
+            labels = [None] * len(claims)
+            for i, item_labels in zip(order, results):
+                labels[i] = item_labels
+            return labels
+        return self._dispatch_checker(claims, references, questions, merge_psg)
+
+    def _dispatch_checker(self, claims, references, questions, merge_psg):
+        if self.joint_grouper is not None and merge_psg:
+            return self._run_checker_grouped(claims, references, questions)
+        self._count("checker_requests", self._num_checker_prompts(claims, references))
+        return self.checker.check(
             batch_claims=claims,
             batch_references=references,
-            batch_questions=[ret.query for ret in results],
+            batch_questions=questions,
             max_reference_segment_length=0,
             merge_psg=merge_psg,
             is_joint=self.joint_check,
@@ -182,20 +758,370 @@ class RAGChecker():
             sagemaker_client=self.sagemaker_client,
             sagemaker_params=self.sagemaker_params,
             sagemaker_get_response_func=self.sagemaker_get_response_func,
-            custom_llm_api_func=self.custom_llm_api_func,
+            custom_llm_api_func=self.checker_llm_api_func,
             **self.kwargs
         )
-        for i, result in enumerate(results):
-            if check_type == "answer2response":
-                result.answer2response = checking_results[i]
-            elif check_type == "response2answer":
-                result.response2answer = checking_results[i]
-            elif check_type == "retrieved2answer":
-                result.retrieved2answer = checking_results[i]
+
+    def _num_checker_prompts(self, claims, references):
+        """
+        Prompts sent by the checker for request items: one per passage of the reference
+        and group of `joint_check_num` claims (or single claim without joint checking).
+        """
+        group_size = self.joint_check_num if self.joint_check else 1
+        return sum(
+            (1 if isinstance(reference, str) else len(reference)) * -(-len(item_claims) // group_size)
+            for item_claims, reference in zip(claims, references)
+        )
+
+    def _run_checker_grouped(self, claims, references, questions):
+        """
+        Check each item in joint prompts sized by the joint grouper, one group of claims
+        per request item. Groups whose response could not be parsed are split and checked
+        again, down to single claims.
+        """
+        self._count("fixed_joint_check_prompts", sum(-(-len(c) // self.joint_check_num) for c in claims))
+        labels = [[None] * len(item_claims) for item_claims in claims]
+        pending = [(i, list(range(len(item_claims)))) for i, item_claims in enumerate(claims) if item_claims]
+        limit = None
+        while pending:
+            groups = [
+                (i, [indices[g] for g in group])
+                for i, indices in pending
+                for group in self.joint_grouper.split(
+                    [claims[i][j] for j in indices], references[i], questions[i], limit
+                )
+            ]
+            log = self.parse_monitor.open_log() if self.parse_monitor is not None else None
+            try:
+                results = self.checker.check(
+                    batch_claims=[[claims[i][j] for j in group] for i, group in groups],
+                    batch_references=[references[i] for i, _ in groups],
+                    batch_questions=[questions[i] for i, _ in groups],
+                    max_reference_segment_length=0,
+                    merge_psg=True,
+                    is_joint=True,
+                    joint_check_num=max(len(group) for _, group in groups),
+                    sagemaker_client=self.sagemaker_client,
+                    sagemaker_params=self.sagemaker_params,
+                    sagemaker_get_response_func=self.sagemaker_get_response_func,
+                    custom_llm_api_func=self.checker_llm_api_func,
+                    **self.kwargs
+                )
+            finally:
+                if self.parse_monitor is not None:
+                    self.parse_monitor.close_log()
+            self._count("checker_requests", len(groups))
+            self._count("joint_check_prompts", len(groups))
+            # one prompt per group, so the log lines up with the groups when complete
+            failed = log if log is not None and len(log) == len(groups) else [False] * len(groups)
+            pending = []
+            for (i, group), group_labels, group_failed in zip(groups, results, failed):
+                if group_failed and len(group) > 1:
+                    pending.append((i, group))
+                    continue
+                for j, label in zip(group, group_labels):
+                    labels[i][j] = label
+            if pending:
+                self._count("joint_parse_failures", len(pending))
+                limit = max(1, max(len(group) for _, group in pending) // 2)
+        return labels
+
+    def _check(self, claims, references, questions, merge_psg, lazy=False, previous=None):
+        """
+        Check claims against references, deciding every (claim, reference) pair by the
+        cheapest enabled stage: the verdict cache, the prefilter, deduplication, the
+        local tier of the cascade, and finally the checker.
+
+        With `merge_psg=True` each reference is a single text and the output of an item
+        is one label per claim. Otherwise each reference is a list of passages and the
+        output of an item is a [claim, passage] matrix of labels. With `lazy=True` such a
+        matrix is only filled until the first entailing passage of every claim, see
+        `_check_lazily`. `previous` holds partial checking results of every item (or
+        None), whose decided cells are kept and not checked again.
+
+        Returns
+        -------
+        labels : list
+            Checking results of every item.
+        tiers : list | None
+            Same shape as `labels`, the stage which decided each verdict when the
+            cascade is enabled, otherwise None.
+        """
+        lazy = lazy and not merge_psg
+        use_prefilter = self.prefilter is not None and not merge_psg
+        if self.verdict_cache is None and not self.deduplicate and not use_prefilter \
+                and self.cascade is None and not lazy and not self.group_testing and previous is None \
+                and self.joint_grouper is None and (self.packed_checker is None or merge_psg):
+            return self._run_checker(claims, references, questions, merge_psg), None
+
+        grid = VerdictGrid(claims, references, merge_psg, track_tiers=self.cascade is not None)
+        if previous is not None:
+            self._count("reused_verdicts", len(grid.preset(previous)))
+        if lazy:
+            self._check_lazily(grid, questions)
+        else:
+            self._decide(grid, [cell for cell in grid.cells() if grid.label(cell) is None], questions)
+        return grid.labels, grid.tiers
+
+    def _check_lazily(self, grid: VerdictGrid, questions):
+        """
+        Fill [claim, passage] matrices in retrieval-rank order, stopping for each claim
+        at its first entailing passage. This is enough for metrics reducing the matrix
+        with a maximum over passages, such as claim recall. The passages are checked in
+        windows of doubling size (1, 1, 2, 4, ...) so that the number of rounds grows
+        logarithmically with the number of passages. Cells left out are marked UNCHECKED,
+        and claims with an entailing passage among the preset cells are not checked.
+        """
+        open_claims = {(grid.item(cell), cell[1]) for cell in grid.cells()}
+        open_claims -= {(grid.item(cell), cell[1]) for cell in grid.cells() if grid.label(cell) == "Entailment"}
+        num_passages = max((k + 1 for _, k, _ in grid.units), default=0)
+        start, width = 0, 1
+        while open_claims and start < num_passages:
+            window = range(start, start + width)
+            cells = [
+                cell for cell in grid.cells()
+                if grid.units[cell[0]][1] in window and (grid.item(cell), cell[1]) in open_claims
+                and grid.label(cell) is None
+            ]
+            self._decide(grid, cells, questions)
+            for cell in cells:
+                if grid.label(cell) == "Entailment":
+                    open_claims.discard((grid.item(cell), cell[1]))
+            start += width
+            width = start
+        unchecked = [cell for cell in grid.cells() if grid.label(cell) is None]
+        for cell in unchecked:
+            grid.set(cell, UNCHECKED)
+        num_cells = sum(1 for _ in grid.cells())
+        logger.info(f"Lazy checking skipped {len(unchecked)} of {num_cells} (claim, passage) pairs.")
+        self._count("lazy_skipped", len(unchecked))
+
+    def _verdict_strategy(self, merge_psg):
+        """Strategy of the checker verdicts in the verdict cache keys, None for pairs checked on their own."""
+        strategies = []
+        if self.group_testing and not merge_psg:
+            # group testing infers "Neutral" for whole passage groups
+            strategies.append("group_testing")
+        elif self.packed_checker is not None and not merge_psg:
+            # packed prompts judge each passage among the other passages of the result
+            strategies.append("packed")
+        if self.joint_grouper is not None:
+            # joint prompts of up to joint_check_max_num claims instead of joint_check_num
+            strategies.append("adaptive_joint")
+        return "+".join(strategies) or None
+
+    def _decide(self, grid: VerdictGrid, cells, questions):
+        """Decide the verdicts of the given cells of `grid` through the enabled stages."""
+        merge_psg = grid.merge_psg
+        strategy = self._verdict_strategy(merge_psg)
+        keys = {
+            cell: verdict_cache_key(
+                self.checker_name, questions[grid.item(cell)], grid.claim(cell), grid.reference(cell),
+                merge_psg, self.joint_check, self.joint_check_num, strategy
+            )
+            for cell in cells
+        }
+        pending = list(keys)
+        if not pending:
+            return
+
+        if self.verdict_cache is not None:
+            cached = self.verdict_cache.get_many(keys.values())
+            for cell in pending:
+                if keys[cell] in cached:
+                    grid.set(cell, cached[keys[cell]], "cache")
+            pending = [cell for cell in pending if keys[cell] not in cached]
+            logger.info(f"Verdict cache: {len(keys) - len(pending)} hits out of {len(keys)} (claim, reference) pairs.")
+
+        # cheaply score the (claim, passage) pairs and skip the unrelated ones
+        scored = {}  # cell -> (score, audited) of the pairs kept by the prefilter
+        if self.prefilter is not None and not merge_psg and pending:
+            skip, audit, scores = self.prefilter.select(
+                [(grid.claim(cell), grid.reference(cell)) for cell in pending],
+                [grid.context(cell) for cell in pending]
+            )
+            for cell, skipped in zip(pending, skip):
+                if skipped:
+                    grid.set(cell, "Neutral", "prefilter")
+            scored = {
+                cell: (score, bool(a)) for cell, skipped, a, score in zip(pending, skip, audit, scores) if not skipped
+            }
+            logger.info(
+                f"Prefilter skipped {int(skip.sum())} of {len(pending)} (claim, passage) pairs, "
+                f"auditing {int(audit.sum())}."
+            )
+            pending = [cell for cell, skipped in zip(pending, skip) if not skipped]
+
+        # only the first cell of every distinct pair is decided, the others copy its verdict
+        duplicates = []
+        if self.deduplicate:
+            first_cells = {}
+            for cell in pending:
+                if keys[cell] in first_cells:
+                    duplicates.append(cell)
+                else:
+                    first_cells[keys[cell]] = cell
+            pending = list(first_cells.values())
+            if duplicates:
+                logger.info(f"Deduplication saved {len(duplicates)} of {len(keys)} (claim, reference) checks.")
+                self._count("dedup_saved_checks", len(duplicates))
+
+        verdicts = {}  # key -> (label, tier) of the pairs decided below
+        to_check = pending
+        if self.cascade is not None and to_check:
+            to_check = self._cascade(grid, to_check, keys, verdicts)
+
+        if to_check:
+            checked = self._check_cells(grid, to_check, questions)
+            for cell, label in zip(to_check, checked):
+                verdicts[keys[cell]] = (label, "checker")
+            if self.verdict_cache is not None:
+                self.verdict_cache.set_many({keys[cell]: label for cell, label in zip(to_check, checked)})
+
+        for cell in pending + duplicates:
+            grid.set(cell, *verdicts[keys[cell]])
+        if scored:
+            self.prefilter.record(
+                [score for score, _ in scored.values()],
+                [verdicts[keys[cell]][0] for cell in scored],
+                [a for _, a in scored.values()]
+            )
+
+    def _check_cells(self, grid: VerdictGrid, cells, questions):
+        """Send cells to the checker, one request item per unit, and return their labels in order."""
+        if self.group_testing and not grid.merge_psg:
+            return self._group_test(grid, cells, questions)
+        if self.packed_checker is not None and not grid.merge_psg:
+            return self._check_packed(grid, cells, questions)
+        return self._check_units(grid, cells, questions)
+
+    def _check_units(self, grid: VerdictGrid, cells, questions):
+        groups = grid.group_by_unit(cells)
+        results = self._run_checker(
+            claims=[[grid.claims[grid.units[u][0]][j] for j in indices] for u, indices in groups],
+            references=[grid.units[u][2] for u, _ in groups],
+            questions=[questions[grid.units[u][0]] for u, _ in groups],
+            merge_psg=True
+        )
+        labels = {}
+        for (u, indices), unit_labels in zip(groups, results):
+            labels.update(((u, j), label) for j, label in zip(indices, unit_labels))
+        return [labels[cell] for cell in cells]
+
+    def _check_packed(self, grid: VerdictGrid, cells, questions):
+        """
+        Decide (claim, passage) cells in packed prompts, the passages of each item checked
+        together against their claims. Cells missing from the responses are checked again
+        one unit at a time.
+        """
+        items = {}  # item index -> unit index -> claim indices
+        for u, j in cells:
+            items.setdefault(grid.item((u, j)), {}).setdefault(u, []).append(j)
+        units = [list(item_units) for item_units in items.values()]
+        verdicts, num_prompts = self.packed_checker.check([
+            (grid.claims[i], [(grid.units[u][2], item_units[u]) for u in item_units], questions[i])
+            for i, item_units in items.items()
+        ])
+        labels = {}
+        for item_units, item_verdicts in zip(units, verdicts):
+            labels.update(((item_units[p], j), label) for (j, p), label in item_verdicts.items())
+        missing = [cell for cell in cells if cell not in labels]
+        if missing:
+            labels.update(zip(missing, self._check_units(grid, missing, questions)))
+
+        # prompts of the per-passage checking, one per unit and group of claims
+        per_unit = Counter(u for u, _ in cells).values()
+        group_size = self.joint_check_num if self.joint_check else 1
+        self._count("unpacked_prompts", sum(-(-n // group_size) for n in per_unit))
+        self._count("packed_prompts", num_prompts)
+        self._count("packed_pairs", len(cells))
+        self._count("packed_fallback_pairs", len(missing))
+        self._count("checker_requests", num_prompts)
+        return [labels[cell] for cell in cells]
+
+    def _group_test(self, grid: VerdictGrid, cells, questions):
+        """
+        Decide (claim, passage) cells by group testing: each claim is first checked
+        against the merged passages of its item. If they neither entail nor contradict it,
+        every passage is labelled "Neutral" at once. Otherwise the passages are bisected
+        and each half is tested again, down to single passages. All tests of a round go to the checker
+        in one batch, with the claims tested against the same passages in one item.
+        Passages whose merged text exceeds `group_testing_max_tokens` start in
+        separate groups.
+        """
+        tests = defaultdict(list)  # (item, passage units) -> claim indices
+        for (i, j), units in groupby(sorted(cells, key=lambda c: (grid.item(c), c[1], c[0])),
+                                     key=lambda c: (grid.item(c), c[1])):
+            for group in self._passage_groups(grid, [u for u, _ in units]):
+                tests[i, group].append(j)
+
+        labels = {}
+        num_tests = 0
+        while tests:
+            groups = list(tests.items())
+            results = self._run_checker(
+                claims=[[grid.claims[i][j] for j in indices] for (i, _), indices in groups],
+                references=["\n\n".join(grid.units[u][2] for u in units) for (_, units), _ in groups],
+                questions=[questions[i] for (i, _), _ in groups],
+                merge_psg=True
+            )
+            num_tests += sum(len(indices) for _, indices in groups)
+            tests = defaultdict(list)
+            for ((i, units), indices), group_labels in zip(groups, results):
+                for j, label in zip(indices, group_labels):
+                    if len(units) == 1:
+                        labels[units[0], j] = label
+                    elif label == "Neutral":
+                        labels.update(((u, j), "Neutral") for u in units)
+                    else:
+                        half = (len(units) + 1) // 2
+                        tests[i, units[:half]].append(j)
+                        tests[i, units[half:]].append(j)
+        logger.info(f"Group testing decided {len(cells)} (claim, passage) pairs with {num_tests} checks.")
+        self._count("group_tests", num_tests)
+        return [labels[cell] for cell in cells]
+
+    def _passage_groups(self, grid: VerdictGrid, units):
+        """Consecutive groups of passage units whose merged text fits `group_testing_max_tokens`."""
+        groups, group, tokens = [], [], 0
+        for u in units:
+            size = estimate_tokens(grid.units[u][2])
+            if group and tokens + size > self.group_testing_max_tokens:
+                groups.append(tuple(group))
+                group, tokens = [], 0
+            group.append(u)
+            tokens += size
+        if group:
+            groups.append(tuple(group))
+        return groups
+
+    def _cascade(self, grid: VerdictGrid, cells, keys, verdicts):
+        """
+        Decide the pairs the local checker is confident about, i.e. whose probability of
+        entailment is outside `cascade_band`, and return the others for the checker.
+        """
+        labels, p_entailment = self.cascade.predict(
+            [grid.claim(cell) for cell in cells], [grid.reference(cell) for cell in cells]
+        )
+        low, high = self.cascade_band
+        escalated = []
+        for cell, label, p in zip(cells, labels, p_entailment):
+            if low < p < high:
+                escalated.append(cell)
             else:
-                result.retrieved2response = checking_results[i]
+                verdicts[keys[cell]] = ("Entailment" if p >= high else label, "local")
+        logger.info(
+            f"Cascade decided {len(cells) - len(escalated)} of {len(cells)} (claim, reference) pairs "
+            f"locally, escalating {len(escalated)} to the checker."
+        )
+        self._count("cascade_local", len(cells) - len(escalated))
+        self._count("cascade_escalated", len(escalated))
+        return escalated
         
-    def evaluate(self, results: RAGResults, metrics=all_metrics, save_path=None):
+    def evaluate(
+        self, results: RAGResults, metrics=all_metrics, save_path=None, progress_callback=None, resume=False,
+        previous=None
+    ):
         """
         Evaluate the RAG results.
 
@@ -206,48 +1132,217 @@ class RAGChecker():
         metrics : str | list[str], optional
             List of metrics to compute. Default: 'all'.
         save_path : str, optional
-            Path to save the results. Default: None. Will perform progress checkpointing if provided.
+            Path to save the results. Default: None. If provided, the intermediate results
+            of every finished batch are appended to the journal `<save_path>.journal.jsonl`,
+            which is removed once the results are saved at the end of the evaluation.
+        progress_callback : callable, optional
+            Called as `progress_callback(stage, name, done, total)` each time a batch of RAG
+            results finishes a stage, where `stage` is 'extract' or 'check' and `name` is the
+            extraction or check type. Default: None.
+        resume : bool, optional
+            Restore the intermediate results recorded in the journal of `save_path` by an
+            interrupted run, so that only the unfinished work is redone. Default: False.
+        previous : str | Iterable[RAGResult], optional
+            Output of a previous evaluation (a path or evaluated RAG results) to evaluate
+            incrementally against: every claim list and verdict whose inputs are unchanged,
+            by query id and content hashes, is carried over, and only the invalidated
+            verdicts are checked, see `incremental.carry_over`. Default: None.
         """ 
         # identify the metrics and required intermediate results
-        if isinstance(metrics, str):
-            metrics = [metrics]
-        ret_metrics = set()
-        requirements = set()
-        for metric in metrics:
-            if metric not in METRIC_REQUIREMENTS:
-                if metric not in METRIC_GROUP_MAP:
-                    raise ValueError(f"Invalid metric: {metric}.")
-                ret_metrics.update(METRIC_GROUP_MAP[metric])
-            else:
-                ret_metrics.add(metric)
-        for metric in ret_metrics:
-            requirements.update(METRIC_REQUIREMENTS[metric])
+        ret_metrics, requirements = resolve_metrics(metrics)
+        self._set_lazy_check_types(ret_metrics)
         
-        # compute the required intermediate results
-        for requirement in requirements:
-            self.check_claims(results, check_type=requirement)
-            if save_path is not None:
-                with open(save_path, "w") as f:
-                    f.write(results.to_json(indent=2))
-
-        # compute the metrics
-        for metric in ret_metrics:
-            for result in results.results:
-                METRIC_FUNC_MAP[metric](result)
+        # compute the required intermediate results, journaling them for resumption
+        self.stats.clear()
+        if self.prefilter is not None:
+            self.prefilter.reset()
+        for scheduler in self.prefix_schedulers.values():
+            scheduler.reset()
+        journal = None
+        if save_path is not None:
+            if resume:
+                Journal.replay(journal_path(save_path), results)
+            journal = self._journal = Journal(journal_path(save_path), results, resume=resume)
+        if previous is not None:
+            report = carry_over(self._previous_index(previous), results, requirements)
+            self.stats.update(report)
+            logger.info(f"Incremental evaluation: {format_report(report, requirements)}.")
+        try:
+            pending = self._pending_results(results, requirements)
+            progress = ProgressTracker(callback=progress_callback)
+            for check_type, rets in pending.items():
+                progress.set_total("check", check_type, len(rets))
+            if self.streaming:
+                self._check_streaming(pending, progress)
+            elif self.max_concurrency > 1:
+                self._check_concurrently(pending, progress)
+            else:
+                for requirement in requirements:
+                    self.check_claims(results, check_type=requirement)
+                    progress.update("check", requirement, len(pending[requirement]))
+        finally:
+            if journal is not None:
+                journal.close()
+            self._journal = None
+
+        compute_metrics(results, ret_metrics)
         
-        # aggregate the metrics
+        if self.stats:
+            logger.info(f"Evaluation stats: {dict(self.stats)}")
+        if self.prefilter is not None:
+            logger.info(f"Prefilter: {self.prefilter.report()}")
+        for name, executor in self.llm_executors.items():
+            logger.info(f"Throughput of the {name} LLM executor: {executor.report()}")
+        for name, scheduler in self.prefix_schedulers.items():
+            logger.info(f"Prefix cache ordering of the {name} requests: {scheduler.report()}")
+        if self.packed_checker is not None and self.stats["packed_pairs"]:
+            logger.info(
+                f"Packed checking: {self.stats['packed_prompts']} prompts for {self.stats['packed_pairs']} "
+                f"(claim, passage) pairs against {self.stats['unpacked_prompts']} unpacked, "
+                f"{self.stats['packed_fallback_pairs']} pairs checked again passage by passage."
+            )
+        if self.joint_grouper is not None:
+            logger.info(
+                f"Adaptive joint checking: {self.stats['joint_check_prompts']} prompts against "
+                f"{self.stats['fixed_joint_check_prompts']} with joint_check_num={self.joint_check_num}, "
+                f"{self.stats['joint_parse_failures']} parse failures, current group limit {self.joint_grouper.limit}."
+            )
+
+        # save the results, the journal is no longer needed once they are written
+        self._save(results, save_path, compact=self.compact_output, shared_passages=self.shared_passages)
+        if journal is not None:
+            os.remove(journal.path)
+
+        return results.metrics
+
+    @staticmethod
+    def _previous_index(previous) -> Dict[str, PreviousResult]:
+        if isinstance(previous, dict):
+            return previous
+        if isinstance(previous, str):
+            previous = iter_results(previous) if is_jsonl(previous) else load_results(previous).results
+        elif isinstance(previous, RAGResults):
+            previous = previous.results
+        return index_previous(previous)
+
+    def evaluate_stream(
+        self,
+        results: str | Iterable[RAGResult],
+        output_path: str,
+        metrics=all_metrics,
+        window_size=1000,
+        resume=False,
+        previous=None
+    ):
+        """
+        Evaluate RAG results from a JSONL file or an iterable in windows of bounded size,
+        so that memory does not grow with the dataset and evaluation starts before the
+        input is fully read. The next window is read while the current one is evaluated.
+
+        Parameters
+        ----------
+        results : str | Iterable[RAGResult]
+            Path to a JSONL file (optionally `.jsonl.zst`) or an iterable of RAG results.
+        output_path : str
+            Path to the JSONL output, one evaluated RAG result per line. The dataset-level
+            metrics are saved next to it as `<output_path>.metrics.json`. The output is
+            written to a partial file, renamed once the evaluation is finished.
+        metrics : str | list[str], optional
+            List of metrics to compute. Default: 'all'.
+        window_size : int, optional
+            Number of RAG results evaluated together. Default: 1000.
+        resume : bool, optional
+            Keep the results of the partial file of an interrupted run and skip them in
+            the input. Default: False.
+        previous : str | Iterable[RAGResult], optional
+            Output of a previous evaluation to evaluate incrementally against, see
+            `evaluate`. Only the input hashes and intermediate results of the previous
+            output are kept in memory. Default: None.
+
+        Returns
+        -------
+        dict
+            Dataset-level metrics, in the same format as `RAGResults.metrics`.
+        """
+        ret_metrics, _ = resolve_metrics(metrics)
+        if previous is not None:
+            previous = self._previous_index(previous)
+        if isinstance(results, str):
+            results = iter_results(results)
+        ext = ".jsonl.zst" if output_path.endswith(".zst") else ".jsonl"
+        partial_path = output_path[:-len(ext)] + ".partial" + ext
+
+        # per-metric partial sums of every window, summed exactly at the end
+        sums = defaultdict(list)
+        num_results = 0
+
+        def accumulate(window: List[RAGResult]):
+            nonlocal num_results
+            for metric in ret_metrics:
+                sums[metric].append(math.fsum(result.metrics[metric] for result in window))
+            num_results += len(window)
+
+        writer_kwargs = dict(compact=self.compact_output, shared_passages=self.shared_passages)
+        previous_path = output_path[:-len(ext)] + ".previous" + ext
+        if resume and os.path.exists(partial_path):
+            # copy the complete records of the partial output, dropping a truncated tail
+            os.replace(partial_path, previous_path)
+            writer = ResultsWriter(partial_path, **writer_kwargs)
+            for window in _prefetch_windows(_complete_results(previous_path), window_size):
+                writer.write(window)
+                accumulate(window)
+            os.remove(previous_path)
+            results = islice(results, num_results, None)
+            logger.info(f"Resuming after {num_results} RAG results evaluated in {partial_path}.")
+        else:
+            writer = ResultsWriter(partial_path, **writer_kwargs)
+
+        with writer:
+            for window in _prefetch_windows(results, window_size):
+                window_results = RAGResults(results=window)
+                self.evaluate(window_results, metrics=metrics, previous=previous)
+                writer.write(window)
+                accumulate(window)
+                logger.info(f"Evaluated {num_results} RAG results.")
+
+        aggregated = RAGResults().metrics
         for group, group_metrics in METRIC_GROUP_MAP.items():
             if group == all_metrics:
                 continue
             for metric in group_metrics:
-                if metric in ret_metrics:
-                    results.metrics[group][metric] = round(np.mean(
-                        [result.metrics[metric] for result in results.results]
-                    ) * 100, 1)
-        
-        # save the results            
-        if save_path is not None:
-                with open(save_path, "w") as f:
-                    f.write(results.to_json(indent=2))
+                if metric in ret_metrics and num_results > 0:
+                    aggregated[group][metric] = round(math.fsum(sums[metric]) / num_results * 100, 1)
+        os.replace(partial_path, output_path)
+        with open(metrics_path(output_path), "w") as f:
+            json.dump(aggregated, f, indent=2)
+        return aggregated
+
+
+def _complete_results(path: str):
+    """Iterate over the RAG results of a JSONL file up to its first broken record."""
+    try:
+        yield from iter_results(path)
+    except Exception as e:
+        logger.warning(f"Stopped reading {path} at a broken record: {e}")
+
+
+def _prefetch_windows(items: Iterable, window_size: int):
+    """Yield lists of `window_size` items, reading the next window in a background thread."""
+    windows = queue.Queue(maxsize=1)
+    done = object()
+
+    def read():
+        try:
+            iterator = iter(items)
+            while window := list(islice(iterator, window_size)):
+                windows.put(window)
+        except BaseException as e:
+            windows.put(e)
+            return
+        windows.put(done)
 
-        return results.metrics
\ No newline at end of file
+    threading.Thread(target=read, daemon=True).start()
+    while (window := windows.get()) is not done:
+        if isinstance(window, BaseException):
+            raise window
+        yield window
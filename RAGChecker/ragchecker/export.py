@@ -0,0 +1,184 @@
+import os
+from typing import Dict
+
+import numpy as np
+
+from .container import RAGResults
+from .columnar import VerdictColumn
+from .encoding import LABELS, LABEL_CODES, decode_verdicts
+from .prefilter import claim_text
+from .metrics import METRIC_GROUP_MAP, all_metrics
+
+
+TABLES = ["results", "claims", "verdicts"]
+
+# checks of the claims of each source, against the other answer and against the passages
+CLAIM_CHECKS = {
+    "response": ("answer2response", "retrieved2response"),
+    "gt_answer": ("response2answer", "retrieved2answer"),
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Exporting tables requires pyarrow, install it with `pip install pyarrow`.")
+    return pyarrow
+
+
+def _label_array(pa, codes: np.ndarray):
+    """Dictionary-encoded labels from label codes, -1 for missing labels."""
+    return pa.DictionaryArray.from_arrays(
+        pa.array(codes, type=pa.int8(), mask=codes < 0), pa.array(LABELS)
+    )
+
+
+def build_tables(results: RAGResults) -> Dict:
+    """
+    Build the claim-level tables of evaluated RAG results as pyarrow tables, with
+    dictionary-encoded strings:
+
+    - "results": one row per RAG result, with its metrics.
+    - "claims": one row per claim of the response or the ground truth answer, with its
+      text, its verdict against the other answer and the number of entailing passages.
+    - "verdicts": one row per (claim, passage) verdict of retrieved2response and
+      retrieved2answer, with the doc id of the passage.
+
+    Rows refer to RAG results by `result_idx`, their position in `results`, and to
+    claims by (`result_idx`, `source`, `claim_idx`). Labels other than those of
+    `encoding.LABELS` are exported as "Neutral".
+    """
+    pa = _import_pyarrow()
+    rets = results.results
+    query_ids = pa.array([ret.query_id for ret in rets], type=pa.string()).dictionary_encode()
+    num_passages = np.array([len(ret.retrieved_context or []) for ret in rets], dtype=np.int64)
+
+    def count(items):
+        return pa.array([None if x is None else len(x) for x in items], type=pa.int32())
+
+    result_columns = {
+        "result_idx": pa.array(np.arange(len(rets), dtype=np.int32)),
+        "query_id": query_ids,
+        "query": pa.array([ret.query for ret in rets], type=pa.string()),
+        "num_passages": pa.array(num_passages.astype(np.int32)),
+        "num_response_claims": count([ret.response_claims for ret in rets]),
+        "num_gt_answer_claims": count([ret.gt_answer_claims for ret in rets]),
+    }
+    for metric in METRIC_GROUP_MAP[all_metrics]:
+        result_columns[metric] = pa.array([ret.metrics.get(metric) for ret in rets], type=pa.float64())
+    tables = {"results": pa.table(result_columns)}
+
+    # claims
+    columns = {name: [] for name in ["result_idx", "source", "claim_idx", "text", "verdict", "num_entailing_passages"]}
+    for source, (claim_check, passage_check) in CLAIM_CHECKS.items():
+        for i, ret in enumerate(rets):
+            claims = getattr(ret, f"{source}_claims")
+            if not claims:
+                continue
+            verdicts = decode_verdicts(getattr(ret, claim_check))
+            passage_verdicts = decode_verdicts(getattr(ret, passage_check))
+            for j, claim in enumerate(claims):
+                columns["result_idx"].append(i)
+                columns["source"].append(source)
+                columns["claim_idx"].append(j)
+                columns["text"].append(claim_text(claim))
+                columns["verdict"].append(
+                    LABEL_CODES.get(verdicts[j], 0) if verdicts is not None and j < len(verdicts) else -1
+                )
+                columns["num_entailing_passages"].append(
+                    passage_verdicts[j].count("Entailment")
+                    if passage_verdicts is not None and j < len(passage_verdicts) else None
+                )
+    result_idx = np.array(columns["result_idx"], dtype=np.int32)
+    tables["claims"] = pa.table({
+        "result_idx": pa.array(result_idx),
+        "query_id": query_ids.take(pa.array(result_idx)),
+        "source": pa.array(columns["source"], type=pa.string()).dictionary_encode(),
+        "claim_idx": pa.array(np.array(columns["claim_idx"], dtype=np.int32)),
+        "text": pa.array(columns["text"], type=pa.string()),
+        "verdict": _label_array(pa, np.array(columns["verdict"], dtype=np.int8)),
+        "num_entailing_passages": pa.array(columns["num_entailing_passages"], type=pa.int32()),
+    })
+
+    # (claim, passage) verdicts, built from the columnar form of each passage-level check
+    doc_ids = pa.array(
+        [doc.doc_id for ret in rets for doc in ret.retrieved_context or []], type=pa.string()
+    ).dictionary_encode()
+    passage_offsets = np.concatenate([[0], np.cumsum(num_passages)])
+    parts = []
+    for source, (_, check_type) in CLAIM_CHECKS.items():
+        indices = np.array([i for i, ret in enumerate(rets) if getattr(ret, check_type) is not None], dtype=np.int64)
+        column = VerdictColumn([decode_verdicts(getattr(rets[i], check_type)) for i in indices], passage_level=True)
+        if len(column.codes) == 0:
+            continue
+        result_of_cell = column.result_of_claim[column.claim_of_cell]
+        cell_result_idx = indices[result_of_cell]
+        claim_idx = column.claim_of_cell - column.claim_offsets[result_of_cell]
+        # passages beyond the retrieved context have no doc id
+        passage_idx = column.passage_of_cell
+        in_context = passage_idx < num_passages[cell_result_idx]
+        doc_index = np.where(in_context, passage_offsets[cell_result_idx] + passage_idx, 0)
+        parts.append(pa.table({
+            "result_idx": pa.array(cell_result_idx.astype(np.int32)),
+            "query_id": query_ids.take(pa.array(cell_result_idx)),
+            "check_type": pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(len(column.codes), dtype=np.int8)), pa.array([check_type])
+            ),
+            "source": pa.DictionaryArray.from_arrays(
+                pa.array(np.zeros(len(column.codes), dtype=np.int8)), pa.array([source])
+            ),
+            "claim_idx": pa.array(claim_idx.astype(np.int32)),
+            "passage_idx": pa.array(passage_idx.astype(np.int32)),
+            "doc_id": doc_ids.take(pa.array(doc_index, mask=~in_context)),
+            "label": _label_array(pa, column.codes),
+        }))
+    if parts:
+        tables["verdicts"] = pa.concat_tables(parts).unify_dictionaries()
+    else:
+        tables["verdicts"] = pa.table({
+            "result_idx": pa.array([], type=pa.int32()),
+            "query_id": pa.array([], type=pa.dictionary(pa.int32(), pa.string())),
+            "check_type": pa.array([], type=pa.dictionary(pa.int8(), pa.string())),
+            "source": pa.array([], type=pa.dictionary(pa.int8(), pa.string())),
+            "claim_idx": pa.array([], type=pa.int32()),
+            "passage_idx": pa.array([], type=pa.int32()),
+            "doc_id": pa.array([], type=pa.dictionary(pa.int32(), pa.string())),
+            "label": pa.array([], type=pa.dictionary(pa.int8(), pa.string())),
+        })
+    return tables
+
+
+def export_tables(results: RAGResults, output_dir: str, format: str = "parquet") -> Dict[str, str]:
+    """
+    Write the tables of `build_tables` to `<output_dir>/<table>.parquet` or, with
+    format "arrow", to uncompressed Arrow IPC files `<output_dir>/<table>.arrow`, which
+    `load_table` maps into memory without copying.
+
+    Returns
+    -------
+    Dict[str, str]
+        Path of each table.
+    """
+    if format not in ["parquet", "arrow"]:
+        raise ValueError(f"Invalid export format: {format}")
+    pa = _import_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, table in build_tables(results).items():
+        paths[name] = os.path.join(output_dir, f"{name}.{format}")
+        if format == "parquet":
+            pa.parquet.write_table(table, paths[name], use_dictionary=True)
+        else:
+            with pa.OSFile(paths[name], "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    return paths
+
+
+def load_table(path: str):
+    """Read a table written by `export_tables`, memory-mapping the file."""
+    pa = _import_pyarrow()
+    if path.endswith(".arrow"):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pa.parquet.read_table(path, memory_map=True)
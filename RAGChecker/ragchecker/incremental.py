@@ -0,0 +1,137 @@
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from .container import RAGResults, RAGResult
+from .encoding import UNCHECKED, decode_verdicts
+
+
+# inputs of every intermediate result, besides the query which conditions them all
+CLAIM_INPUTS = {
+    "response_claims": ["response"],
+    "gt_answer_claims": ["gt_answer"],
+}
+CHECK_INPUTS = {
+    "answer2response": ["response_claims", "gt_answer"],
+    "response2answer": ["gt_answer_claims", "response"],
+    "retrieved2response": ["response_claims"],
+    "retrieved2answer": ["gt_answer_claims"],
+}
+
+
+def content_hash(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class PreviousResult:
+    """
+    What incremental evaluation keeps of a previously evaluated RAG result: the hashes
+    of its inputs and its intermediate results, without the texts.
+    """
+    __slots__ = ("hashes", "passages", "fields")
+
+    def __init__(self, result: RAGResult):
+        self.hashes = {name: content_hash(getattr(result, name)) for name in ["query", "gt_answer", "response"]}
+        self.passages = [content_hash(doc.text) for doc in result.retrieved_context or []]
+        self.fields = {
+            name: decode_verdicts(getattr(result, name)) for name in [*CLAIM_INPUTS, *CHECK_INPUTS]
+        }
+        self.fields["verdict_tiers"] = result.verdict_tiers
+
+
+def index_previous(previous: Iterable[RAGResult]) -> Dict[str, PreviousResult]:
+    """Index previously evaluated RAG results by query id, keeping the last of duplicate ids."""
+    return {result.query_id: PreviousResult(result) for result in previous}
+
+
+def _carry_matrix(old: List[List[str]], old_passages: List[bytes], new_passages: List[bytes]):
+    """
+    Rebuild a [claim, passage] matrix for a new list of passages, copying the column of
+    every passage found among the old ones. Cells of new passages are left undecided
+    (None).
+    """
+    columns = {}
+    for k, h in enumerate(old_passages):
+        columns.setdefault(h, k)
+    return [
+        [row[columns[h]] if h in columns and columns[h] < len(row) else None for h in new_passages]
+        for row in old
+    ]
+
+
+def carry_over(
+    previous: Dict[str, PreviousResult], results: RAGResults, check_types: Iterable[str]
+) -> Counter:
+    """
+    Copy into `results` the intermediate results of a previous evaluation whose inputs
+    are unchanged, matching RAG results by query id and hashes of their texts.
+
+    Claims are carried over when the query and the text they were extracted from are
+    unchanged. Answer-level checks are carried over when their claims and reference are
+    unchanged. Passage-level checks are carried over cell by cell: the verdicts against
+    passages found in the previous retrieved context are kept, whatever their rank, and
+    the cells of new passages are left undecided (None) so that only they are checked.
+    Fields already set in `results` are kept.
+
+    Returns
+    -------
+    Counter
+        Reuse report: the number of matched results, of carried over claim lists, and
+        of reused and invalidated verdicts per check type.
+    """
+    check_types = list(check_types)
+    report = Counter()
+    for result in results.results:
+        prev = previous.get(result.query_id)
+        if prev is None or prev.hashes["query"] != content_hash(result.query):
+            continue
+        report["matched_results"] += 1
+        unchanged = {
+            name: prev.hashes[name] == content_hash(getattr(result, name))
+            for name in ["gt_answer", "response"]
+        }
+        for name, (source,) in CLAIM_INPUTS.items():
+            if getattr(result, name) is None and unchanged[source] and prev.fields[name] is not None:
+                setattr(result, name, prev.fields[name])
+                report[f"reused_{name}"] += 1
+            # checks over the claims hold only if they are the claims they were made for
+            unchanged[name] = getattr(result, name) is not None and getattr(result, name) == prev.fields[name]
+
+        passages = [content_hash(doc.text) for doc in result.retrieved_context or []]
+        for check_type in check_types:
+            labels = prev.fields[check_type]
+            if getattr(result, check_type) is not None or labels is None:
+                continue
+            passage_level = check_type.startswith("retrieved")
+            if not all(unchanged[name] for name in CHECK_INPUTS[check_type]):
+                report[f"invalidated_{check_type}"] += sum(map(len, labels)) if passage_level else len(labels)
+                continue
+            same_passages = not passage_level or passages == prev.passages
+            if passage_level:
+                if not same_passages:
+                    labels = _carry_matrix(labels, prev.passages, passages)
+                num_reused = sum(label not in (None, UNCHECKED) for row in labels for label in row)
+                report[f"invalidated_{check_type}"] += len(labels) * len(passages) - num_reused
+            else:
+                num_reused = len(labels)
+            setattr(result, check_type, labels)
+            report[f"reused_{check_type}"] += num_reused
+            tiers = (prev.fields["verdict_tiers"] or {}).get(check_type)
+            if same_passages and tiers is not None:
+                result.verdict_tiers = {**(result.verdict_tiers or {}), check_type: tiers}
+    return report
+
+
+def format_report(report: Counter, check_types: Iterable[str]) -> str:
+    """One-line summary of the reuse report of `carry_over`."""
+    parts = [f"{report['matched_results']} matched RAG results"]
+    for name in CLAIM_INPUTS:
+        parts.append(f"{report[f'reused_{name}']} {name} reused")
+    for check_type in check_types:
+        reused, invalidated = report[f"reused_{check_type}"], report[f"invalidated_{check_type}"]
+        total = reused + invalidated
+        if total:
+            parts.append(f"{check_type}: {reused}/{total} verdicts reused ({reused / total:.1%})")
+    return ", ".join(parts)
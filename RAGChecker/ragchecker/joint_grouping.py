@@ -0,0 +1,123 @@
+import re
+import inspect
+import threading
+from typing import Callable, List, Optional
+
+from refchecker.checker.checker_prompts import JOINT_CHECKING_PROMPT_Q
+
+from .llm_executor import estimate_tokens
+from .prefilter import claim_text
+
+
+# claims are listed in joint checking prompts as ("subject", "predicate", "object") lines
+CLAIM_LINE = re.compile(r'^\(".*", ".*", ".*"\)$', re.MULTILINE)
+# labels parsed from joint checking responses, as refchecker parses them
+LABEL_PATTERN = re.compile(r"\b(Entailment|Neutral|Contradiction)\b", re.IGNORECASE)
+# refchecker's output budget of a joint checking prompt: tokens per claim plus a margin
+OUTPUT_TOKENS_PER_CLAIM = 10
+OUTPUT_TOKENS_MARGIN = 100
+
+
+def joint_max_new_tokens(num_claims: int) -> int:
+    return num_claims * OUTPUT_TOKENS_PER_CLAIM + OUTPUT_TOKENS_MARGIN
+
+
+class JointGrouper:
+    """
+    Token-aware sizing of the claim groups of joint checking prompts.
+
+    Claims are packed greedily into groups whose prompt, made of the prompt template,
+    the question, the reference and the claims, plus the output budget of the labels,
+    fits in `max_tokens`. Groups are also capped by an adaptive limit on the number of
+    claims, starting at `max_claims`: a batch of prompts with parse failures (fewer or
+    more labels than claims) halves the limit, and every `growth_interval` batches
+    without failures raise it by one, back up to `max_claims`.
+
+    Parameters
+    ----------
+    max_tokens : int
+        Token budget of a prompt and its output.
+    max_claims : int
+        Upper bound of the number of claims per group.
+    growth_interval : int, optional
+        Number of batches without parse failures before the limit grows. Default: 4.
+    """
+    def __init__(self, max_tokens: int, max_claims: int, growth_interval: int = 4):
+        self.max_tokens = max_tokens
+        self.max_claims = max_claims
+        self.limit = max_claims
+        self.growth_interval = growth_interval
+        self._streak = 0
+        self._lock = threading.Lock()
+        self._template_tokens = estimate_tokens(JOINT_CHECKING_PROMPT_Q)
+
+    def split(self, claims: list, reference: str, question: str, limit: Optional[int] = None) -> List[List[int]]:
+        """Indices of the claims of every group, in order, for a claim list checked against a reference."""
+        limit = min(self.limit, limit or self.limit)
+        available = self.max_tokens - self._template_tokens - estimate_tokens(reference) \
+            - estimate_tokens(question or "") - OUTPUT_TOKENS_MARGIN
+        groups, group, used = [], [], 0
+        for j, claim in enumerate(claims):
+            cost = estimate_tokens(f'("{claim_text(claim)}")\n') + OUTPUT_TOKENS_PER_CLAIM
+            # a group holds at least one claim, even over budget
+            if group and (len(group) >= limit or used + cost > available):
+                groups.append(group)
+                group, used = [], 0
+            group.append(j)
+            used += cost
+        if group:
+            groups.append(group)
+        return groups
+
+    def record(self, num_prompts: int, num_failures: int):
+        """Adapt the group limit to the parse failures of a batch of prompts."""
+        if num_prompts == 0:
+            return
+        with self._lock:
+            if num_failures > 0:
+                self.limit = max(1, self.limit // 2)
+                self._streak = 0
+            else:
+                self._streak += 1
+                if self._streak >= self.growth_interval and self.limit < self.max_claims:
+                    self.limit += 1
+                    self._streak = 0
+
+
+class ParseMonitor:
+    """
+    Wrapper of an LLM API function of refchecker, `func(prompts) -> responses`, which
+    detects parse failures of joint checking responses and sizes their output budget.
+
+    For every prompt, the claims listed in it are compared with the labels parsed from
+    its response. The outcome of each prompt is appended to the log opened by the
+    current thread with `open_log`, and each batch is reported to the grouper.
+    """
+    def __init__(self, func: Callable, grouper: JointGrouper):
+        self.func = func
+        self.grouper = grouper
+        self._accepts_max_new_tokens = "max_new_tokens" in inspect.signature(func).parameters
+        self._local = threading.local()
+
+    def open_log(self) -> list:
+        self._local.log = []
+        return self._local.log
+
+    def close_log(self):
+        self._local.log = None
+
+    def __call__(self, prompts: List[str]) -> List[str]:
+        num_claims = [len(CLAIM_LINE.findall(prompt)) for prompt in prompts]
+        if self._accepts_max_new_tokens:
+            responses = self.func(prompts, max_new_tokens=joint_max_new_tokens(max(num_claims, default=0)))
+        else:
+            responses = self.func(prompts)
+        failed = [
+            n > 0 and len(LABEL_PATTERN.findall(response or "")) != n
+            for n, response in zip(num_claims, responses)
+        ]
+        self.grouper.record(len(prompts), sum(failed))
+        log = getattr(self._local, "log", None)
+        if log is not None:
+            log.extend(failed)
+        return responses
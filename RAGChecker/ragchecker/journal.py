@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+from typing import List
+
+from loguru import logger
+
+from .container import RAGResults, RAGResult
+
+
+# intermediate results of a RAGResult that are recorded in the journal
+JOURNAL_FIELDS = [
+    "response_claims", "gt_answer_claims",
+    "answer2response", "response2answer", "retrieved2response", "retrieved2answer",
+    "verdict_tiers",
+]
+
+
+def journal_path(save_path: str) -> str:
+    return save_path + ".journal.jsonl"
+
+
+def _truncate_partial_line(path: str):
+    """Cut a file after its last newline, so that appended lines start on a line of their own."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        # scan back from the end in blocks, journals can be large
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+
+
+class Journal:
+    """
+    Append-only JSONL journal of the intermediate results of an evaluation run.
+
+    Each line holds the position of a RAG result in its `RAGResults`, its query id
+    and the fields computed by one finished batch. Appending a batch costs time
+    proportional to the batch only, and a crash loses at most the batches in flight.
+
+    Parameters
+    ----------
+    path : str
+        Path to the journal file.
+    results : RAGResults
+        The RAG results being evaluated, used to locate each result on replay.
+    resume : bool, optional
+        Keep the existing journal and append to it, after dropping a line left
+        half-written by a crash. Otherwise any existing journal is truncated.
+        Default: False.
+    """
+    def __init__(self, path: str, results: RAGResults, resume: bool = False):
+        self.path = path
+        self._index = {id(result): i for i, result in enumerate(results.results)}
+        self._lock = threading.Lock()
+        if resume:
+            _truncate_partial_line(path)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def record(self, results: List[RAGResult], fields: List[str]):
+        """Append the given fields of a finished batch of results."""
+        lines = []
+        for result in results:
+            index = self._index.get(id(result))
+            if index is None:
+                continue
+            record = {"index": index, "query_id": result.query_id}
+            record.update((field, getattr(result, field)) for field in fields)
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        with self._lock:
+            self._file.writelines(lines)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def replay(path: str, results: RAGResults) -> int:
+        """
+        Restore the intermediate results recorded in a journal into `results`.
+
+        Fields that are already set are kept. Lines that do not match the results
+        (e.g. a different input file) and a truncated last line are skipped.
+
+        Returns
+        -------
+        int
+            Number of restored fields.
+        """
+        if not os.path.exists(path):
+            return 0
+        restored, skipped = 0, 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                index = record.get("index")
+                if not isinstance(index, int) or not 0 <= index < len(results.results) \
+                        or results.results[index].query_id != record.get("query_id"):
+                    skipped += 1
+                    continue
+                result = results.results[index]
+                for field in JOURNAL_FIELDS:
+                    if record.get(field) is None:
+                        continue
+                    if field == "verdict_tiers":
+                        result.verdict_tiers = {**record[field], **(result.verdict_tiers or {})}
+                    elif getattr(result, field) is None:
+                        setattr(result, field, record[field])
+                        restored += 1
+        logger.info(f"Restored {restored} intermediate results from {path}, skipped {skipped} lines.")
+        return restored
@@ -0,0 +1,136 @@
+import io
+import json
+from typing import Iterable, Iterator, Optional, TextIO
+
+from .container import RAGResults, RAGResult, PassageTable
+from .codec import dumps_result, loads, loads_results, result_to_dict, result_from_dict, doc_from_dict
+
+
+# key of the records defining a shared passage, which precede the first result referencing them
+PASSAGE_ID = "passage_id"
+
+
+def is_jsonl(path: str) -> bool:
+    """Whether a path names a JSONL file, optionally zstd-compressed."""
+    return path.endswith(".jsonl") or path.endswith(".jsonl.zst")
+
+
+def open_text(path: str, mode: str = "r") -> TextIO:
+    """
+    Open a text file for reading ("r"), writing ("w") or appending ("a"), compressed
+    with zstd if its name ends with `.zst`. Appending to a zstd file adds a frame,
+    and all frames are read back.
+    """
+    if not path.endswith(".zst"):
+        return open(path, mode, encoding="utf-8")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading and writing .zst files requires zstandard, install it with `pip install zstandard`."
+        )
+    if mode == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+    else:
+        stream = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"))
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def iter_results(path: str, table: Optional[PassageTable] = None) -> Iterator[RAGResult]:
+    """
+    Iterate over the RAG results of a JSONL file, one per line, without loading the
+    whole file. Passage indices are resolved against the passage records read so far,
+    and passages are interned in `table` if given.
+    """
+    passages = {}
+    with open_text(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = loads(line)
+            if PASSAGE_ID in data:
+                doc = doc_from_dict(data)
+                passages[data[PASSAGE_ID]] = table.intern(doc) if table is not None else doc
+            else:
+                yield result_from_dict(data, passages, table)
+
+
+class ResultsWriter:
+    """
+    Writer of RAG results to a JSONL file, one result per line.
+
+    Parameters
+    ----------
+    path : str
+        Output path, compressed with zstd if it ends with `.zst`.
+    compact : bool, optional
+        Pack the checking results as 2-bit codes, see `encoding.encode_verdicts`.
+        Default: False.
+    append : bool, optional
+        Append to an existing file. Default: False.
+    shared_passages : bool, optional
+        Write each distinct passage once, as a `{"passage_id", "doc_id", "text"}` record
+        before the first result retrieving it, and the retrieved context of each result
+        as passage ids. A record redefines an earlier record of the same id, so that
+        appending starts a new set of ids. Default: False.
+    """
+    def __init__(self, path: str, compact: bool = False, append: bool = False, shared_passages: bool = False):
+        self.path = path
+        self.compact = compact
+        self.shared_passages = shared_passages
+        self._passage_ids = {}
+        self._file = open_text(path, "a" if append else "w")
+
+    def _shared_lines(self, result: RAGResult) -> Iterator[str]:
+        data = result_to_dict(result, self.compact)
+        if result.retrieved_context is not None:
+            ids = []
+            for doc in result.retrieved_context:
+                key = PassageTable.key(doc)
+                if key not in self._passage_ids:
+                    self._passage_ids[key] = len(self._passage_ids)
+                    yield json.dumps({PASSAGE_ID: self._passage_ids[key], "doc_id": doc.doc_id, "text": doc.text}) + "\n"
+                ids.append(self._passage_ids[key])
+            data["retrieved_context"] = ids
+        yield json.dumps(data) + "\n"
+
+    def write(self, results: Iterable[RAGResult]):
+        if self.shared_passages:
+            for result in results:
+                self._file.writelines(self._shared_lines(result))
+        else:
+            self._file.writelines(dumps_result(result, self.compact) + "\n" for result in results)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_results(path: str) -> RAGResults:
+    """Load RAG results from a JSON file or a JSONL file, interning their passages."""
+    if is_jsonl(path):
+        return RAGResults(results=list(iter_results(path, PassageTable())))
+    with open(path, "rb") as f:
+        return loads_results(f.read())
+
+
+def metrics_path(path: str) -> str:
+    """Path of the dataset-level metrics saved next to a JSONL output."""
+    return path + ".metrics.json"
+
+
+def save_results(results: RAGResults, path: str, compact: bool = False, shared_passages: bool = False):
+    """
+    Save RAG results to a JSONL file, with the dataset-level metrics in a separate
+    JSON file next to it (see `metrics_path`).
+    """
+    with ResultsWriter(path, compact=compact, shared_passages=shared_passages) as writer:
+        writer.write(results.results)
+    with open(metrics_path(path), "w") as f:
+        json.dump(results.metrics, f, indent=2)
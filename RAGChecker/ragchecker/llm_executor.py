@@ -0,0 +1,381 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+class LLMRequestError(Exception):
+    """Error response of an LLM endpoint."""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__
+
+
+def _is_retryable(error: Exception) -> bool:
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    # timeouts, dropped connections and provider errors without a status code
+    return True
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`, holding at most one minute
+    worth of tokens. Waiters are served in arrival order.
+    """
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        # a single request larger than the bucket must not wait forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Charge (positive) or refund (negative) tokens once the actual usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit adapted with additive increase / multiplicative decrease.
+
+    Every successful request raises the limit by 1 / limit, i.e. by about one per
+    round trip of the whole window. A rate-limit error or a latency above
+    `latency_target` multiplies the limit by `backoff`, at most once per `cooldown`
+    seconds so that a burst of errors from the same window counts once.
+    """
+    def __init__(
+        self, initial: int, maximum: int, minimum: int = 1,
+        latency_target: float | None = None, backoff: float = 0.5, cooldown: float = 2.0
+    ):
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: float | None = None, overloaded: bool = False):
+        async with self._cond:
+            self.in_flight -= 1
+            slow = self.latency_target is not None and latency is not None and latency > self.latency_target
+            if overloaded or slow:
+                now = time.monotonic()
+                if now - self._last_decrease > self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            elif latency is not None:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class AsyncLLMExecutor:
+    """
+    Asyncio-based execution layer for extractor and checker requests.
+
+    Prompts are sent concurrently on a dedicated event loop shared by all calling
+    threads, throttled by requests-per-minute and tokens-per-minute token buckets and
+    by an AIMD concurrency limit. Requests still running after the `hedge_quantile`
+    latency of recent requests get a hedged duplicate and the first answer wins.
+    Failed requests are retried with exponential backoff, and a prompt whose retries
+    run out gets a None response, as with refchecker's `get_model_batch_response`.
+
+    OpenAI-compatible endpoints (an `api_base` starting with http, e.g. vLLM) are
+    called through one pooled `httpx.AsyncClient`, any other model goes through
+    `litellm.acompletion`.
+
+    An instance is a drop-in `custom_llm_api_func` for refchecker: calling it with a
+    list of prompts returns the list of generated texts. Call `close` to stop its event
+    loop and HTTP client.
+
+    Parameters
+    ----------
+    model : str
+        Model name, in litellm format.
+    api_base : str, optional
+        API base URL of the endpoint. Default: None.
+    max_new_tokens : int, optional
+        Default max generated tokens per request. Default: None (provider default).
+    requests_per_minute : float, optional
+        Request rate limit. Default: None (unlimited).
+    tokens_per_minute : float, optional
+        Token rate limit, counting prompt and generated tokens. Default: None (unlimited).
+    max_concurrency : int, optional
+        Upper bound of the adaptive number of requests in flight. Default: 64.
+    initial_concurrency : int, optional
+        Starting number of requests in flight. Default: 8.
+    latency_target : float, optional
+        Latency in seconds above which the concurrency is reduced. Default: None.
+    hedge_quantile : float, optional
+        Latency quantile of recent requests after which a hedged request is sent,
+        None to disable hedging. Default: 0.95.
+    max_retries : int, optional
+        Maximum number of retries of a failed request. Default: 5.
+    timeout : float, optional
+        Timeout in seconds of a single request. Default: 120.
+    """
+    def __init__(
+        self,
+        model: str,
+        api_base: str | None = None,
+        max_new_tokens: int | None = None,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_concurrency: int = 64,
+        initial_concurrency: int = 8,
+        latency_target: float | None = None,
+        hedge_quantile: float | None = 0.95,
+        hedge_min_samples: int = 20,
+        max_retries: int = 5,
+        timeout: float = 120,
+        **completion_kwargs
+    ):
+        self.model = model
+        self.api_base = api_base
+        self.max_new_tokens = max_new_tokens
+        self.max_concurrency = max_concurrency
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.completion_kwargs = completion_kwargs
+
+        self.latencies = deque(maxlen=200)
+        self.counts = {
+            "requests": 0, "failed": 0, "retries": 0, "rate_limited": 0,
+            "hedged": 0, "hedge_wins": 0, "tokens": 0,
+        }
+        self._first_start = None
+        self._last_end = None
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        # asyncio primitives and the HTTP pool must be created on the executor's loop
+        asyncio.run_coroutine_threadsafe(
+            self._setup(requests_per_minute, tokens_per_minute, initial_concurrency, latency_target),
+            self._loop
+        ).result()
+
+    async def _setup(self, requests_per_minute, tokens_per_minute, initial_concurrency, latency_target):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.limiter = AIMDLimiter(
+            initial=initial_concurrency, maximum=self.max_concurrency, latency_target=latency_target
+        )
+        self._http = None
+        if self.api_base is not None and self.api_base.startswith("http"):
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError(
+                    "Calling OpenAI-compatible endpoints requires httpx, install it with `pip install httpx` "
+                    "or `pip install ragchecker[async]`."
+                )
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+
+    def __call__(self, prompts, max_new_tokens: int | None = None) -> List[Optional[str]]:
+        """Generate the responses of a list of prompts, blocking until all of them are done."""
+        future = asyncio.run_coroutine_threadsafe(self.generate(prompts, max_new_tokens), self._loop)
+        return future.result()
+
+    async def generate(self, prompts, max_new_tokens: int | None = None) -> List[Optional[str]]:
+        max_new_tokens = max_new_tokens or self.max_new_tokens
+        responses = await asyncio.gather(
+            *[self._complete(prompt, max_new_tokens) for prompt in prompts], return_exceptions=True
+        )
+        errors = [response for response in responses if isinstance(response, BaseException)]
+        for error in errors:
+            if not isinstance(error, Exception):
+                raise error
+        if errors:
+            # the other responses are kept, the failed prompts get None as in refchecker
+            logger.warning(f"{len(errors)} of {len(prompts)} LLM requests failed, the last error: {errors[-1]}")
+            responses = [None if isinstance(response, Exception) else response for response in responses]
+        return responses
+
+    async def _complete(self, prompt, max_new_tokens):
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        for retry in range(self.max_retries + 1):
+            try:
+                return await self._hedged(messages, max_new_tokens)
+            except Exception as e:
+                if retry == self.max_retries or not _is_retryable(e):
+                    self.counts["failed"] += 1
+                    raise
+                self.counts["retries"] += 1
+                delay = min(60.0, 2 ** retry) * (0.5 + random.random())
+                logger.debug(f"Retrying LLM request in {delay:.1f}s after error: {e}")
+                await asyncio.sleep(delay)
+
+    def _hedge_delay(self):
+        if self.hedge_quantile is None or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return float(np.quantile(self.latencies, self.hedge_quantile))
+
+    async def _hedged(self, messages, max_new_tokens):
+        first = asyncio.ensure_future(self._attempt(messages, max_new_tokens))
+        delay = self._hedge_delay()
+        if delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        self.counts["hedged"] += 1
+        hedge = asyncio.ensure_future(self._attempt(messages, max_new_tokens))
+        pending = {first, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counts["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, messages, max_new_tokens):
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        estimated = prompt_tokens + (max_new_tokens or 0)
+        latency, overloaded = None, False
+        await self.limiter.acquire()
+        try:
+            if self.request_bucket is not None:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket is not None:
+                await self.token_bucket.acquire(estimated)
+            start = time.monotonic()
+            if self._first_start is None:
+                self._first_start = start
+            if self._http is not None:
+                text, used = await self._openai_compatible(messages, max_new_tokens)
+            else:
+                text, used = await self._litellm(messages, max_new_tokens)
+            latency = time.monotonic() - start
+            self._last_end = time.monotonic()
+            self.latencies.append(latency)
+            self.counts["requests"] += 1
+            self.counts["tokens"] += used or estimated
+            if self.token_bucket is not None and used:
+                self.token_bucket.adjust(used - estimated)
+            return text
+        except Exception as e:
+            overloaded = _is_rate_limit(e)
+            if overloaded:
+                self.counts["rate_limited"] += 1
+            raise
+        finally:
+            await self.limiter.release(latency, overloaded)
+
+    async def _openai_compatible(self, messages, max_new_tokens):
+        model = self.model
+        for prefix in ["openai/", "hosted_vllm/"]:
+            if model.startswith(prefix):
+                model = model[len(prefix):]
+        payload = {"model": model, "messages": messages, "temperature": 0, **self.completion_kwargs}
+        if max_new_tokens:
+            payload["max_tokens"] = max_new_tokens
+        headers = {}
+        if os.environ.get("OPENAI_API_KEY"):
+            headers["Authorization"] = f"Bearer {os.environ['OPENAI_API_KEY']}"
+        response = await self._http.post(
+            f"{self.api_base.rstrip('/')}/chat/completions", json=payload, headers=headers
+        )
+        if response.status_code >= 400:
+            raise LLMRequestError(response.status_code, response.text[:500])
+        data = response.json()
+        usage = data.get("usage") or {}
+        return data["choices"][0]["message"]["content"], usage.get("total_tokens")
+
+    async def _litellm(self, messages, max_new_tokens):
+        import litellm
+        response = await litellm.acompletion(
+            model=self.model,
+            messages=messages,
+            temperature=0,
+            max_tokens=max_new_tokens,
+            api_base=self.api_base,
+            timeout=self.timeout,
+            **self.completion_kwargs
+        )
+        usage = getattr(response, "usage", None)
+        return response.choices[0].message.content, getattr(usage, "total_tokens", None)
+
+    def report(self) -> dict:
+        """Request counts and achieved throughput since the first request."""
+        report = dict(self.counts)
+        elapsed = 0.0
+        if self._first_start is not None and self._last_end is not None:
+            elapsed = self._last_end - self._first_start
+        report["elapsed_seconds"] = round(elapsed, 1)
+        report["requests_per_minute"] = round(report["requests"] / elapsed * 60, 1) if elapsed > 0 else 0.
+        report["tokens_per_minute"] = round(report["tokens"] / elapsed * 60, 1) if elapsed > 0 else 0.
+        report["concurrency_limit"] = round(self.limiter.limit, 1)
+        if self.latencies:
+            report["p50_latency"] = round(float(np.quantile(self.latencies, 0.5)), 2)
+            report["p95_latency"] = round(float(np.quantile(self.latencies, 0.95)), 2)
+        return report
+
+    def close(self):
+        """Close the HTTP client and stop the event loop. Closing twice does nothing."""
+        if not self._thread.is_alive():
+            return
+
+        async def _close():
+            if self._http is not None:
+                await self._http.aclose()
+        asyncio.run_coroutine_threadsafe(_close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,234 @@
+import re
+import inspect
+from typing import Callable, Dict, List, Tuple
+
+from loguru import logger
+
+from .llm_executor import estimate_tokens
+
+
+PACKED_CHECKING_PROMPT = """I have a list of claims that made by a language model to a question, and a list of passages retrieved for the question, each labeled with an id. Please help me for checking, for EVERY claim and EVERY passage, whether the claim can be entailed according to that passage alone.
+Each of the claims is numbered, and represented as a triplet formatted with ("subject", "predicate", "object") or as a sentence.
+
+If the claim is supported by the passage, answer 'Entailment'.
+If the claim is contradicted with the passage, answer 'Contradiction'.
+If the passage does not entail or contradict with the claim, or DOES NOT contain information to verify the claim, answer 'Neutral'.
+
+Please DO NOT use your own knowledge or the other passages for the judgement, just compare the passage and the claim to get the answer.
+
+### Passages:
+[PASSAGES]
+
+### Question:
+[QUESTION]
+
+### Claims:
+[CLAIMS]
+
+
+Your answer should always be only a list of lines, one line per claim and passage, formatted as "<claim number> <passage id>: <label>" where the label is a single word in ['Entailment', 'Neutral', 'Contradiction'], for example:
+
+1 P1: Neutral
+1 P2: Entailment
+2 P1: Contradiction
+2 P2: Neutral
+
+
+DO NOT add explanations or you own reasoning to the output, only output the list of lines.
+"""
+
+# one verdict line of a packed checking response, e.g. "2 P3: Neutral"
+VERDICT_LINE = re.compile(
+    r"^\W*(\d+)\W+P(\d+)\W+(Entailment|Neutral|Contradiction)\b", re.IGNORECASE | re.MULTILINE
+)
+# output budget of a packed checking prompt: tokens per verdict line plus a margin
+OUTPUT_TOKENS_PER_VERDICT = 8
+OUTPUT_TOKENS_MARGIN = 100
+
+
+def format_claim(claim) -> str:
+    if isinstance(claim, str):
+        return claim
+    return "(" + ", ".join(f'"{c}"' for c in claim) + ")"
+
+
+def packed_prompt(claims: list, passages: List[str], question: str) -> str:
+    """Joint checking prompt of every claim against every passage, the passages labeled P1, P2, ..."""
+    return PACKED_CHECKING_PROMPT.replace(
+        "[PASSAGES]", "\n\n".join(f"[P{k + 1}] {passage}" for k, passage in enumerate(passages))
+    ).replace(
+        "[QUESTION]", question or ""
+    ).replace(
+        "[CLAIMS]", "\n".join(f"{j + 1}. {format_claim(claim)}" for j, claim in enumerate(claims))
+    )
+
+
+def parse_packed_response(response: str, num_claims: int, num_passages: int) -> Dict[Tuple[int, int], str]:
+    """
+    Verdicts of a packed checking response by (claim index, passage index), both from 0.
+    Lines out of range are ignored, and the first line of a pair wins. Pairs without a
+    line are missing from the output.
+    """
+    verdicts = {}
+    for claim, passage, label in VERDICT_LINE.findall(response or ""):
+        j, k = int(claim) - 1, int(passage) - 1
+        if 0 <= j < num_claims and 0 <= k < num_passages:
+            verdicts.setdefault((j, k), label.capitalize())
+    return verdicts
+
+
+def max_new_tokens(num_verdicts: int) -> int:
+    return num_verdicts * OUTPUT_TOKENS_PER_VERDICT + OUTPUT_TOKENS_MARGIN
+
+
+class PassagePacker:
+    """
+    Packing of the retrieved passages of a RAG result into joint prompts checking
+    several claims against several passages, with one verdict per (claim, passage).
+
+    Passages are packed in order, with the claims to check against each of them, as long
+    as the prompt (the template, the question, the passages and the union of their
+    claims) plus the output budget of all its verdicts fits in `max_tokens`, up to
+    `max_passages` passages per prompt. The claims of a passage too long to share a
+    prompt are split over several prompts.
+
+    Parameters
+    ----------
+    max_tokens : int
+        Token budget of a prompt and its output.
+    max_passages : int, optional
+        Maximum number of passages per prompt. Default: 10.
+    """
+    def __init__(self, max_tokens: int, max_passages: int = 10):
+        self.max_tokens = max_tokens
+        self.max_passages = max_passages
+        self._template_tokens = estimate_tokens(PACKED_CHECKING_PROMPT) + OUTPUT_TOKENS_MARGIN
+
+    def _cost(self, passage_tokens: int, claim_tokens: int, num_verdicts: int) -> int:
+        return self._template_tokens + passage_tokens + claim_tokens + num_verdicts * OUTPUT_TOKENS_PER_VERDICT
+
+    def pack(
+        self, claims: list, passages: List[Tuple[str, List[int]]], question: str
+    ) -> List[Tuple[List[int], List[int]]]:
+        """
+        Split the checks of a RAG result into prompts.
+
+        Parameters
+        ----------
+        claims : list
+            The claims of the RAG result.
+        passages : List[Tuple[str, List[int]]]
+            Every passage to check, with the indices of the claims to check against it.
+
+        Returns
+        -------
+        List[Tuple[List[int], List[int]]]
+            The positions in `passages` and the claim indices of every prompt. A prompt
+            checks all its claims against all its passages.
+        """
+        claim_tokens = {}
+        for _, indices in passages:
+            for j in indices:
+                if j not in claim_tokens:
+                    claim_tokens[j] = estimate_tokens(f"{j + 1}. {format_claim(claims[j])}\n")
+        question_tokens = estimate_tokens(question or "")
+
+        packs = []
+        members, pack_claims, passage_tokens = [], {}, question_tokens
+        for p, (text, indices) in enumerate(passages):
+            tokens = estimate_tokens(text)
+            merged = {**pack_claims, **dict.fromkeys(indices)}
+            cost = self._cost(
+                passage_tokens + tokens, sum(claim_tokens[j] for j in merged), len(merged) * (len(members) + 1)
+            )
+            if members and (len(members) >= self.max_passages or cost > self.max_tokens):
+                packs.append((members, list(pack_claims)))
+                members, pack_claims, passage_tokens = [], {}, question_tokens
+                merged = dict.fromkeys(indices)
+                cost = self._cost(passage_tokens + tokens, sum(claim_tokens[j] for j in merged), len(merged))
+            if not members and cost > self.max_tokens:
+                # a passage alone over budget: its claims are split, at least one per prompt
+                group, used = [], 0
+                for j in indices:
+                    if group and self._cost(passage_tokens + tokens, used + claim_tokens[j], len(group) + 1) \
+                            > self.max_tokens:
+                        packs.append(([p], group))
+                        group, used = [], 0
+                    group.append(j)
+                    used += claim_tokens[j]
+                packs.append(([p], group))
+                continue
+            members.append(p)
+            pack_claims = merged
+            passage_tokens += tokens
+        if members:
+            packs.append((members, list(pack_claims)))
+        return packs
+
+
+class PackedChecker:
+    """
+    Checker of (claim, passage) pairs in packed prompts, sent through an LLM API function
+    of refchecker, `func(prompts) -> responses`.
+
+    Parameters
+    ----------
+    func : Callable
+        The LLM API function. Its `max_new_tokens` is set to the output budget of the
+        prompts when it accepts one.
+    packer : PassagePacker
+        Packing of the passages into prompts.
+    batch_size : int, optional
+        Number of prompts per call of `func`. Default: 16.
+    """
+    def __init__(self, func: Callable, packer: PassagePacker, batch_size: int = 16):
+        self.func = func
+        self.packer = packer
+        self.batch_size = batch_size
+        self._accepts_max_new_tokens = "max_new_tokens" in inspect.signature(func).parameters
+
+    def check(self, items: List[Tuple[list, List[Tuple[str, List[int]]], str]]):
+        """
+        Check the pairs of every item, a (claims, passages, question) triplet with the
+        passages given as in `PassagePacker.pack`.
+
+        Returns
+        -------
+        verdicts : List[Dict[Tuple[int, int], str]]
+            The verdict of every parsed (claim index, passage position) pair of each item.
+            Requested pairs missing from the responses, e.g. of a batch whose call failed,
+            are missing from the output.
+        num_prompts : int
+            Number of prompts sent.
+        """
+        prompts, packs = [], []
+        for i, (claims, passages, question) in enumerate(items):
+            for members, indices in self.packer.pack(claims, passages, question):
+                prompts.append(packed_prompt(
+                    [claims[j] for j in indices], [passages[p][0] for p in members], question
+                ))
+                packs.append((i, members, indices))
+        verdicts = [{} for _ in items]
+        responses = []
+        for start in range(0, len(prompts), self.batch_size):
+            batch = prompts[start:start + self.batch_size]
+            if self._accepts_max_new_tokens:
+                batch_packs = packs[start:start + self.batch_size]
+                budget = max(len(members) * len(indices) for _, members, indices in batch_packs)
+                batch_responses = self.func(batch, max_new_tokens=max_new_tokens(budget))
+            else:
+                batch_responses = self.func(batch)
+            if batch_responses is None or len(batch_responses) != len(batch):
+                # refchecker's LLM functions return None on API errors
+                logger.warning(f"No responses to {len(batch)} packed checking prompts, checking their pairs again.")
+                batch_responses = [None] * len(batch)
+            responses.extend(batch_responses)
+        requested = [[set(indices) for _, indices in passages] for _, passages, _ in items]
+        for (i, members, indices), response in zip(packs, responses):
+            parsed = parse_packed_response(response, len(indices), len(members))
+            for (j, k), label in parsed.items():
+                claim, p = indices[j], members[k]
+                # a prompt checks the union of the claims of its passages, only requested pairs are kept
+                if claim in requested[i][p]:
+                    verdicts[i][claim, p] = label
+        return verdicts, len(prompts)
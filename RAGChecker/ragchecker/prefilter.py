@@ -0,0 +1,240 @@
+import re
+import math
+import hashlib
+import threading
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "with", "from", "and", "or",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "as", "has", "have",
+}
+
+
+def claim_text(claim) -> str:
+    """Plain text of a claim, which is either a string or a (subject, predicate, object) triplet."""
+    return claim if isinstance(claim, str) else " ".join(str(c) for c in claim)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOP_WORDS]
+
+
+class PairPrefilter:
+    """
+    Cheap relevance score of (claim, passage) pairs, used to mark obviously unrelated
+    pairs as "Neutral" without calling the checker.
+
+    Two scoring methods are supported:
+
+    - "bm25": BM25 score of the claim as a query against the passage, with IDF computed
+      over the retrieved context the passage belongs to, normalized to [0, 1) by the
+      score of a passage containing every claim term infinitely often.
+    - "embedding": cosine similarity of sentence embeddings computed on CPU with a
+      sentence-transformers model (optional dependency).
+
+    Scores only depend on the pair and its retrieved context, and the audit sample on a
+    hash of the pair, so the same pairs are skipped whatever the batching, concurrency,
+    streaming windows or sharding of a run.
+
+    Pairs scoring below `threshold` are skipped, except for an `audit_rate` fraction
+    that is still sent to the checker. The threshold is not calibrated: the default
+    is a conservative guess. `report` estimates from the audited and checked pairs the
+    share of the entailed pairs the prefilter keeps (its recall), and the threshold
+    that would keep `target_recall` of them, to calibrate the threshold of later runs.
+
+    Parameters
+    ----------
+    method : str, optional
+        Either "bm25" or "embedding". Default: "bm25".
+    threshold : float, optional
+        Pairs scoring below this value are skipped. Default: 0.1.
+    audit_rate : float, optional
+        Fraction of the skipped pairs sent to the checker anyway. Default: 0.05.
+    target_recall : float, optional
+        Recall of the entailed pairs targeted by the suggested threshold. Default: 0.99.
+    embedding_model : str, optional
+        sentence-transformers model for the "embedding" method.
+        Default: "sentence-transformers/all-MiniLM-L6-v2".
+    seed : int, optional
+        Seed of the audit sampling. Default: 0.
+    """
+    def __init__(
+        self,
+        method: str = "bm25",
+        threshold: float = 0.1,
+        audit_rate: float = 0.05,
+        target_recall: float = 0.99,
+        embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        k1: float = 1.5,
+        b: float = 0.75,
+        seed: int = 0
+    ):
+        if method not in ["bm25", "embedding"]:
+            raise ValueError(f"Invalid prefilter method: {method}")
+        self.method = method
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.target_recall = target_recall
+        self.k1 = k1
+        self.b = b
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        # (score, weight) of the entailed pairs among the checked ones, audited pairs
+        # weighted by the inverse of the audit rate
+        self._entailed = []
+        self._encoder = None
+        if method == "embedding":
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise ImportError(
+                    "The embedding prefilter requires sentence-transformers, "
+                    "install it with `pip install sentence-transformers`."
+                )
+            self._encoder = SentenceTransformer(embedding_model, device="cpu")
+
+    def score(self, pairs: List[Tuple[object, str]], contexts: Optional[List[Sequence[str]]] = None) -> np.ndarray:
+        """
+        Relevance scores of (claim, passage) pairs. `contexts` gives the retrieved context
+        (list of passages) of every pair, the corpus of the BM25 IDF. Without it, the
+        passages of `pairs` form a single corpus.
+        """
+        if not pairs:
+            return np.zeros(0)
+        if self.method == "bm25":
+            if contexts is None:
+                context = tuple(dict.fromkeys(psg for _, psg in pairs))
+                contexts = [context] * len(pairs)
+            return self._bm25(pairs, contexts)
+        return self._cosine(pairs)
+
+    def _bm25(self, pairs, contexts):
+        psg_tokens = {}
+        for context in contexts:
+            for psg in context:
+                if psg not in psg_tokens:
+                    psg_tokens[psg] = Counter(tokenize(psg))
+        corpora = {}  # statistics of every distinct context: (number of passages, average length, document frequencies)
+
+        def corpus(context):
+            key = tuple(context)
+            if key not in corpora:
+                passages = list(dict.fromkeys(key))
+                lengths = [sum(psg_tokens[psg].values()) for psg in passages]
+                doc_freq = Counter(t for psg in passages for t in psg_tokens[psg])
+                corpora[key] = (len(passages), max(np.mean(lengths), 1.0) if lengths else 1.0, doc_freq)
+            return corpora[key]
+
+        scores = np.zeros(len(pairs))
+        for i, ((claim, psg), context) in enumerate(zip(pairs, contexts)):
+            terms = set(tokenize(claim_text(claim)))
+            if not terms:
+                continue
+            n, avg_len, doc_freq = corpus(context)
+
+            def idf(term):
+                return math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+
+            tokens = psg_tokens[psg]
+            length = sum(tokens.values())
+            norm = self.k1 * (1 - self.b + self.b * length / avg_len)
+            score = sum(
+                idf(t) * tokens[t] * (self.k1 + 1) / (tokens[t] + norm) for t in terms if t in tokens
+            )
+            best = sum(idf(t) * (self.k1 + 1) for t in terms)
+            scores[i] = score / best if best > 0 else 0.
+        return scores
+
+    def _cosine(self, pairs):
+        texts = list(dict.fromkeys([claim_text(c) for c, _ in pairs] + [psg for _, psg in pairs]))
+        index = {text: i for i, text in enumerate(texts)}
+        embeddings = self._encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        claim_emb = embeddings[[index[claim_text(c)] for c, _ in pairs]]
+        psg_emb = embeddings[[index[psg] for _, psg in pairs]]
+        return np.sum(claim_emb * psg_emb, axis=1)
+
+    def _audited(self, claim, passage: str) -> bool:
+        """Whether a pair is in the audit sample, from a hash of the pair so that the sample is the same in every run."""
+        digest = hashlib.blake2b(
+            f"{self.seed}\0{claim_text(claim)}\0{passage}".encode("utf-8"), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.audit_rate
+
+    def select(self, pairs: List[Tuple[object, str]], contexts: Optional[List[Sequence[str]]] = None):
+        """
+        Decide which pairs are skipped, see `score` for `contexts`.
+
+        Returns
+        -------
+        skip : np.ndarray
+            Boolean mask of the pairs to mark as "Neutral" without checking.
+        audit : np.ndarray
+            Boolean mask of the low-scoring pairs that are still checked for auditing.
+        scores : np.ndarray
+            Scores of the pairs, to pass to `record` with their verdicts.
+        """
+        scores = self.score(pairs, contexts)
+        below = scores < self.threshold
+        audit = below & np.array([self._audited(claim, psg) for claim, psg in pairs], dtype=bool)
+        skip = below & ~audit
+        with self._lock:
+            self.counts["pairs"] += len(pairs)
+            self.counts["skipped"] += int(skip.sum())
+        return skip, audit, scores
+
+    def record(self, scores: Sequence[float], labels: List[str], audited: Sequence[bool]):
+        """Record the checker's verdicts of the pairs sent to it, audited or above the threshold."""
+        with self._lock:
+            for score, label, is_audit in zip(scores, labels, audited):
+                if is_audit:
+                    self.counts["audited"] += 1
+                    self.counts["audit_agreed"] += label != "Entailment"
+                if label == "Entailment":
+                    self._entailed.append((float(score), 1 / self.audit_rate if is_audit else 1.))
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self._entailed = []
+
+    def suggested_threshold(self) -> Optional[float]:
+        """
+        Highest threshold whose skipped pairs hold at most `1 - target_recall` of the
+        estimated entailed pairs, None before any entailed pair is recorded. Below the
+        current threshold, the estimate rests on the audit sample only.
+        """
+        with self._lock:
+            entailed = sorted(self._entailed)
+        if not entailed:
+            return None
+        budget = (1 - self.target_recall) * sum(weight for _, weight in entailed)
+        suggested, missed = entailed[0][0], 0.
+        for score, weight in entailed:
+            if missed > budget:
+                break
+            suggested = score
+            missed += weight
+        return suggested
+
+    def report(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+            entailed = list(self._entailed)
+        pairs, audited = counts.get("pairs", 0), counts.get("audited", 0)
+        kept = sum(weight for score, weight in entailed if score >= self.threshold)
+        total = sum(weight for _, weight in entailed)
+        suggested = self.suggested_threshold()
+        return {
+            "pairs": pairs,
+            "skipped": counts.get("skipped", 0),
+            "skip_rate": round(counts.get("skipped", 0) / pairs, 4) if pairs else 0.,
+            "audited": audited,
+            "audit_agreement": round(counts.get("audit_agreed", 0) / audited, 4) if audited else None,
+            "estimated_recall": round(kept / total, 4) if total else None,
+            "suggested_threshold": round(suggested, 4) if suggested is not None else None,
+        }
@@ -0,0 +1,143 @@
+import os
+import re
+import inspect
+import threading
+import urllib.request
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+# prefix cache counters of an OpenAI-compatible server on its Prometheus endpoint, in
+# tokens: vLLM V1 counts queried and hit tokens, older vLLM exposes a hit rate gauge
+PREFIX_CACHE_COUNTERS = ("vllm:prefix_cache_hits_total", "vllm:prefix_cache_queries_total")
+PREFIX_CACHE_GAUGES = ("vllm:gpu_prefix_cache_hit_rate",)
+METRIC_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{[^}]*\})?\s+(\S+)", re.MULTILINE)
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def prefix_order(prompts: List[str]) -> List[int]:
+    """
+    Order of the prompts sending the ones with a common prefix back to back: in sorted
+    order, the prompts sharing any prefix are contiguous, so every prompt follows the
+    one it shares the longest prefix with.
+    """
+    return sorted(range(len(prompts)), key=prompts.__getitem__)
+
+
+def shared_prefix_chars(prompts: List[str]) -> int:
+    """Characters of every prompt in common with the start of the previous one."""
+    return sum(common_prefix_length(prev, prompt) for prev, prompt in zip(prompts, prompts[1:]))
+
+
+def metrics_url(api_base: str) -> str:
+    """Prometheus endpoint of an OpenAI-compatible server, e.g. "http://host:8000/metrics" for "http://host:8000/v1"."""
+    root = api_base.rstrip("/")
+    if root.endswith("/v1"):
+        root = root[:-len("/v1")]
+    return f"{root}/metrics"
+
+
+def read_prefix_cache_metrics(api_base: Optional[str], timeout: float = 5.0) -> Optional[Dict[str, float]]:
+    """
+    Prefix cache metrics exposed by the server at `api_base`, or None if the server does
+    not expose any or cannot be reached.
+    """
+    if api_base is None or not api_base.startswith("http"):
+        return None
+    try:
+        with urllib.request.urlopen(metrics_url(api_base), timeout=timeout) as response:
+            text = response.read().decode("utf-8")
+    except (OSError, ValueError) as e:
+        logger.debug(f"No prefix cache metrics from {api_base}: {e}")
+        return None
+    metrics = {}
+    for name, value in METRIC_LINE.findall(text):
+        if name not in PREFIX_CACHE_COUNTERS and name not in PREFIX_CACHE_GAUGES:
+            continue
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        # counters add up over the label sets (e.g. models), gauges keep the last one
+        metrics[name] = metrics.get(name, 0.) + value if name in PREFIX_CACHE_COUNTERS else value
+    return metrics or None
+
+
+class PrefixScheduler:
+    """
+    Wrapper of an LLM API function of refchecker, `func(prompts) -> responses`, which
+    sends each batch of prompts in `prefix_order`, so that a server with prefix caching
+    (e.g. vLLM with `--enable-prefix-caching`) computes a shared prefix such as the
+    instructions and the reference once for the prompts sent back to back. The
+    responses are returned in the original order, or None if `func` returns None.
+
+    The share of prompt characters in common with the previous prompt is tracked, and
+    the prefix cache hit rate of the server at `api_base` is read from its Prometheus
+    endpoint when it exposes one.
+
+    Parameters
+    ----------
+    func : Callable
+        The LLM API function.
+    api_base : str, optional
+        Base URL of the OpenAI-compatible server behind `func`. Default: None.
+    """
+    def __init__(self, func: Callable, api_base: Optional[str] = None):
+        self.func = func
+        self.api_base = api_base
+        # keep the signature of `func`, whose keyword arguments are passed through
+        self.__signature__ = inspect.signature(func)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._server_start = None
+
+    def __call__(self, prompts: List[str], *args, **kwargs) -> List[str]:
+        order = prefix_order(prompts)
+        scheduled = [prompts[i] for i in order]
+        with self._lock:
+            self.counts["prompts"] += len(prompts)
+            self.counts["chars"] += sum(map(len, prompts))
+            self.counts["shared_chars"] += shared_prefix_chars(scheduled)
+        responses = self.func(scheduled, *args, **kwargs)
+        if responses is None:
+            # refchecker's LLM functions return None when the API fails
+            return None
+        ordered = [None] * len(prompts)
+        for i, response in zip(order, responses):
+            ordered[i] = response
+        return ordered
+
+    def reset(self):
+        """Reset the counts and take a snapshot of the server metrics."""
+        with self._lock:
+            self.counts.clear()
+        self._server_start = read_prefix_cache_metrics(self.api_base)
+
+    def server_hit_rate(self) -> Optional[float]:
+        """Prefix cache hit rate of the server since `reset`, None if it does not expose one."""
+        end = read_prefix_cache_metrics(self.api_base)
+        if end is None:
+            return None
+        hits, queries = PREFIX_CACHE_COUNTERS
+        if queries in end:
+            start = self._server_start or {}
+            num_queries = end[queries] - start.get(queries, 0.)
+            return (end.get(hits, 0.) - start.get(hits, 0.)) / num_queries if num_queries > 0 else None
+        # otherwise the server's own hit rate gauge
+        gauges = [end[name] for name in PREFIX_CACHE_GAUGES if name in end]
+        return gauges[0] if gauges else None
+
+    def report(self) -> dict:
+        """Prompt counts, shared prefix share of the prompt characters, and server hit rate."""
+        report = {"prompts": self.counts["prompts"]}
+        chars = self.counts["chars"]
+        report["shared_prefix"] = round(self.counts["shared_chars"] / chars, 3) if chars else 0.
+        hit_rate = self.server_hit_rate()
+        if hit_rate is not None:
+            report["server_prefix_cache_hit_rate"] = round(hit_rate, 3)
+        return report
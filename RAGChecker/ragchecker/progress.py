@@ -0,0 +1,35 @@
+import threading
+from typing import Callable, Dict, Tuple
+
+from loguru import logger
+
+
+class ProgressTracker:
+    """
+    Thread-safe per-stage progress counter of an evaluation run.
+
+    Every update is logged and forwarded to an optional callback with the signature
+    ``callback(stage, name, done, total)``, where `stage` is either "extract" or "check",
+    `name` is the extraction type ('gt_answer' / 'response') or the check type, and
+    `done` / `total` count RAG results.
+    """
+    def __init__(self, callback: Callable | None = None):
+        self.totals: Dict[Tuple[str, str], int] = {}
+        self.done: Dict[Tuple[str, str], int] = {}
+        self.callback = callback
+        self._lock = threading.Lock()
+
+    def set_total(self, stage: str, name: str, total: int):
+        with self._lock:
+            self.totals[(stage, name)] = total
+            self.done[(stage, name)] = 0
+
+    def update(self, stage: str, name: str, num: int) -> bool:
+        """Record `num` more finished results, return True if this update completes the stage."""
+        with self._lock:
+            self.done[(stage, name)] += num
+            done, total = self.done[(stage, name)], self.totals[(stage, name)]
+        logger.info(f"Progress of {stage} {name}: {done}/{total} RAG results.")
+        if self.callback is not None:
+            self.callback(stage, name, done, total)
+        return done >= total and done - num < total
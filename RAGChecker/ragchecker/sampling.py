@@ -0,0 +1,290 @@
+import time
+import heapq
+import random
+from collections import Counter, defaultdict
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from .container import RAGResults, RAGResult
+from .evaluator import RAGChecker, resolve_metrics
+from .metrics import METRIC_GROUP_MAP, all_metrics
+
+
+# stats of `RAGChecker` counted against the request budget
+REQUEST_STATS = ["extractor_requests", "checker_requests"]
+
+
+def used_tokens(evaluator: RAGChecker) -> int:
+    """Tokens, prompt plus generated, used so far by the LLM executors of an evaluator with `async_llm`."""
+    return sum(executor.counts["tokens"] for executor in evaluator.llm_executors.values())
+
+
+def sampling_order(
+    results: List[RAGResult], strata: Optional[Callable[[RAGResult], object]] = None, seed: int = 0
+) -> List[int]:
+    """
+    Random order of the RAG results. With `strata`, a function giving the stratum of a
+    result, every prefix of the order samples the strata in proportion to their sizes:
+    the next result is always drawn from the stratum sampled least relative to its size.
+    """
+    rng = random.Random(seed)
+    groups = defaultdict(list)
+    for i, result in enumerate(results):
+        groups[strata(result) if strata is not None else None].append(i)
+    for indices in groups.values():
+        rng.shuffle(indices)
+    # (fraction sampled after the next draw, tie breaker, stratum)
+    heap = [(1 / len(indices), rng.random(), key) for key, indices in groups.items()]
+    heapq.heapify(heap)
+    taken = Counter()
+    order = []
+    while heap:
+        _, _, key = heapq.heappop(heap)
+        order.append(groups[key][taken[key]])
+        taken[key] += 1
+        if taken[key] < len(groups[key]):
+            heapq.heappush(heap, ((taken[key] + 1) / len(groups[key]), rng.random(), key))
+    return order
+
+
+class StratifiedEstimate:
+    """
+    Running estimate of the dataset-level mean of a metric from a stratified random
+    sample, with proportional stratum weights and the finite population correction.
+
+    Parameters
+    ----------
+    stratum_sizes : Dict
+        Number of RAG results of every stratum in the dataset.
+    """
+    def __init__(self, stratum_sizes: Dict):
+        self.stratum_sizes = stratum_sizes
+        self.values = defaultdict(list)
+
+    def add(self, stratum, value: float):
+        self.values[stratum].append(value)
+
+    @property
+    def sample_size(self) -> int:
+        return sum(map(len, self.values.values()))
+
+    def _weights(self):
+        # strata not sampled yet are left out and the weights renormalized
+        sampled = {key: size for key, size in self.stratum_sizes.items() if self.values[key]}
+        total = sum(sampled.values())
+        return {key: size / total for key, size in sampled.items()}
+
+    def mean(self) -> float:
+        return sum(w * np.mean(self.values[key]) for key, w in self._weights().items())
+
+    def variance(self, finite_population: bool = True) -> float:
+        """Variance of the estimated mean, strata sampled once contributing none."""
+        variance = 0.
+        for key, w in self._weights().items():
+            values, size = self.values[key], self.stratum_sizes[key]
+            if len(values) > 1:
+                fpc = 1 - len(values) / size if finite_population else 1.
+                variance += w ** 2 * np.var(values, ddof=1) / len(values) * fpc
+        return variance
+
+    def effective_sample_size(self) -> float:
+        """Size of a simple random sample (with replacement) giving the same variance as the estimate."""
+        values = [value for stratum_values in self.values.values() for value in stratum_values]
+        variance = self.variance(finite_population=False)
+        if len(values) < 2 or variance == 0:
+            return float(len(values))
+        return float(np.var(values, ddof=1) / variance)
+
+    def normal_interval(self, z: float):
+        mean = self.mean()
+        half_width = z * np.sqrt(self.variance())
+        return mean - half_width, mean + half_width
+
+    def bootstrap_interval(self, confidence: float, num_resamples: int, rng: np.random.Generator):
+        """
+        Percentile interval of a bootstrap resampling every stratum separately, with the
+        deviations of each stratum scaled by the square root of its finite population correction.
+        """
+        means = np.zeros(num_resamples)
+        for key, w in self._weights().items():
+            values = np.asarray(self.values[key])
+            samples = rng.integers(0, len(values), size=(num_resamples, len(values)))
+            fpc = 1 - len(values) / self.stratum_sizes[key]
+            means += w * (values.mean() + np.sqrt(fpc) * (values[samples].mean(axis=1) - values.mean()))
+        alpha = (1 - confidence) / 2
+        return tuple(np.quantile(means, [alpha, 1 - alpha]))
+
+
+def evaluate_adaptive(
+    evaluator: RAGChecker,
+    results: RAGResults,
+    metrics=all_metrics,
+    ci_half_width=1.0,
+    confidence=0.95,
+    ci_method="normal",
+    batch_size=50,
+    min_results=30,
+    strata: Optional[Callable[[RAGResult], object]] = None,
+    max_results=None,
+    max_requests=None,
+    max_tokens=None,
+    max_seconds=None,
+    num_resamples=1000,
+    seed=0,
+    save_path=None
+) -> dict:
+    """
+    Estimate the dataset-level metrics from a random sample of the RAG results, grown
+    batch by batch until the confidence interval of every metric is narrow enough or a
+    budget runs out.
+
+    The results are evaluated in random order (see `sampling_order`), in batches of
+    `batch_size`. After each batch the mean of every requested metric is estimated, in
+    percent like `RAGResults.metrics`, with a confidence interval. Sampling stops when
+    every interval is at most `ci_half_width` points on each side of its estimate, when
+    all results are evaluated, or when a budget runs out.
+
+    Parameters
+    ----------
+    evaluator : RAGChecker
+        Evaluator of each batch.
+    results : RAGResults
+        The RAG results to sample from. Sampled results are evaluated in place.
+    metrics : str | list[str], optional
+        Metrics to estimate. Default: 'all'.
+    ci_half_width : float, optional
+        Target half width of the confidence intervals, in percentage points. Default: 1.0.
+    confidence : float, optional
+        Confidence level of the intervals. Default: 0.95.
+    ci_method : str, optional
+        "normal" for normal intervals with the finite population correction, or
+        "bootstrap" for percentile intervals of a stratified bootstrap. Default: "normal".
+    batch_size : int, optional
+        Number of RAG results evaluated between two checks of the intervals. Default: 50.
+    min_results : int, optional
+        Minimum sample size before stopping on the intervals. Default: 30.
+    strata : callable, optional
+        Function giving the stratum of a RAG result, e.g. its query type. The sample is
+        then drawn in proportion to the stratum sizes and the estimates are stratified.
+        Default: None (simple random sampling).
+    max_results : int, optional
+        Budget of evaluated RAG results. Default: None (no limit).
+    max_requests : int, optional
+        Budget of extractor and checker LLM prompts, as counted in `RAGChecker.stats`.
+        Once a batch is evaluated, the next one is shrunk to the remaining budget at the
+        prompts per result so far. Default: None (no limit).
+    max_tokens : int, optional
+        Budget of LLM tokens, prompt plus generated, i.e. the cost of the sampling, as
+        counted by the `AsyncLLMExecutor`s of `evaluator` from the usage reported by the
+        provider, or estimated when there is none. Requires an evaluator with
+        `async_llm`, the other LLM calls report no usage. The next batch is shrunk as
+        for `max_requests`. Default: None (no limit).
+    max_seconds : float, optional
+        Wall-clock budget in seconds. Default: None (no limit).
+    num_resamples : int, optional
+        Number of bootstrap resamples. Default: 1000.
+    seed : int, optional
+        Seed of the sampling order and of the bootstrap. Default: 0.
+    save_path : str, optional
+        Path to save the sampled RAG results, with the estimated metrics. Default: None.
+
+    Returns
+    -------
+    dict
+        The estimated metrics, in the format of `RAGResults.metrics`, plus
+        "confidence_intervals" ([low, high] of every metric), "sample_size",
+        "effective_sample_sizes" (per metric, see
+        `StratifiedEstimate.effective_sample_size`), "population_size", "num_requests",
+        "num_tokens" (0 without `async_llm`) and "stop_reason".
+    """
+    if ci_method not in ["normal", "bootstrap"]:
+        raise ValueError(f"Invalid ci_method: {ci_method}")
+    if max_tokens is not None and not evaluator.llm_executors:
+        raise ValueError("max_tokens requires an evaluator with async_llm, which counts the tokens of its requests.")
+    ret_metrics, _ = resolve_metrics(metrics)
+    rets = results.results
+    order = sampling_order(rets, strata, seed)
+    stratum_of = [strata(result) if strata is not None else None for result in rets]
+    estimates = {metric: StratifiedEstimate(Counter(stratum_of)) for metric in ret_metrics}
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rng = np.random.default_rng(seed)
+
+    start = time.monotonic()
+    num_requests = 0
+    start_tokens = used_tokens(evaluator)
+    num_tokens = 0
+    sampled = []
+    intervals = {}
+    stop_reason = "exhausted"
+    while len(sampled) < len(order):
+        size = batch_size if max_results is None else min(batch_size, max_results - len(sampled))
+        # no more results than the remaining budgets pay for at the usage per result so far
+        for budget, used in [(max_requests, num_requests), (max_tokens, num_tokens)]:
+            if budget is not None and used > 0:
+                size = max(1, min(size, int((budget - used) * len(sampled) / used)))
+        batch = order[len(sampled):len(sampled) + size]
+        evaluator.evaluate(RAGResults(results=[rets[i] for i in batch]), metrics=metrics)
+        num_requests += sum(evaluator.stats[name] for name in REQUEST_STATS)
+        num_tokens = used_tokens(evaluator) - start_tokens
+        sampled.extend(batch)
+        for i in batch:
+            for metric in ret_metrics:
+                # metrics undefined for a result (e.g. context precision of lazy checks) are left out
+                if metric in rets[i].metrics:
+                    estimates[metric].add(stratum_of[i], rets[i].metrics[metric] * 100)
+
+        intervals = {
+            metric: estimate.normal_interval(z) if ci_method == "normal"
+            else estimate.bootstrap_interval(confidence, num_resamples, rng)
+            for metric, estimate in estimates.items() if estimate.sample_size > 0
+        }
+        widest = max((high - low) / 2 for low, high in intervals.values()) if intervals else float("inf")
+        logger.info(
+            f"Sampled {len(sampled)}/{len(order)} RAG results, widest confidence interval: +/-{widest:.2f}."
+        )
+        if len(sampled) >= min_results and len(intervals) == len(ret_metrics) and widest <= ci_half_width:
+            stop_reason = "converged"
+            break
+        if max_results is not None and len(sampled) >= max_results:
+            stop_reason = "max_results"
+            break
+        if max_requests is not None and num_requests >= max_requests:
+            stop_reason = "max_requests"
+            break
+        if max_tokens is not None and num_tokens >= max_tokens:
+            stop_reason = "max_tokens"
+            break
+        if max_seconds is not None and time.monotonic() - start >= max_seconds:
+            stop_reason = "max_seconds"
+            break
+    logger.info(f"Adaptive sampling stopped ({stop_reason}) after {len(sampled)} RAG results.")
+
+    estimated = RAGResults().metrics
+    confidence_intervals = {}
+    effective_sample_sizes = {}
+    for group, group_metrics in METRIC_GROUP_MAP.items():
+        if group == all_metrics:
+            continue
+        for metric in group_metrics:
+            if metric in intervals:
+                estimated[group][metric] = round(float(estimates[metric].mean()), 1)
+                confidence_intervals[metric] = [round(float(bound), 1) for bound in intervals[metric]]
+                effective_sample_sizes[metric] = round(estimates[metric].effective_sample_size(), 1)
+    if save_path is not None:
+        sample = RAGResults(results=[rets[i] for i in sampled], metrics=estimated)
+        RAGChecker._save(
+            sample, save_path, compact=evaluator.compact_output, shared_passages=evaluator.shared_passages
+        )
+    return {
+        **estimated,
+        "confidence_intervals": confidence_intervals,
+        "sample_size": len(sampled),
+        "effective_sample_sizes": effective_sample_sizes,
+        "population_size": len(rets),
+        "num_requests": num_requests,
+        "num_tokens": num_tokens,
+        "stop_reason": stop_reason,
+    }
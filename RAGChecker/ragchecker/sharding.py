@@ -0,0 +1,163 @@
+import os
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+from typing import List
+
+from loguru import logger
+
+from .container import RAGResults, RAGResult
+from .evaluator import RAGChecker, resolve_metrics, aggregate_metrics
+from .jsonl import load_results
+from .metrics import all_metrics
+
+
+def shard_of(query_id: str, num_shards: int) -> int:
+    """Shard of a query id, stable across processes and runs."""
+    return zlib.crc32(str(query_id).encode("utf-8")) % num_shards
+
+
+def shard_results(results: RAGResults, num_shards: int) -> List[List[int]]:
+    """Partition the RAG results by query id into `num_shards` lists of indices."""
+    shards = [[] for _ in range(num_shards)]
+    for i, result in enumerate(results.results):
+        shards[shard_of(result.query_id, num_shards)].append(i)
+    return shards
+
+
+def shard_path(save_path: str, shard: int) -> str:
+    return f"{save_path}.shard{shard}"
+
+
+def _load_shard(save_path: str, shard: int, results: List[RAGResult]):
+    """
+    The saved output of a finished shard, or None if there is none or it does not hold
+    the given results. Shard outputs are written atomically, so an existing one is complete.
+    """
+    path = shard_path(save_path, shard)
+    if not os.path.exists(path):
+        return None
+    try:
+        evaluated = load_results(path).results
+    except Exception as e:
+        logger.warning(f"Cannot read the output of shard {shard} at {path}, evaluating it again: {e}")
+        return None
+    if [result.query_id for result in evaluated] != [result.query_id for result in results]:
+        logger.warning(f"The output of shard {shard} at {path} holds other RAG results, evaluating it again.")
+        return None
+    return evaluated
+
+
+# evaluator of the current worker process, created once by `_init_worker`
+_worker_evaluator = None
+
+
+def _init_worker(evaluator_kwargs):
+    global _worker_evaluator
+    _worker_evaluator = RAGChecker(**evaluator_kwargs)
+
+
+def _evaluate_shard(shard, results, metrics, save_path, resume, previous):
+    _worker_evaluator.evaluate(results, metrics=metrics, save_path=save_path, resume=resume, previous=previous)
+    return shard, results.results
+
+
+def evaluate_sharded(
+    evaluator_kwargs: dict,
+    results: RAGResults,
+    metrics=all_metrics,
+    workers=2,
+    shards_per_worker=4,
+    save_path=None,
+    resume=False,
+    previous=None
+):
+    """
+    Evaluate RAG results with a pool of worker processes, each running its own
+    `RAGChecker(**evaluator_kwargs)`, e.g. with its own local checker model.
+
+    The results are partitioned by query id into `workers * shards_per_worker` shards.
+    The evaluated shards are merged back into `results` as they finish, and the
+    dataset-level metrics are computed from the metrics of every RAG result, so they
+    are the same as for an evaluation in one process.
+
+    Parameters
+    ----------
+    evaluator_kwargs : dict
+        Arguments of the `RAGChecker` created in each worker process.
+    results : RAGResults
+        RAG results to evaluate, updated in place.
+    metrics : str | list[str], optional
+        Metrics to compute. Default: 'all_metrics'.
+    workers : int, optional
+        Number of worker processes. Default: 2.
+    shards_per_worker : int, optional
+        Number of shards per worker, more shards balance the load better. Default: 4.
+    save_path : str, optional
+        Path to save the merged results. Each shard journals its progress and saves its
+        results next to it as `<save_path>.shard<k>`, removed once merged. Default: None.
+    resume : bool, optional
+        Reuse the saved output of every finished shard, and resume the other shards from
+        their journals. Default: False.
+    previous : str | Iterable[RAGResult], optional
+        Output of a previous evaluation to evaluate incrementally against, see
+        `RAGChecker.evaluate`. Each shard receives the part of it for its query ids.
+        Default: None.
+    """
+    ret_metrics, _ = resolve_metrics(metrics)
+    if previous is not None:
+        previous = RAGChecker._previous_index(previous)
+    shards = shard_results(results, workers * shards_per_worker)
+    logger.info(f"Evaluating {len(results.results)} RAG results in {len(shards)} shards with {workers} workers.")
+
+    num_done = 0
+
+    def merge(shard, evaluated):
+        nonlocal num_done
+        for i, shard_result in zip(shards[shard], evaluated):
+            for f in fields(RAGResult):
+                setattr(results.results[i], f.name, getattr(shard_result, f.name))
+        num_done += len(evaluated)
+
+    finished = set()
+    if resume and save_path is not None:
+        for shard, indices in enumerate(shards):
+            evaluated = _load_shard(save_path, shard, [results.results[i] for i in indices]) if indices else None
+            if evaluated is not None:
+                merge(shard, evaluated)
+                finished.add(shard)
+        if finished:
+            logger.info(f"Reused the outputs of {len(finished)} finished shards: {num_done} RAG results.")
+
+    # worker processes are spawned, as forking a process with loaded models or threads is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(evaluator_kwargs,)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _evaluate_shard, shard, RAGResults(results=[results.results[i] for i in indices]),
+                metrics, None if save_path is None else shard_path(save_path, shard), resume,
+                None if previous is None else {
+                    results.results[i].query_id: previous[results.results[i].query_id]
+                    for i in indices if results.results[i].query_id in previous
+                }
+            )
+            for shard, indices in enumerate(shards) if indices and shard not in finished
+        ]
+        for future in as_completed(futures):
+            shard, evaluated = future.result()
+            merge(shard, evaluated)
+            logger.info(f"Merged shard {shard}: {num_done}/{len(results.results)} RAG results evaluated.")
+
+    aggregate_metrics(results, ret_metrics)
+    RAGChecker._save(
+        results, save_path, compact=evaluator_kwargs.get("compact_output", False),
+        shared_passages=evaluator_kwargs.get("shared_passages", False)
+    )
+    if save_path is not None:
+        for shard, indices in enumerate(shards):
+            if indices and os.path.exists(shard_path(save_path, shard)):
+                os.remove(shard_path(save_path, shard))
+    return results.metrics
@@ -0,0 +1,164 @@
+import os
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from loguru import logger
+
+from .container import RAGResults, RAGResult
+from .evaluator import RAGChecker, CHECK_CLAIM_SOURCE, resolve_metrics, compute_metrics
+from .incremental import content_hash
+from .jsonl import load_results
+from .metrics import METRIC_GROUP_MAP, all_metrics
+
+
+def system_name(path: str) -> str:
+    """Name of a system from the path of its results file, e.g. "bm25_gpt_4" for "out/bm25_gpt_4.json"."""
+    name = os.path.basename(path)
+    for ext in [".jsonl.zst", ".jsonl", ".json"]:
+        if name.endswith(ext):
+            return name[:-len(ext)]
+    return name
+
+
+def _extraction_key(result: RAGResult, extract_type: str) -> bytes:
+    return content_hash(json.dumps([result.query, getattr(result, extract_type)], ensure_ascii=False))
+
+
+def _check_key(result: RAGResult, check_type: str) -> bytes:
+    claims = getattr(result, f"{CHECK_CLAIM_SOURCE[check_type]}_claims")
+    if check_type.startswith("retrieved"):
+        reference = [doc.text for doc in result.retrieved_context]
+    else:
+        reference = result.gt_answer if check_type == "answer2response" else result.response
+    return content_hash(json.dumps([result.query, claims, reference], ensure_ascii=False))
+
+
+def _group(results: List[RAGResult], key) -> List[List[RAGResult]]:
+    groups = defaultdict(list)
+    for result in results:
+        groups[key(result)].append(result)
+    return list(groups.values())
+
+
+def evaluate_systems(
+    evaluator: RAGChecker,
+    systems: Dict[str, RAGResults],
+    metrics=all_metrics,
+    output_dir=None
+) -> Dict[str, dict]:
+    """
+    Evaluate several RAG systems on the same queries, computing every intermediate
+    result shared by several systems once.
+
+    The results of all systems are grouped by the inputs of each intermediate result:
+    claims by (query, text), checks by (query, claims, reference). Systems sharing a
+    retriever share their retrieved2answer matrices, all systems share the claims of the
+    ground truth answers, and identical responses share their claims and checks. Each
+    group is extracted or checked once, through `evaluator`, and the output is copied to
+    every member. Values already present in any member are reused.
+
+    Parameters
+    ----------
+    evaluator : RAGChecker
+        Evaluator running the extractions and checks.
+    systems : Dict[str, RAGResults]
+        RAG results of every system, by system name, updated in place.
+    metrics : str | list[str], optional
+        Metrics to compute. Default: 'all'.
+    output_dir : str, optional
+        Directory to save the results of each system to, as `<system>.json`, and the
+        metrics of all systems to, as `metrics.json`. Default: None.
+
+    Returns
+    -------
+    Dict[str, dict]
+        Dataset-level metrics of every system, in the format of `RAGResults.metrics`.
+    """
+    ret_metrics, requirements = resolve_metrics(metrics)
+    query_ids = {name: {result.query_id for result in results.results} for name, results in systems.items()}
+    if len({frozenset(ids) for ids in query_ids.values()}) > 1:
+        logger.warning("The systems are not evaluated on the same query ids, their metrics are not comparable.")
+
+    evaluator._set_lazy_check_types(ret_metrics)
+    evaluator.stats.clear()
+    all_results = [result for results in systems.values() for result in results.results]
+
+    for extract_type in sorted({CHECK_CLAIM_SOURCE[check_type] for check_type in requirements}):
+        field = f"{extract_type}_claims"
+        groups = _group(all_results, lambda result: _extraction_key(result, extract_type))
+        heads = []
+        for group in groups:
+            done = next((result for result in group if getattr(result, field) is not None), None)
+            heads.append(done or group[0])
+        evaluator.extract_claims(heads, extract_type=extract_type)
+        for head, group in zip(heads, groups):
+            for result in group:
+                if getattr(result, field) is None:
+                    setattr(result, field, getattr(head, field))
+        logger.info(f"Extracted {field} once for {len(groups)} distinct of {len(all_results)} RAG results.")
+        evaluator.stats[f"shared_{field}"] += len(all_results) - len(groups)
+
+    for check_type in sorted(requirements):
+        groups = _group(all_results, lambda result: _check_key(result, check_type))
+        heads = []
+        for group in groups:
+            done = next((result for result in group if not evaluator._needs_check(result, check_type)), None)
+            heads.append(done or group[0])
+        evaluator.check_claims(RAGResults(results=heads), check_type=check_type)
+        for head, group in zip(heads, groups):
+            tiers = (head.verdict_tiers or {}).get(check_type)
+            for result in group:
+                if result is head or not evaluator._needs_check(result, check_type):
+                    continue
+                setattr(result, check_type, getattr(head, check_type))
+                if tiers is not None:
+                    result.verdict_tiers = {**(result.verdict_tiers or {}), check_type: tiers}
+        logger.info(f"Checked {check_type} once for {len(groups)} distinct of {len(all_results)} RAG results.")
+        evaluator.stats[f"shared_{check_type}"] += len(all_results) - len(groups)
+    logger.info(f"Evaluation stats: {dict(evaluator.stats)}")
+
+    for results in systems.values():
+        compute_metrics(results, ret_metrics)
+    system_metrics = {name: results.metrics for name, results in systems.items()}
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        for name, results in systems.items():
+            RAGChecker._save(
+                results, os.path.join(output_dir, f"{name}.json"),
+                compact=evaluator.compact_output, shared_passages=evaluator.shared_passages
+            )
+        with open(os.path.join(output_dir, "metrics.json"), "w") as f:
+            json.dump(system_metrics, f, indent=2)
+    return system_metrics
+
+
+def metrics_table(system_metrics: Dict[str, dict]) -> str:
+    """Side-by-side table of the metrics of several systems, one row per metric and one column per system."""
+    names = list(system_metrics)
+    rows = [["metric", *names]]
+    for group, group_metrics in METRIC_GROUP_MAP.items():
+        if group == all_metrics:
+            continue
+        for metric in group_metrics:
+            values = [system_metrics[name].get(group, {}).get(metric) for name in names]
+            if any(value is not None for value in values):
+                rows.append([metric, *["-" if value is None else f"{value:.1f}" for value in values]])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = [
+        "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    ]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def load_systems(paths: List[str]) -> Dict[str, RAGResults]:
+    """Load the results of several systems, named by `system_name`."""
+    systems = {}
+    for path in paths:
+        name = system_name(path)
+        if name in systems:
+            raise ValueError(f"Duplicate system name {name} of {path}.")
+        systems[name] = load_results(path)
+    return systems
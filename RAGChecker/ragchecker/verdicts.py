@@ -0,0 +1,94 @@
+from typing import Iterator, List, Tuple
+
+from .encoding import UNCHECKED
+
+
+Cell = Tuple[int, int]  # (unit index, claim index)
+
+
+class VerdictGrid:
+    """
+    Verdicts of a batch of checking items, addressed per (claim, reference) cell.
+
+    Every item is split into single-reference units: one unit per item when the
+    references are merged (`merge_psg=True`), otherwise one unit per retrieved passage.
+    A cell is a (unit index, claim index) pair and holds one verdict. `labels` keeps the
+    output shape of the checker: a list of labels per item when merged, a
+    [claim, passage] matrix per item otherwise. `tiers` mirrors `labels` and records
+    which stage decided each verdict, if tracking is enabled.
+    """
+    def __init__(self, claims, references, merge_psg: bool, track_tiers: bool = False):
+        self.claims = claims
+        self.references = references
+        self.merge_psg = merge_psg
+        self.units = []  # (item index, passage index or None, reference text)
+        for i, refs in enumerate(references):
+            if merge_psg:
+                self.units.append((i, None, refs))
+            else:
+                self.units.extend((i, k, psg) for k, psg in enumerate(refs))
+        self.labels = self._empty(claims, references)
+        self.tiers = self._empty(claims, references) if track_tiers else None
+
+    def _empty(self, claims, references):
+        return [
+            [None] * len(item_claims) if self.merge_psg else [[None] * len(refs) for _ in item_claims]
+            for item_claims, refs in zip(claims, references)
+        ]
+
+    def cells(self) -> Iterator[Cell]:
+        for u, (i, _, _) in enumerate(self.units):
+            for j in range(len(self.claims[i])):
+                yield u, j
+
+    def item(self, cell: Cell) -> int:
+        return self.units[cell[0]][0]
+
+    def claim(self, cell: Cell):
+        return self.claims[self.units[cell[0]][0]][cell[1]]
+
+    def reference(self, cell: Cell) -> str:
+        return self.units[cell[0]][2]
+
+    def context(self, cell: Cell):
+        """All references of the item of a cell, e.g. its whole retrieved context."""
+        return self.references[self.units[cell[0]][0]]
+
+    def label(self, cell: Cell) -> str | None:
+        i, k, _ = self.units[cell[0]]
+        return self.labels[i][cell[1]] if k is None else self.labels[i][cell[1]][k]
+
+    def set(self, cell: Cell, label: str, tier: str | None = None):
+        i, k, _ = self.units[cell[0]]
+        for grid, value in [(self.labels, label), (self.tiers, tier)]:
+            if grid is None:
+                continue
+            if k is None:
+                grid[i][cell[1]] = value
+            else:
+                grid[i][cell[1]][k] = value
+
+    def preset(self, previous: list, tier: str = "previous") -> List[Cell]:
+        """
+        Fill the cells already decided in `previous`, the partial checking results of
+        every item (None for an item without any). Cells that are None or "Unchecked"
+        stay undecided, as do items whose shape does not match. Returns the filled cells.
+        """
+        filled = []
+        for cell in self.cells():
+            i, k, _ = self.units[cell[0]]
+            item = previous[i]
+            if item is None or len(item) != len(self.claims[i]):
+                continue
+            label = item[cell[1]] if k is None else item[cell[1]][k] if k < len(item[cell[1]]) else None
+            if label is not None and label != UNCHECKED:
+                self.set(cell, label, tier)
+                filled.append(cell)
+        return filled
+
+    def group_by_unit(self, cells: List[Cell]) -> List[Tuple[int, List[int]]]:
+        """Group cells into (unit index, claim indices), keeping the order of first appearance."""
+        groups = {}
+        for u, j in cells:
+            groups.setdefault(u, []).append(j)
+        return list(groups.items())
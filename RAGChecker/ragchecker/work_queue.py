@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from argparse import ArgumentParser
+from typing import List, Tuple
+
+from loguru import logger
+
+from .container import RAGResults, RAGResult
+from .codec import dumps_result, loads_result
+from .jsonl import load_results
+from .evaluator import RAGChecker, CHECK_CLAIM_SOURCE, resolve_metrics, compute_metrics
+from .metrics import all_metrics
+
+
+class WorkQueue:
+    """
+    Lease-based queue of evaluation work shared by workers on several hosts.
+
+    The queue is a SQLite database, which can live on shared storage for a multi-node
+    run or on local disk, e.g. for tests. The coordinator submits the RAG results once.
+    Each claim extraction (response or gt_answer claims) and each required check type of
+    each RAG result is a work unit, and units are grouped in batches of the same kind:
+    "extract" batches of a claim source, and "check" batches of a check type. A check
+    batch is only leased once the claims it checks are extracted, and it checks the
+    stored claims, so every claim list is extracted once and all checking results of a
+    RAG result refer to the same claims.
+
+    A worker leases a batch for `lease_seconds`, extends the lease with heartbeats while
+    working, and writes the claims or checking results back. Leases that expire, e.g.
+    because a worker died, are re-issued to other workers. The first completion of a
+    batch wins.
+
+    The database uses SQLite's rollback journal rather than WAL, which needs shared
+    memory between the processes and does not work on network file systems.
+
+    Parameters
+    ----------
+    path : str
+        Path to the queue database.
+    lease_seconds : float, optional
+        Duration of a lease without heartbeat. Default: 300.
+    """
+    def __init__(self, path: str, lease_seconds: float = 300):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=120, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS results (idx INTEGER PRIMARY KEY, data TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS batches (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+                "target TEXT NOT NULL, source TEXT NOT NULL, status TEXT NOT NULL, worker TEXT, "
+                "lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0);"
+                "CREATE TABLE IF NOT EXISTS units (batch_id INTEGER NOT NULL, result_idx INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS units_batch ON units (batch_id);"
+                "CREATE INDEX IF NOT EXISTS units_result ON units (result_idx);"
+                "CREATE TABLE IF NOT EXISTS claims (result_idx INTEGER NOT NULL, source TEXT NOT NULL, "
+                "claims TEXT NOT NULL, PRIMARY KEY (result_idx, source));"
+                "CREATE TABLE IF NOT EXISTS outputs (result_idx INTEGER NOT NULL, check_type TEXT NOT NULL, "
+                "labels TEXT NOT NULL, tiers TEXT, PRIMARY KEY (result_idx, check_type));"
+            )
+
+    def _transaction(self, func, *args):
+        """Run `func(conn, *args)` in a write transaction, taking the database lock upfront."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ret = func(self._conn, *args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return ret
+
+    def submit(self, results: RAGResults, metrics=all_metrics, batch_size: int = 32):
+        """Add the RAG results and their work units to an empty queue."""
+        _, requirements = resolve_metrics(metrics)
+
+        def submit(conn):
+            if conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] > 0:
+                raise ValueError(f"Work queue {self.path} already holds RAG results.")
+            conn.execute("INSERT INTO meta VALUES ('metrics', ?)", (json.dumps(metrics),))
+            conn.executemany(
+                "INSERT INTO results VALUES (?, ?)",
+                ((i, dumps_result(result)) for i, result in enumerate(results.results))
+            )
+            # results whose checking results are already given need no work
+            checks = {
+                check_type: [i for i, ret in enumerate(results.results) if getattr(ret, check_type) is None]
+                for check_type in sorted(requirements)
+            }
+            extractions = {}
+            for check_type, indices in checks.items():
+                source = CHECK_CLAIM_SOURCE[check_type]
+                extractions.setdefault(source, set()).update(
+                    i for i in indices if getattr(results.results[i], f"{source}_claims") is None
+                )
+            # extraction batches first, so that they are leased before the checks waiting on them
+            tasks = [("extract", source, source, sorted(indices)) for source, indices in sorted(extractions.items())]
+            tasks += [
+                ("check", check_type, CHECK_CLAIM_SOURCE[check_type], indices) for check_type, indices in checks.items()
+            ]
+            num_batches = 0
+            for kind, target, source, indices in tasks:
+                for start in range(0, len(indices), batch_size):
+                    batch_id = conn.execute(
+                        "INSERT INTO batches (kind, target, source, status) VALUES (?, ?, ?, 'pending')",
+                        (kind, target, source)
+                    ).lastrowid
+                    conn.executemany(
+                        "INSERT INTO units VALUES (?, ?)",
+                        ((batch_id, i) for i in indices[start:start + batch_size])
+                    )
+                    num_batches += 1
+            return num_batches
+
+        num_batches = self._transaction(submit)
+        logger.info(f"Submitted {len(results.results)} RAG results in {num_batches} batches to {self.path}.")
+
+    def lease(self, worker: str) -> Tuple[int, str, str, List[RAGResult]] | None:
+        """
+        Lease a pending batch, or one whose lease has expired. Check batches whose
+        claims are not all extracted yet are not available.
+
+        Returns
+        -------
+        (batch_id, kind, target, results) | None
+            The leased batch, its kind ("extract" or "check") and target (claim source or
+            check type), with its RAG results including the claims extracted by any
+            worker, or None if no batch is available.
+        """
+        def lease(conn):
+            now = time.time()
+            row = conn.execute(
+                "SELECT b.id, b.kind, b.target, b.status FROM batches b "
+                "WHERE (b.status = 'pending' OR (b.status = 'leased' AND b.lease_expires < ?)) "
+                "AND NOT (b.kind = 'check' AND EXISTS ("
+                "    SELECT 1 FROM units u JOIN units eu ON eu.result_idx = u.result_idx "
+                "    JOIN batches e ON e.id = eu.batch_id "
+                "    WHERE u.batch_id = b.id AND e.kind = 'extract' AND e.source = b.source AND e.status != 'done'"
+                ")) ORDER BY b.id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            batch_id, kind, target, status = row
+            if status == "leased":
+                logger.warning(f"Re-issuing batch {batch_id} ({kind} {target}) after its lease expired.")
+            conn.execute(
+                "UPDATE batches SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?", (worker, now + self.lease_seconds, batch_id)
+            )
+            return batch_id, kind, target
+
+        leased = self._transaction(lease)
+        if leased is None:
+            return None
+        batch_id, kind, target = leased
+        source = target if kind == "extract" else CHECK_CLAIM_SOURCE[target]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.data, c.claims FROM units u JOIN results r ON r.idx = u.result_idx "
+                "LEFT JOIN claims c ON c.result_idx = u.result_idx AND c.source = ? "
+                "WHERE u.batch_id = ? ORDER BY r.idx", (source, batch_id)
+            ).fetchall()
+        results = []
+        for data, claims in rows:
+            result = loads_result(data)
+            if claims is not None:
+                setattr(result, f"{source}_claims", json.loads(claims))
+            results.append(result)
+        return batch_id, kind, target, results
+
+    def heartbeat(self, batch_id: int, worker: str) -> bool:
+        """Extend the lease of a batch, returns False if the worker no longer holds it."""
+        def heartbeat(conn):
+            return conn.execute(
+                "UPDATE batches SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, batch_id, worker)
+            ).rowcount > 0
+        return self._transaction(heartbeat)
+
+    def complete(self, batch_id: int, kind: str, target: str, results: List[RAGResult]) -> bool:
+        """
+        Write back the claims of a leased extraction batch, or the checking results of a
+        leased check batch, unless another worker already completed it. Returns whether
+        the results were written.
+        """
+        def complete(conn):
+            if conn.execute(
+                "UPDATE batches SET status = 'done' WHERE id = ? AND status != 'done'", (batch_id,)
+            ).rowcount == 0:
+                return False
+            # the results of a batch are leased in the order of their indices
+            indices = [i for i, in conn.execute(
+                "SELECT result_idx FROM units WHERE batch_id = ? ORDER BY result_idx", (batch_id,)
+            )]
+            if kind == "extract":
+                conn.executemany(
+                    "INSERT OR REPLACE INTO claims VALUES (?, ?, ?)",
+                    ((i, target, json.dumps(getattr(ret, f"{target}_claims"))) for i, ret in zip(indices, results))
+                )
+                return True
+            conn.executemany(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?)",
+                (
+                    (i, target, json.dumps(getattr(ret, target)),
+                     None if ret.verdict_tiers is None else json.dumps(ret.verdict_tiers.get(target)))
+                    for i, ret in zip(indices, results)
+                )
+            )
+            return True
+
+        return self._transaction(complete)
+
+    def progress(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM batches GROUP BY status").fetchall()
+        return dict(rows)
+
+    def merge(self) -> RAGResults:
+        """
+        Merge the inputs and the work of all workers into the final RAG results, with
+        metrics computed as in `RAGChecker.evaluate`.
+        """
+        progress = self.progress()
+        if progress.get("pending", 0) or progress.get("leased", 0):
+            raise ValueError(f"Work queue {self.path} is not finished: {progress}")
+        with self._lock:
+            metrics = json.loads(self._conn.execute("SELECT value FROM meta WHERE key = 'metrics'").fetchone()[0])
+            results = RAGResults(results=[
+                loads_result(data)
+                for data, in self._conn.execute("SELECT data FROM results ORDER BY idx")
+            ])
+            claims = self._conn.execute("SELECT result_idx, source, claims FROM claims").fetchall()
+            outputs = self._conn.execute("SELECT result_idx, check_type, labels, tiers FROM outputs").fetchall()
+        for i, source, value in claims:
+            setattr(results.results[i], f"{source}_claims", json.loads(value))
+        for i, check_type, labels, tiers in outputs:
+            result = results.results[i]
+            setattr(result, check_type, json.loads(labels))
+            if tiers is not None:
+                result.verdict_tiers = {**(result.verdict_tiers or {}), check_type: json.loads(tiers)}
+        ret_metrics, _ = resolve_metrics(metrics)
+        compute_metrics(results, ret_metrics)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def run_worker(queue: WorkQueue, evaluator: RAGChecker, worker: str = None, poll_interval: float = 10):
+    """
+    Process batches of the queue until none is pending or leased by other workers.
+
+    A heartbeat thread extends the lease of the current batch every third of the
+    lease duration.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    num_batches = 0
+    while True:
+        leased = queue.lease(worker)
+        if leased is None:
+            progress = queue.progress()
+            if not progress.get("leased", 0):
+                break
+            # wait for batches leased by other workers, which are re-issued if they expire, and
+            # for the extractions the pending check batches wait on
+            time.sleep(poll_interval)
+            continue
+        batch_id, kind, target, results = leased
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(batch_id, worker):
+                    logger.warning(f"Lost the lease of batch {batch_id}.")
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            if kind == "extract":
+                evaluator.extract_claims(results, extract_type=target)
+            else:
+                evaluator.check_claims(RAGResults(results=results), check_type=target)
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+        if queue.complete(batch_id, kind, target, results):
+            num_batches += 1
+    logger.info(f"Worker {worker} processed {num_batches} batches.")
+    return num_batches
+
+
+def main():
+    parser = ArgumentParser(description="Multi-node evaluation through a shared work queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    submit = subparsers.add_parser("submit", help="Submit RAG results to a new work queue.")
+    submit.add_argument("--queue_path", type=str, required=True)
+    submit.add_argument("--input_path", type=str, required=True)
+    submit.add_argument("--metrics", type=str, nargs="+", default=[all_metrics])
+    submit.add_argument("--batch_size", type=int, default=32)
+    work = subparsers.add_parser("work", help="Process batches of a work queue.")
+    work.add_argument("--queue_path", type=str, required=True)
+    work.add_argument("--evaluator_config", type=str, required=True,
+                      help="JSON file with the arguments of RAGChecker.")
+    work.add_argument("--lease_seconds", type=float, default=300)
+    merge = subparsers.add_parser("merge", help="Merge a finished work queue into the output file.")
+    merge.add_argument("--queue_path", type=str, required=True)
+    merge.add_argument("--output_path", type=str, required=True)
+    args = parser.parse_args()
+
+    match args.command:
+        case "submit":
+            results = load_results(args.input_path)
+            WorkQueue(args.queue_path).submit(results, metrics=args.metrics, batch_size=args.batch_size)
+        case "work":
+            with open(args.evaluator_config, "r") as f:
+                evaluator_kwargs = json.load(f)
+            with RAGChecker(**evaluator_kwargs) as evaluator:
+                run_worker(WorkQueue(args.queue_path, lease_seconds=args.lease_seconds), evaluator)
+        case "merge":
+            results = WorkQueue(args.queue_path).merge()
+            RAGChecker._save(results, args.output_path)
+            print(json.dumps(results.metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
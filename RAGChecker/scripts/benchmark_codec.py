@@ -0,0 +1,60 @@
+import time
+import random
+import argparse
+
+from ragchecker.container import RAGResults, RAGResult, RetrievedDoc
+from ragchecker.codec import dumps_results, loads_results
+
+
+LABELS = ["Entailment", "Neutral", "Contradiction"]
+
+
+def synthesize(num_results, num_claims, num_passages, seed=0):
+    rng = random.Random(seed)
+    claim = ["subject", "predicate", "object"]
+    return RAGResults(results=[
+        RAGResult(
+            query_id=str(i),
+            query=f"question {i}",
+            gt_answer="a ground truth answer " * 5,
+            response="a generated response " * 5,
+            retrieved_context=[
+                RetrievedDoc(doc_id=f"{i}-{k}", text="a retrieved passage " * 20) for k in range(num_passages)
+            ],
+            response_claims=[claim] * num_claims,
+            gt_answer_claims=[claim] * num_claims,
+            answer2response=[rng.choice(LABELS) for _ in range(num_claims)],
+            response2answer=[rng.choice(LABELS) for _ in range(num_claims)],
+            retrieved2response=[[rng.choice(LABELS) for _ in range(num_passages)] for _ in range(num_claims)],
+            retrieved2answer=[[rng.choice(LABELS) for _ in range(num_passages)] for _ in range(num_claims)],
+            metrics={"precision": rng.random()},
+        )
+        for i in range(num_results)
+    ])
+
+
+def timed(name, func):
+    start = time.perf_counter()
+    ret = func()
+    print(f"{name:<32}{time.perf_counter() - start:8.2f}s")
+    return ret
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dataclasses_json with the fast codec of RAGResults.")
+    parser.add_argument("--num_results", type=int, default=100_000)
+    parser.add_argument("--num_claims", type=int, default=5)
+    parser.add_argument("--num_passages", type=int, default=10)
+    args = parser.parse_args()
+
+    results = synthesize(args.num_results, args.num_claims, args.num_passages)
+    slow = timed("RAGResults.to_json", lambda: results.to_json(indent=2))
+    fast = timed("codec.dumps_results", lambda: dumps_results(results, indent=2))
+    assert slow == fast, "The codec output differs from to_json."
+    print(f"{'output size':<32}{len(fast) / 2 ** 20:8.1f}MB")
+    slow_results = timed("RAGResults.from_json", lambda: RAGResults.from_json(slow))
+    fast_results = timed("codec.loads_results", lambda: loads_results(fast))
+    assert slow_results == fast_results, "The codec decodes differently from from_json."
+    compact = timed("codec.dumps_results(compact)", lambda: dumps_results(results, compact=True))
+    print(f"{'compact output size':<32}{len(compact) / 2 ** 20:8.1f}MB")
+    timed("codec.loads_results(compact)", lambda: loads_results(compact))
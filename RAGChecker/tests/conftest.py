@@ -0,0 +1,44 @@
+import pytest
+
+from .stub_refchecker import install, respond
+
+# before ragchecker is imported by the test modules
+install()
+
+from ragchecker.container import RAGResult, RAGResults, RetrievedDoc  # noqa: E402
+
+
+SUBJECTS = ["Paris", "Berlin", "Rome", "Madrid", "Vienna", "Lisbon", "Prague", "Oslo"]
+
+
+def make_result(i: int) -> RAGResult:
+    """A RAG result whose claims are entailed by some of its passages, contradicted or unrelated to others."""
+    subjects = [SUBJECTS[(i + k) % len(SUBJECTS)] for k in range(4)]
+    return RAGResult(
+        query_id=str(i),
+        query=f"Question {i}?",
+        gt_answer=f"{subjects[0]} is a capital. {subjects[1]} has a river. {subjects[2]} hosts a museum.",
+        response=f"{subjects[0]} is a capital. {subjects[3]} has a river." + (
+            f" {subjects[1]} hosts a museum." if i % 3 == 0 else ""
+        ),
+        retrieved_context=[
+            RetrievedDoc(doc_id=f"{i}-0", text=f"{subjects[0]} is the capital of a country."),
+            RetrievedDoc(doc_id=f"{i}-1", text=f"It is not {subjects[1]} that has the river."),
+            RetrievedDoc(doc_id=f"{i}-2", text=f"{subjects[2]} and {subjects[3]} host many museums."),
+        ],
+    )
+
+
+class CountingLLM:
+    """Stub LLM API function counting the prompts it receives."""
+    def __init__(self):
+        self.num_prompts = 0
+
+    def __call__(self, prompts, **kwargs):
+        self.num_prompts += len(prompts)
+        return [respond(prompt) for prompt in prompts]
+
+
+@pytest.fixture
+def results() -> RAGResults:
+    return RAGResults(results=[make_result(i) for i in range(12)])
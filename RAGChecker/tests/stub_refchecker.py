@@ -0,0 +1,188 @@
+"""
+Stub of the refchecker package, with a deterministic LLM behind its extractor and
+checkers, so that the tests run offline and do not depend on refchecker itself.
+
+Every prompt goes through `get_model_batch_response`, or the `custom_llm_api_func`
+given to the extractor or checker, as with refchecker. The stub LLM `respond` extracts
+one ("subject", "predicate", "object") claim per sentence of a text, and labels a claim
+"Entailment" if a reference contains its subject, "Contradiction" if it contains
+"not <subject>", and "Neutral" otherwise.
+"""
+import re
+import sys
+import types
+from typing import List
+
+
+EXTRACTION_PROMPT = """Extract the claims of the text below as triplets, one per line.
+
+### Question:
+[QUESTION]
+
+### Text:
+[TEXT]
+"""
+
+JOINT_CHECKING_PROMPT_Q = """Check whether each claim can be entailed according to the reference.
+
+### Question:
+[QUESTION]
+
+### Reference:
+[REFERENCE]
+
+### Claims:
+[CLAIMS]
+
+Answer with one label per line in ['Entailment', 'Neutral', 'Contradiction'].
+"""
+
+TRIPLET = re.compile(r'^(?:\d+\. )?\("(.*)", "(.*)", "(.*)"\)$', re.MULTILINE)
+PASSAGE = re.compile(r"^\[P(\d+)\] (.*?)(?=\n\n\[P\d+\] |\Z)", re.MULTILINE | re.DOTALL)
+
+
+def format_triplet(triplet) -> str:
+    return "(" + ", ".join(f'"{part}"' for part in triplet) + ")"
+
+
+def sentence_triplets(text: str) -> List[List[str]]:
+    sentences = [s.strip() for s in text.split(".") if s.strip()]
+    return [(s.split(" ", 2) + ["", ""])[:3] for s in sentences]
+
+
+def label(claim, reference: str) -> str:
+    subject = (claim if isinstance(claim, str) else claim[0]).lower()
+    reference = reference.lower()
+    if f"not {subject}" in reference:
+        return "Contradiction"
+    if subject in reference:
+        return "Entailment"
+    return "Neutral"
+
+
+def section(prompt: str, name: str) -> str:
+    return prompt.split(f"### {name}:\n", 1)[1].split("\n\n###", 1)[0]
+
+
+def respond(prompt: str) -> str:
+    """Response of the stub LLM to an extraction, joint checking or packed checking prompt."""
+    if "### Text:" in prompt:
+        return "\n".join(format_triplet(t) for t in sentence_triplets(section(prompt, "Text")))
+    claims = TRIPLET.findall(section(prompt, "Claims"))
+    if "### Passages:" in prompt:
+        passages = PASSAGE.findall(section(prompt, "Passages"))
+        return "\n".join(
+            f"{j + 1} P{k}: {label(claim, text)}" for j, claim in enumerate(claims) for k, text in passages
+        )
+    reference = section(prompt, "Reference")
+    return "\n".join(label(claim, reference) for claim in claims)
+
+
+def get_model_batch_response(
+    prompts, model=None, temperature=0, max_new_tokens=500, api_base=None, custom_llm_api_func=None, **kwargs
+):
+    if custom_llm_api_func is not None:
+        return custom_llm_api_func(prompts)
+    return [respond(prompt) for prompt in prompts]
+
+
+class _Claim:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Extraction:
+    def __init__(self, claims):
+        self.claims = claims
+
+
+class LLMExtractor:
+    def __init__(self, model=None, batch_size=16, api_base=None, claim_format="triplet"):
+        self.model = model
+        self.batch_size = batch_size
+
+    def extract(self, batch_responses, batch_questions=None, max_new_tokens=500, custom_llm_api_func=None, **kwargs):
+        questions = batch_questions or [None] * len(batch_responses)
+        prompts = [
+            EXTRACTION_PROMPT.replace("[QUESTION]", question or "").replace("[TEXT]", text)
+            for text, question in zip(batch_responses, questions)
+        ]
+        responses = get_model_batch_response(prompts, custom_llm_api_func=custom_llm_api_func)
+        return [
+            _Extraction([_Claim(list(triplet)) for triplet in TRIPLET.findall(response)])
+            for response in responses
+        ]
+
+
+class LLMChecker:
+    """Checker sending one prompt per item, passage and group of claims, as refchecker does."""
+    def __init__(self, model=None, batch_size=16, api_base=None):
+        self.model = model
+        self.batch_size = batch_size
+
+    def check(
+        self, batch_claims, batch_references, batch_questions=None, max_reference_segment_length=0,
+        merge_psg=False, is_joint=True, joint_check_num=5, custom_llm_api_func=None, **kwargs
+    ):
+        questions = batch_questions or [None] * len(batch_claims)
+        group_size = joint_check_num if is_joint else 1
+        prompts, owners = [], []
+        for i, (claims, references, question) in enumerate(zip(batch_claims, batch_references, questions)):
+            if isinstance(references, str):
+                references = [references]
+            for k, reference in enumerate(references):
+                for start in range(0, len(claims), group_size):
+                    prompts.append(
+                        JOINT_CHECKING_PROMPT_Q.replace("[QUESTION]", question or "").replace(
+                            "[REFERENCE]", reference
+                        ).replace(
+                            "[CLAIMS]", "\n".join(format_triplet(c) for c in claims[start:start + group_size])
+                        )
+                    )
+                    owners.append((i, k, start))
+        responses = get_model_batch_response(prompts, custom_llm_api_func=custom_llm_api_func) if prompts else []
+        labels = [
+            [[None] * (1 if isinstance(references, str) else len(references)) for _ in claims]
+            for claims, references in zip(batch_claims, batch_references)
+        ]
+        for (i, k, start), response in zip(owners, responses):
+            for j, line in enumerate(response.splitlines()):
+                labels[i][start + j][k] = line.strip()
+        if merge_psg:
+            return [[merge_multi_psg_ret(claim_labels) for claim_labels in item] for item in labels]
+        return labels
+
+
+NLIChecker = AlignScoreChecker = LLMChecker
+
+
+def merge_multi_psg_ret(ret):
+    if "Entailment" in ret:
+        return "Entailment"
+    if "Contradiction" in ret:
+        return "Contradiction"
+    return "Neutral"
+
+
+def install():
+    """Register the stub as the `refchecker` package and its modules."""
+    package = types.ModuleType("refchecker")
+    package.__path__ = []
+    extractor = types.ModuleType("refchecker.extractor")
+    extractor.LLMExtractor = LLMExtractor
+    checker = types.ModuleType("refchecker.checker")
+    checker.__path__ = []
+    checker.LLMChecker, checker.NLIChecker, checker.AlignScoreChecker = LLMChecker, NLIChecker, AlignScoreChecker
+    checker_prompts = types.ModuleType("refchecker.checker.checker_prompts")
+    checker_prompts.JOINT_CHECKING_PROMPT_Q = JOINT_CHECKING_PROMPT_Q
+    utils = types.ModuleType("refchecker.utils")
+    utils.get_model_batch_response = get_model_batch_response
+    package.extractor, package.checker, package.utils = extractor, checker, utils
+    checker.checker_prompts = checker_prompts
+    sys.modules.update({
+        "refchecker": package,
+        "refchecker.extractor": extractor,
+        "refchecker.checker": checker,
+        "refchecker.checker.checker_prompts": checker_prompts,
+        "refchecker.utils": utils,
+    })
@@ -0,0 +1,60 @@
+import copy
+
+import numpy as np
+
+from ragchecker import RAGChecker
+from ragchecker import evaluator as evaluator_module
+
+from .stub_refchecker import label
+
+
+class StubNLIChecker:
+    """Local checker agreeing with the stub LLM, confident about entailments and contradictions only."""
+    PROBABILITY = {"Entailment": 0.95, "Neutral": 0.5, "Contradiction": 0.02}
+
+    def __init__(self, batch_size=16):
+        self.num_pairs = 0
+
+    def predict(self, claims, references):
+        self.num_pairs += len(claims)
+        labels = [label(claim, reference) for claim, reference in zip(claims, references)]
+        return labels, np.array([self.PROBABILITY[lab] for lab in labels])
+
+
+def flatten(values):
+    for value in values:
+        if isinstance(value, list):
+            yield from flatten(value)
+        else:
+            yield value
+
+
+def test_uncertain_pairs_escalate_to_the_checker(results, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "LocalNLIChecker", StubNLIChecker)
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker(joint_check=False).evaluate(baseline)
+    evaluator = RAGChecker(joint_check=False, cascade_checker="nli", cascade_band=(0.1, 0.9))
+
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == expected
+    assert evaluator.stats["cascade_local"] > 0 and evaluator.stats["cascade_escalated"] > 0
+    assert evaluator.stats["checker_requests"] == evaluator.stats["cascade_escalated"]
+    assert evaluator.cascade.num_pairs == evaluator.stats["cascade_local"] + evaluator.stats["cascade_escalated"]
+    for result, expected_result in zip(results.results, baseline.results):
+        for check_type in ["answer2response", "response2answer", "retrieved2response", "retrieved2answer"]:
+            labels = getattr(result, check_type)
+            assert labels == getattr(expected_result, check_type)
+            tiers = result.verdict_tiers[check_type]
+            for lab, tier in zip(flatten(labels), flatten(tiers)):
+                assert tier == ("checker" if lab == "Neutral" else "local")
+
+
+def test_band_decides_what_is_kept_locally(results, monkeypatch):
+    monkeypatch.setattr(evaluator_module, "LocalNLIChecker", StubNLIChecker)
+    evaluator = RAGChecker(cascade_checker="nli", cascade_band=(0.01, 0.99))
+
+    evaluator.evaluate(results, metrics=["precision"])
+
+    assert evaluator.stats["cascade_local"] == 0
+    assert evaluator.stats["cascade_escalated"] == evaluator.cascade.num_pairs > 0
@@ -0,0 +1,47 @@
+import copy
+import itertools
+
+from ragchecker import RAGChecker
+from ragchecker import cache as cache_module
+from ragchecker.cache import SQLiteCache
+
+
+def clear_claims(results):
+    for result in results.results:
+        result.response_claims = result.gt_answer_claims = None
+        result.answer2response = result.response2answer = None
+        result.retrieved2response = result.retrieved2answer = None
+
+
+def test_cached_claims_match_the_extractor(results, tmp_path):
+    baseline = copy.deepcopy(results)
+    RAGChecker().evaluate(baseline)
+
+    first = RAGChecker(cache_dir=str(tmp_path))
+    first.evaluate(results)
+    assert first.stats["extractor_requests"] > 0
+    clear_claims(results)
+    second = RAGChecker(cache_dir=str(tmp_path))
+    metrics = second.evaluate(results)
+
+    assert second.stats["extractor_requests"] == 0
+    assert metrics == baseline.metrics
+    for result, expected in zip(results.results, baseline.results):
+        assert result.response_claims == expected.response_claims
+        assert result.gt_answer_claims == expected.gt_answer_claims
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count()
+    monkeypatch.setattr(cache_module.time, "time", lambda: next(clock))
+    cache = SQLiteCache(str(tmp_path), "claims", max_entries=3)
+    for key, value in [("a", 1), ("b", 2), ("c", 3)]:
+        cache.set_many({key: value})
+    assert cache.get_many(["a", "missing"]) == {"a": 1}
+
+    cache.set_many({"d": 4})
+    assert len(cache) == 3
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": 1, "c": 3, "d": 4}
+
+    cache.set_many({"c": 5, "e": 6})
+    assert cache.get_many(["a", "c", "d", "e"]) == {"c": 5, "d": 4, "e": 6}
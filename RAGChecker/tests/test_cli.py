@@ -0,0 +1,29 @@
+import sys
+
+import pytest
+
+from ragchecker.cli import get_args
+
+
+@pytest.mark.parametrize("argv", [
+    ["--input_path", "a.json", "b.json", "--workers", "2"],
+    ["--input_path", "a.json", "b.json", "--resume"],
+    ["--input_path", "a.json", "b.json", "--ci_half_width", "1"],
+    ["--input_path", "a.json", "--ci_half_width", "1", "--previous_output", "old.json"],
+    ["--input_path", "a.json", "--max_requests", "100"],
+    ["--input_path", "a.json", "--max_tokens", "100", "--async_llm"],
+    ["--input_path", "a.json", "--ci_half_width", "1", "--max_tokens", "100"],
+])
+def test_ignored_options_are_rejected(argv, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["ragchecker-cli", *argv, "--output_path", "out"])
+    with pytest.raises(SystemExit):
+        get_args()
+
+
+def test_supported_options_are_accepted(monkeypatch):
+    monkeypatch.setattr(sys, "argv", [
+        "ragchecker-cli", "--input_path", "a.json", "--output_path", "out", "--ci_half_width", "1",
+        "--max_requests", "100", "--max_tokens", "1000", "--async_llm"
+    ])
+    args = get_args()
+    assert (args.max_requests, args.max_tokens) == (100, 1000)
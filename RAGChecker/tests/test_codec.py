@@ -0,0 +1,54 @@
+import math
+
+import numpy as np
+import pytest
+
+from ragchecker.container import RAGResult, RAGResults, RetrievedDoc
+from ragchecker.codec import dumps_result, dumps_results, loads_result, loads_results
+
+
+def sample_results() -> RAGResults:
+    results = []
+    for i in range(20):
+        result = RAGResult(
+            query_id=str(i), query=f"q ü\x7f\t{i}", gt_answer="g", response="r ☃",
+            retrieved_context=[RetrievedDoc(doc_id=None if i % 2 else "d", text="p é")] * (i % 3)
+        )
+        if i % 4:
+            result.response_claims = [["a", "b", "c"]] * (i % 3)
+            result.answer2response = ["Entailment", "Neutral", "Contradiction"][:i % 3]
+            result.retrieved2response = [["Neutral"] * (i % 3)] * (i % 3)
+            result.metrics = {"precision": [0.0, 1 / 3, np.float64(2 / 3), 1e-7, 1, 123456789.123][i % 6]}
+        results.append(result)
+    rag_results = RAGResults(results=results)
+    rag_results.metrics["overall_metrics"]["precision"] = 12.3
+    return rag_results
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_dumps_results_matches_to_json(indent):
+    results = sample_results()
+    assert dumps_results(results, indent=indent) == results.to_json(indent=indent)
+
+
+def test_dumps_result_matches_to_json():
+    for result in sample_results().results:
+        assert dumps_result(result) == result.to_json()
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compact": True}, {"compact": True, "shared_passages": True}])
+def test_round_trip(kwargs):
+    results = sample_results()
+    loaded = loads_results(dumps_results(results, **kwargs))
+    assert loaded.to_json(indent=2) == results.to_json(indent=2)
+
+
+def test_round_trip_of_a_result():
+    for result in sample_results().results:
+        assert loads_result(dumps_result(result, compact=True)).to_json() == result.to_json()
+
+
+def test_non_finite_metrics_round_trip():
+    result = RAGResult(query_id="0", query="q", gt_answer="g", response="r", metrics={"precision": float("nan")})
+    assert dumps_result(result) == result.to_json()
+    assert math.isnan(loads_result(dumps_result(result)).metrics["precision"])
@@ -0,0 +1,42 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from ragchecker.container import RAGResult, RetrievedDoc
+from ragchecker.computation import METRIC_FUNC_MAP
+from ragchecker.columnar import MetricEngine
+
+
+LABELS = ["Entailment", "Neutral", "Contradiction"]
+
+
+def random_results(num_results: int, seed: int = 0):
+    rng = random.Random(seed)
+    results = []
+    for i in range(num_results):
+        num_response, num_answer, num_passages = rng.choice([0, 1, 3, 5]), rng.choice([0, 1, 4]), rng.choice([0, 1, 6])
+        result = RAGResult(
+            query_id=str(i), query="q", gt_answer="g", response="r",
+            retrieved_context=[RetrievedDoc(text=f"p{k}") for k in range(num_passages)]
+        )
+        result.answer2response = rng.choices(LABELS, k=num_response)
+        result.response2answer = rng.choices(LABELS, k=num_answer)
+        result.retrieved2response = [rng.choices(LABELS, k=num_passages) for _ in range(num_response)]
+        result.retrieved2answer = [rng.choices(LABELS, k=num_passages) for _ in range(num_answer)]
+        results.append(result)
+    return results
+
+
+@pytest.mark.parametrize("metric", list(METRIC_FUNC_MAP))
+def test_columnar_metrics_match_per_result_metrics(metric):
+    results = random_results(500)
+    expected = copy.deepcopy(results)
+    for result in expected:
+        METRIC_FUNC_MAP[metric](result)
+
+    values = MetricEngine(results).compute([metric])[metric]
+
+    assert len(values) == len(results)
+    np.testing.assert_allclose(values, [result.metrics[metric] for result in expected])
@@ -0,0 +1,39 @@
+import copy
+import threading
+import time
+
+from ragchecker import RAGChecker
+
+from .stub_refchecker import respond
+
+
+class OverlapLLM:
+    """Stub LLM API function recording the largest number of calls in flight at once."""
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.inflight = self.max_inflight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompts, **kwargs):
+        with self._lock:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.inflight -= 1
+        return [respond(prompt) for prompt in prompts]
+
+
+def test_concurrent_check_types_match_sequential(results):
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker().evaluate(baseline)
+    llm = OverlapLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm, max_concurrency=4, batch_size_checker=2)
+
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == expected
+    assert llm.max_inflight > 1
+    for result, expected_result in zip(results.results, baseline.results):
+        for check_type in ["answer2response", "response2answer", "retrieved2response", "retrieved2answer"]:
+            assert getattr(result, check_type) == getattr(expected_result, check_type)
@@ -0,0 +1,33 @@
+import copy
+
+from ragchecker import RAGChecker, RAGResults
+
+from .conftest import CountingLLM, make_result
+
+
+def duplicated_results():
+    results = [make_result(i % 6) for i in range(12)]
+    for i, result in enumerate(results):
+        result.query_id = str(i)
+    return RAGResults(results=results)
+
+
+def test_deduplication_matches_the_baseline_with_fewer_calls():
+    results = duplicated_results()
+    baseline = copy.deepcopy(results)
+    baseline_llm = CountingLLM()
+    expected = RAGChecker(custom_llm_api_func=baseline_llm).evaluate(baseline)
+    llm = CountingLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm, deduplicate=True)
+
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == expected
+    assert evaluator.stats["dedup_saved_extractions"] > 0
+    assert evaluator.stats["dedup_saved_checks"] > 0
+    assert llm.num_prompts < baseline_llm.num_prompts
+    for result, expected_result in zip(results.results, baseline.results):
+        assert result.response_claims == expected_result.response_claims
+        assert result.gt_answer_claims == expected_result.gt_answer_claims
+        for check_type in ["answer2response", "response2answer", "retrieved2response", "retrieved2answer"]:
+            assert getattr(result, check_type) == getattr(expected_result, check_type)
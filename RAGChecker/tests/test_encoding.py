@@ -0,0 +1,45 @@
+import copy
+import os
+import random
+
+import pytest
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.encoding import LABELS, decode_verdicts, encode_verdicts, is_encoded
+
+
+@pytest.mark.parametrize("num_claims", [0, 1, 3, 4, 5, 17])
+@pytest.mark.parametrize("num_passages", [None, 0, 1, 3, 6])
+def test_encoding_round_trip(num_claims, num_passages):
+    rng = random.Random(num_claims * 10 + (num_passages or 0))
+    if num_passages is None:
+        labels = rng.choices(LABELS, k=num_claims)
+    else:
+        labels = [rng.choices(LABELS, k=num_passages) for _ in range(num_claims)]
+
+    encoded = encode_verdicts(labels)
+
+    assert is_encoded(encoded)
+    assert decode_verdicts(encoded) == labels
+
+
+@pytest.mark.parametrize("labels", [None, [["Entailment"], ["Neutral", "Neutral"]], ["Entailment", "Maybe"]])
+def test_values_that_cannot_be_encoded_are_kept(labels):
+    assert encode_verdicts(labels) == labels
+    assert decode_verdicts(labels) == labels
+
+
+def test_compact_output_matches_the_baseline(results, tmp_path):
+    baseline = copy.deepcopy(results)
+    plain_path, compact_path = str(tmp_path / "plain.json"), str(tmp_path / "compact.json")
+    RAGChecker().evaluate(baseline, save_path=plain_path)
+
+    RAGChecker(compact_output=True).evaluate(results, save_path=compact_path)
+
+    assert os.path.getsize(compact_path) < os.path.getsize(plain_path)
+    with open(compact_path) as f:
+        text = f.read()
+    assert '"encoding": "2bit"' in text
+    loaded = RAGResults.from_json(text)
+    assert loaded.metrics == baseline.metrics
+    assert [result.to_json() for result in loaded.results] == [result.to_json() for result in baseline.results]
@@ -0,0 +1,53 @@
+import pytest
+
+from ragchecker import RAGChecker
+from ragchecker.export import export_tables, load_table
+
+pa = pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_exported_tables_hold_the_evaluation(results, tmp_path, format):
+    RAGChecker().evaluate(results)
+
+    paths = export_tables(results, str(tmp_path), format=format)
+    tables = {name: load_table(path).to_pylist() for name, path in paths.items()}
+
+    assert load_table(paths["verdicts"]).schema.names == [
+        "result_idx", "query_id", "check_type", "source", "claim_idx", "passage_idx", "doc_id", "label"
+    ]
+    assert pa.types.is_dictionary(load_table(paths["claims"]).schema.field("verdict").type)
+
+    rets = results.results
+    assert [row["query_id"] for row in tables["results"]] == [ret.query_id for ret in rets]
+    for row, ret in zip(tables["results"], rets):
+        assert row["num_response_claims"] == len(ret.response_claims)
+        for metric, value in ret.metrics.items():
+            assert row[metric] == pytest.approx(value)
+
+    expected_claims = [
+        (i, source, j, claim_verdicts[j], row.count("Entailment"))
+        for source, claim_check, passage_check in [
+            ("response", "answer2response", "retrieved2response"),
+            ("gt_answer", "response2answer", "retrieved2answer"),
+        ]
+        for i, ret in enumerate(rets)
+        for claim_verdicts in [getattr(ret, claim_check)]
+        for j, row in enumerate(getattr(ret, passage_check))
+    ]
+    assert [
+        (row["result_idx"], row["source"], row["claim_idx"], row["verdict"], row["num_entailing_passages"])
+        for row in tables["claims"]
+    ] == expected_claims
+
+    expected_verdicts = [
+        (i, check_type, j, k, ret.retrieved_context[k].doc_id, label)
+        for check_type in ["retrieved2response", "retrieved2answer"]
+        for i, ret in enumerate(rets)
+        for j, row in enumerate(getattr(ret, check_type))
+        for k, label in enumerate(row)
+    ]
+    assert [
+        (row["result_idx"], row["check_type"], row["claim_idx"], row["passage_idx"], row["doc_id"], row["label"])
+        for row in tables["verdicts"]
+    ] == expected_verdicts
@@ -0,0 +1,36 @@
+import copy
+
+import pytest
+
+from ragchecker import RAGChecker
+from ragchecker.llm_executor import estimate_tokens
+
+
+PASSAGE_CHECKS = ["retrieved2response", "retrieved2answer"]
+
+
+@pytest.mark.parametrize("max_tokens", [6000, 25])
+def test_group_testing_matches_per_passage_checking(results, max_tokens):
+    baseline = copy.deepcopy(results)
+    RAGChecker().evaluate(baseline)
+
+    evaluator = RAGChecker(group_testing=True, group_testing_max_tokens=max_tokens)
+    merged_references = []
+    dispatch = evaluator._dispatch_checker
+
+    def record_dispatch(claims, references, questions, merge_psg):
+        merged_references.extend(references)
+        return dispatch(claims, references, questions, merge_psg)
+
+    evaluator._dispatch_checker = record_dispatch
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == baseline.metrics
+    for result, expected in zip(results.results, baseline.results):
+        for check_type in PASSAGE_CHECKS:
+            assert getattr(result, check_type) == getattr(expected, check_type)
+    # group tests stay within the budget, a passage over it is tested alone
+    for reference in merged_references:
+        parts = reference.split("\n\n")
+        assert len(parts) == 1 or sum(map(estimate_tokens, parts)) <= max_tokens
+
@@ -0,0 +1,51 @@
+import copy
+import json
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.container import RetrievedDoc
+
+from .conftest import CountingLLM, make_result
+
+
+def edited_results():
+    """The results of `make_result` with an edited response, a new passage and reordered passages."""
+    results = [make_result(i) for i in range(12)]
+    results[0].response = "Paris is a capital. Oslo has a river."
+    results[1].retrieved_context.append(RetrievedDoc(doc_id="1-3", text="Madrid has no river."))
+    results[2].retrieved_context.reverse()
+    return RAGResults(results=results)
+
+
+def test_incremental_evaluation_matches_a_fresh_one(results, tmp_path):
+    previous_path = str(tmp_path / "previous.json")
+    RAGChecker().evaluate(results, save_path=previous_path)
+    fresh = edited_results()
+    fresh_llm = CountingLLM()
+    expected = RAGChecker(custom_llm_api_func=fresh_llm).evaluate(fresh)
+
+    edited = edited_results()
+    llm = CountingLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm)
+    metrics = evaluator.evaluate(edited, previous=previous_path)
+
+    assert metrics == expected
+    assert [json.loads(result.to_json()) for result in edited.results] == \
+        [json.loads(result.to_json()) for result in fresh.results]
+    assert evaluator.stats["matched_results"] == 12
+    assert evaluator.stats["reused_response_claims"] == 11
+    assert evaluator.stats["reused_gt_answer_claims"] == 12
+    assert evaluator.stats["reused_verdicts"] > 0
+    # only the edited response is extracted again
+    assert evaluator.stats["extractor_requests"] == 1
+    assert 0 < llm.num_prompts < fresh_llm.num_prompts
+
+
+def test_unchanged_results_are_not_checked_again(results):
+    previous = copy.deepcopy(results)
+    RAGChecker().evaluate(previous)
+    evaluator = RAGChecker()
+
+    metrics = evaluator.evaluate(results, previous=previous.results)
+
+    assert metrics == previous.metrics
+    assert evaluator.stats["extractor_requests"] == evaluator.stats["checker_requests"] == 0
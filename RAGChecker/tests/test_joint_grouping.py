@@ -0,0 +1,86 @@
+import copy
+
+from refchecker.checker.checker_prompts import JOINT_CHECKING_PROMPT_Q
+
+from ragchecker import RAGChecker
+from ragchecker.joint_grouping import CLAIM_LINE, JointGrouper, ParseMonitor
+
+from .stub_refchecker import format_triplet, respond
+
+
+def test_adaptive_joint_checking_matches_fixed_groups(results):
+    expected = RAGChecker().evaluate(results)
+    for result in results.results:
+        result.answer2response = result.response2answer = None
+        result.retrieved2response = result.retrieved2answer = None
+    evaluator = RAGChecker(adaptive_joint_check=True)
+    assert evaluator.evaluate(results) == expected
+    assert evaluator.stats["joint_check_prompts"] <= evaluator.stats["fixed_joint_check_prompts"]
+
+
+def test_adaptive_joint_verdicts_are_cached_apart(results, tmp_path):
+    def evaluate(**kwargs):
+        for result in results.results:
+            result.answer2response = result.response2answer = None
+        evaluator = RAGChecker(cache_dir=str(tmp_path), **kwargs)
+        evaluator.evaluate(results, metrics=["precision", "recall"])
+        return evaluator.stats["checker_requests"]
+
+    assert evaluate(adaptive_joint_check=True) > 0
+    assert evaluate() > 0
+    assert evaluate() == 0
+
+
+class TruncatingLLM:
+    """Stub LLM API function dropping the labels beyond the first `max_labels` of a joint checking response."""
+    def __init__(self, max_labels):
+        self.max_labels = max_labels
+        self.claims_per_prompt = []
+
+    def __call__(self, prompts, **kwargs):
+        responses = []
+        for prompt in prompts:
+            response = respond(prompt)
+            if "### Claims:" in prompt:
+                self.claims_per_prompt.append(len(CLAIM_LINE.findall(prompt)))
+                response = "\n".join(response.splitlines()[:self.max_labels])
+            responses.append(response)
+        return responses
+
+
+def test_parse_failures_halve_the_group_limit():
+    grouper = JointGrouper(max_tokens=8000, max_claims=8, growth_interval=2)
+    monitor = ParseMonitor(TruncatingLLM(max_labels=2), grouper)
+    prompt = JOINT_CHECKING_PROMPT_Q.replace("[QUESTION]", "Question?").replace("[REFERENCE]", "Paris is a capital.")
+
+    log = monitor.open_log()
+    monitor([
+        prompt.replace("[CLAIMS]", "\n".join(format_triplet((s, "is", "big")) for s in subjects))
+        for subjects in [["Paris", "Rome"], ["Paris", "Rome", "Oslo"]]
+    ])
+    monitor.close_log()
+
+    assert log == [False, True]
+    assert grouper.limit == 4
+    assert grouper.split([f"claim {j}" for j in range(10)], "Paris is a capital.", "Question?") == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    for _ in range(2):
+        monitor([prompt.replace("[CLAIMS]", format_triplet(("Paris", "is", "big")))])
+    assert grouper.limit == 5
+
+
+def test_failed_groups_are_split_and_checked_again(results):
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker().evaluate(baseline, metrics=["precision", "recall"])
+    llm = TruncatingLLM(max_labels=2)
+    evaluator = RAGChecker(custom_llm_api_func=llm, adaptive_joint_check=True, joint_check_max_num=8)
+
+    metrics = evaluator.evaluate(results, metrics=["precision", "recall"])
+
+    assert metrics == expected
+    assert evaluator.stats["joint_parse_failures"] > 0
+    assert evaluator.joint_grouper.limit <= 2
+    # groups of 3 claims fail and are checked again one claim at a time
+    assert 3 in llm.claims_per_prompt and 1 in llm.claims_per_prompt
+    for result, expected_result in zip(results.results, baseline.results):
+        assert result.answer2response == expected_result.answer2response
+        assert result.response2answer == expected_result.response2answer
@@ -0,0 +1,60 @@
+from ragchecker.container import RAGResults
+from ragchecker.journal import Journal, journal_path
+
+from .conftest import make_result
+
+
+def fresh_results() -> RAGResults:
+    return RAGResults(results=[make_result(i) for i in range(4)])
+
+
+def test_resume_drops_a_truncated_tail(tmp_path):
+    path = journal_path(str(tmp_path / "out.json"))
+    results = fresh_results()
+    for i, result in enumerate(results.results):
+        result.response_claims = [["claim", "of", str(i)]]
+    journal = Journal(path, results)
+    journal.record(results.results[:2], ["response_claims"])
+    journal.close()
+    # a crash in the middle of a line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"index": 2, "query_id": "2", "response_cl')
+
+    journal = Journal(path, results, resume=True)
+    journal.record(results.results[2:], ["response_claims"])
+    journal.close()
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 4
+    restored = fresh_results()
+    assert Journal.replay(path, restored) == 4
+    assert [r.response_claims for r in restored.results] == [r.response_claims for r in results.results]
+
+
+def test_replay_keeps_fields_already_set(tmp_path):
+    path = journal_path(str(tmp_path / "out.json"))
+    results = fresh_results()
+    results.results[0].answer2response = ["Neutral"]
+    journal = Journal(path, results)
+    journal.record(results.results[:1], ["answer2response"])
+    journal.close()
+
+    restored = fresh_results()
+    restored.results[0].answer2response = ["Entailment"]
+    assert Journal.replay(path, restored) == 0
+    assert restored.results[0].answer2response == ["Entailment"]
+
+
+def test_replay_skips_lines_of_other_results(tmp_path):
+    path = journal_path(str(tmp_path / "out.json"))
+    results = fresh_results()
+    results.results[1].answer2response = ["Neutral"]
+    journal = Journal(path, results)
+    journal.record(results.results[1:2], ["answer2response"])
+    journal.close()
+
+    other = fresh_results()
+    other.results[1].query_id = "other"
+    assert Journal.replay(path, other) == 0
+    assert other.results[1].answer2response is None
@@ -0,0 +1,42 @@
+import copy
+
+from ragchecker import RAGChecker
+from ragchecker.computation import UNCHECKED
+
+LAZY_METRICS = ["claim_recall", "context_utilization", "faithfulness", "hallucination", "self_knowledge"]
+
+
+def test_lazy_checking_matches_the_full_check(results):
+    baseline = copy.deepcopy(results)
+    RAGChecker().evaluate(baseline)
+    evaluator = RAGChecker(lazy_checking=True)
+
+    evaluator.evaluate(results, metrics=LAZY_METRICS)
+
+    assert evaluator.stats["lazy_skipped"] > 0
+    num_unchecked = 0
+    for result, expected in zip(results.results, baseline.results):
+        for metric in LAZY_METRICS:
+            assert result.metrics[metric] == expected.metrics[metric]
+        for check_type in ["retrieved2answer", "retrieved2response"]:
+            for labels, expected_labels in zip(getattr(result, check_type), getattr(expected, check_type)):
+                # cells are checked in retrieval order, at least until the first entailing passage
+                first = expected_labels.index("Entailment") + 1 if "Entailment" in expected_labels else len(labels)
+                assert labels[:first] == expected_labels[:first]
+                assert all(lab in [UNCHECKED, expected_lab] for lab, expected_lab in zip(labels, expected_labels))
+                num_unchecked += labels.count(UNCHECKED)
+    assert num_unchecked == evaluator.stats["lazy_skipped"]
+
+    # metrics using every passage complete the lazily checked matrices
+    metrics = RAGChecker(lazy_checking=True).evaluate(results)
+    assert metrics == baseline.metrics
+    for result, expected in zip(results.results, baseline.results):
+        assert result.retrieved2answer == expected.retrieved2answer
+        assert result.retrieved2response == expected.retrieved2response
+
+
+def test_metrics_using_every_passage_disable_lazy_checking(results):
+    evaluator = RAGChecker(lazy_checking=True)
+    evaluator.evaluate(results, metrics=["claim_recall", "context_precision"])
+    assert evaluator.stats["lazy_skipped"] == 0
+    assert all(UNCHECKED not in labels for result in results.results for labels in result.retrieved2answer)
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from ragchecker import RAGChecker
+from ragchecker.llm_executor import AIMDLimiter, AsyncLLMExecutor, LLMRequestError, TokenBucket
+
+
+class StubExecutor(AsyncLLMExecutor):
+    """Executor answering through `respond(prompt, attempt)` instead of an LLM endpoint."""
+    def __init__(self, respond, **kwargs):
+        self.respond = respond
+        self.attempts = {}
+        super().__init__("stub", **kwargs)
+
+    async def _litellm(self, messages, max_new_tokens):
+        prompt = messages[0]["content"]
+        self.attempts[prompt] = self.attempts.get(prompt, 0) + 1
+        return await self.respond(prompt, self.attempts[prompt]), None
+
+
+async def echo(prompt, attempt):
+    return prompt.upper()
+
+
+def test_responses_in_prompt_order():
+    executor = StubExecutor(echo)
+    try:
+        assert executor(["a", "b", "c"]) == ["A", "B", "C"]
+        assert executor.report()["requests"] == 3
+    finally:
+        executor.close()
+
+
+def test_failed_prompts_get_none():
+    async def respond(prompt, attempt):
+        if prompt == "bad":
+            raise LLMRequestError(400, "bad request")
+        return prompt.upper()
+
+    executor = StubExecutor(respond)
+    try:
+        assert executor(["a", "bad", "c"]) == ["A", None, "C"]
+        assert executor.counts["failed"] == 1
+    finally:
+        executor.close()
+
+
+def test_rate_limited_request_is_retried_and_backs_off():
+    async def respond(prompt, attempt):
+        if attempt == 1:
+            raise LLMRequestError(429, "slow down")
+        return prompt.upper()
+
+    executor = StubExecutor(respond, initial_concurrency=8)
+    try:
+        assert executor(["a"]) == ["A"]
+        assert executor.counts["rate_limited"] == 1
+        assert executor.counts["retries"] == 1
+        # halved by the 429, then raised by the successful retry
+        assert executor.limiter.limit == pytest.approx(4 + 1 / 4)
+    finally:
+        executor.close()
+
+
+def test_slow_request_is_hedged():
+    async def respond(prompt, attempt):
+        # the first attempt of the slow prompt hangs, its hedge answers at once
+        if prompt == "slow" and attempt == 1:
+            await asyncio.sleep(30)
+        return prompt.upper()
+
+    executor = StubExecutor(respond, hedge_quantile=0.5, hedge_min_samples=5)
+    try:
+        executor([f"warm-up {i}" for i in range(5)])
+        start = time.monotonic()
+        assert executor(["slow"]) == ["SLOW"]
+        assert time.monotonic() - start < 5
+        assert executor.counts["hedged"] == 1
+        assert executor.counts["hedge_wins"] == 1
+    finally:
+        executor.close()
+
+
+def test_token_bucket_limits_the_rate():
+    async def run():
+        bucket = TokenBucket(rate_per_minute=600)
+        await bucket.acquire(600)
+        start = time.monotonic()
+        await bucket.acquire(2)
+        return time.monotonic() - start
+
+    # 600 tokens per minute refill 2 tokens in 0.2 seconds
+    assert 0.15 < asyncio.run(run()) < 1
+
+
+def test_aimd_limiter():
+    async def run():
+        limiter = AIMDLimiter(initial=8, maximum=10, cooldown=60)
+        for _ in range(4):
+            await limiter.acquire()
+            await limiter.release(latency=0.1)
+        increased = limiter.limit
+        for _ in range(2):
+            await limiter.acquire()
+            await limiter.release(overloaded=True)
+        return increased, limiter.limit
+
+    increased, decreased = asyncio.run(run())
+    assert 8.4 < increased < 8.5
+    # a burst of errors within the cooldown halves the limit once
+    assert decreased == pytest.approx(increased / 2)
+
+
+def test_evaluator_closes_its_executors():
+    with RAGChecker(async_llm=True) as evaluator:
+        threads = [executor._thread for executor in evaluator.llm_executors.values()]
+        assert threads and all(thread.is_alive() for thread in threads)
+    assert not any(thread.is_alive() for thread in threads)
+    evaluator.close()
@@ -0,0 +1,55 @@
+from ragchecker import RAGChecker
+from ragchecker.packing import PackedChecker, PassagePacker, parse_packed_response
+
+from .stub_refchecker import respond
+
+
+def test_parse_packed_response():
+    response = "1 P1: Entailment\n1 P2: neutral\n2 P1: Contradiction\n2 P1: Entailment\n3 P1: Neutral\nnoise"
+    assert parse_packed_response(response, num_claims=2, num_passages=2) == {
+        (0, 0): "Entailment", (0, 1): "Neutral", (1, 0): "Contradiction"
+    }
+    assert parse_packed_response(None, num_claims=2, num_passages=2) == {}
+
+
+def test_packed_checker_batches_prompts_and_survives_failed_calls():
+    calls = []
+
+    def llm(prompts):
+        calls.append(len(prompts))
+        # the second call fails as refchecker's LLM functions do on API errors
+        return None if len(calls) == 2 else [respond(prompt) for prompt in prompts]
+
+    claims = [["Paris", "is", "a capital"], ["Rome", "has", "a river"]]
+    passages = [("Paris is a city.", [0, 1]), ("Rome is a city.", [0, 1])]
+    checker = PackedChecker(llm, PassagePacker(max_tokens=4000, max_passages=1), batch_size=2)
+    verdicts, num_prompts = checker.check([(claims, passages, "q")] * 3)
+
+    assert num_prompts == 6
+    assert calls == [2, 2, 2]
+    assert verdicts[0] == {(0, 0): "Entailment", (1, 0): "Neutral", (0, 1): "Neutral", (1, 1): "Entailment"}
+    # the items of the failed call are left for the per-passage fallback
+    assert verdicts[1] == {}
+    assert verdicts[2] == verdicts[0]
+
+
+def test_packed_checking_matches_per_passage_checking(results):
+    expected = RAGChecker().evaluate(results)
+    for result in results.results:
+        result.answer2response = result.response2answer = None
+        result.retrieved2response = result.retrieved2answer = None
+    assert RAGChecker(packed_checking=True).evaluate(results) == expected
+
+
+def test_packed_verdicts_are_cached_apart(results, tmp_path):
+    def evaluate(**kwargs):
+        for result in results.results:
+            result.retrieved2response = result.retrieved2answer = None
+        evaluator = RAGChecker(cache_dir=str(tmp_path), **kwargs)
+        evaluator.evaluate(results, metrics=["claim_recall"])
+        return evaluator.stats["checker_requests"]
+
+    assert evaluate(packed_checking=True) > 0
+    # the per-passage verdicts are not served from the packed ones, but from the cache afterwards
+    assert evaluate() > 0
+    assert evaluate() == 0
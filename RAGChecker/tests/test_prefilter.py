@@ -0,0 +1,62 @@
+import copy
+
+import numpy as np
+
+from ragchecker import RAGChecker
+from ragchecker.prefilter import PairPrefilter
+
+
+def test_audit_sample_does_not_depend_on_batching():
+    pairs = [((f"Claim{i}", "is", "short"), f"Passage {i % 7} about nothing") for i in range(400)]
+    prefilter = PairPrefilter(threshold=1.0, audit_rate=0.25)
+
+    _, audit, _ = prefilter.select(pairs)
+    _, reversed_audit, _ = prefilter.select(pairs[::-1])
+    batched = np.concatenate([prefilter.select(pairs[i:i + 50])[1] for i in range(0, len(pairs), 50)])
+
+    assert 0 < audit.sum() < len(pairs)
+    np.testing.assert_array_equal(audit, reversed_audit[::-1])
+    np.testing.assert_array_equal(audit, batched)
+
+
+def test_report_estimates_recall_from_audited_pairs():
+    prefilter = PairPrefilter(threshold=0.5, audit_rate=0.5, target_recall=0.99)
+    prefilter.record([0.9, 0.8, 0.6], ["Entailment", "Entailment", "Neutral"], [False, False, False])
+    prefilter.record([0.2, 0.1], ["Entailment", "Neutral"], [True, True])
+
+    report = prefilter.report()
+
+    # the audited entailed pair stands for 1 / audit_rate = 2 skipped entailed pairs
+    assert report["estimated_recall"] == 0.5
+    assert report["audited"] == 2
+    assert report["audit_agreement"] == 0.5
+    assert report["suggested_threshold"] == 0.2
+
+
+def test_calibrated_threshold_matches_the_baseline(results):
+    baseline = copy.deepcopy(results)
+    # one checker request per (claim, passage) pair
+    evaluator = RAGChecker(joint_check=False)
+    expected = evaluator.evaluate(baseline)
+    num_requests = evaluator.stats["checker_requests"]
+
+    # auditing every low-scoring pair checks all of them
+    audited = copy.deepcopy(results)
+    evaluator = RAGChecker(joint_check=False, prefilter="bm25", prefilter_audit_rate=1.0)
+    assert evaluator.evaluate(audited) == expected
+    report = evaluator.prefilter.report()
+    assert report["skipped"] == 0 and report["audited"] > 0
+    assert report["estimated_recall"] < 1
+    threshold = evaluator.prefilter.suggested_threshold()
+
+    evaluator = RAGChecker(
+        joint_check=False, prefilter="bm25", prefilter_threshold=threshold, prefilter_audit_rate=0
+    )
+    metrics = evaluator.evaluate(results)
+
+    assert evaluator.prefilter.report()["skipped"] > 0
+    assert evaluator.stats["checker_requests"] < num_requests
+    assert metrics == expected
+    for result, expected_result in zip(results.results, baseline.results):
+        assert result.retrieved2response == expected_result.retrieved2response
+        assert result.retrieved2answer == expected_result.retrieved2answer
@@ -0,0 +1,72 @@
+from ragchecker import RAGChecker
+from ragchecker.prefix_cache import PrefixScheduler, prefix_order, shared_prefix_chars
+
+from .stub_refchecker import respond
+
+
+class RecordingLLM:
+    """Stub LLM API function recording the batches of prompts it receives."""
+    def __init__(self, fail=lambda prompt: False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, prompts, **kwargs):
+        self.batches.append(list(prompts))
+        if any(self.fail(prompt) for prompt in prompts):
+            return None
+        return [respond(prompt) for prompt in prompts]
+
+
+def test_prompts_sent_in_prefix_order_and_responses_restored():
+    prompts = ["b shared 2", "a 1", "b shared 1", "a 2"]
+    scheduler = PrefixScheduler(lambda batch: [prompt.upper() for prompt in batch])
+
+    assert prefix_order(prompts) == [1, 3, 2, 0]
+    assert scheduler(prompts) == [prompt.upper() for prompt in prompts]
+    report = scheduler.report()
+    assert report["prompts"] == 4
+    assert report["shared_prefix"] == round(shared_prefix_chars(sorted(prompts)) / sum(map(len, prompts)), 3)
+
+
+def test_failed_call_returns_none():
+    scheduler = PrefixScheduler(lambda batch: None)
+    assert scheduler(["a", "b"]) is None
+
+
+def test_checker_items_ordered_by_question_and_reference(results):
+    expected = RAGChecker().evaluate(results)
+    for result in results.results:
+        result.answer2response = result.response2answer = None
+        result.retrieved2response = result.retrieved2answer = None
+    llm = RecordingLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm, prefix_cache_ordering=True)
+    dispatched = []
+    dispatch = evaluator._dispatch_checker
+
+    def record_dispatch(claims, references, questions, merge_psg):
+        dispatched.append(list(zip(questions, references)))
+        return dispatch(claims, references, questions, merge_psg)
+
+    evaluator._dispatch_checker = record_dispatch
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == expected
+    assert dispatched
+    for items in dispatched:
+        assert items == sorted(items)
+    checker_batches = [batch for batch in llm.batches if "### Reference:" in batch[0]]
+    assert checker_batches
+    for batch in checker_batches:
+        assert batch == sorted(batch)
+
+
+def test_packed_checking_falls_back_when_a_scheduled_call_fails(results):
+    expected = RAGChecker().evaluate(results)
+    for result in results.results:
+        result.retrieved2response = result.retrieved2answer = None
+    llm = RecordingLLM(fail=lambda prompt: "### Passages:" in prompt)
+
+    evaluator = RAGChecker(custom_llm_api_func=llm, prefix_cache_ordering=True, packed_checking=True)
+
+    assert evaluator.evaluate(results) == expected
+    assert evaluator.stats["packed_fallback_pairs"] == evaluator.stats["packed_pairs"] > 0
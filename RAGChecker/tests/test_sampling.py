@@ -0,0 +1,48 @@
+import pytest
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.llm_executor import AsyncLLMExecutor, estimate_tokens
+from ragchecker.sampling import evaluate_adaptive
+
+from .conftest import CountingLLM, make_result
+from .stub_refchecker import respond
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"joint_check": False}, {"packed_checking": True}])
+def test_max_requests_counts_llm_prompts(kwargs):
+    results = RAGResults(results=[make_result(i) for i in range(200)])
+    llm = CountingLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm, **kwargs)
+    max_requests = 1000
+
+    report = evaluate_adaptive(evaluator, results, ci_half_width=0, batch_size=20, max_requests=max_requests)
+
+    assert report["stop_reason"] == "max_requests"
+    assert report["num_requests"] == llm.num_prompts
+    # the last batch may take at most one result more than the budget pays for
+    per_result = llm.num_prompts / report["sample_size"]
+    assert max_requests <= llm.num_prompts <= max_requests + 2 * per_result
+
+
+def test_max_tokens_counts_executor_tokens(monkeypatch):
+    async def complete(self, messages, max_new_tokens):
+        prompt = messages[0]["content"]
+        response = respond(prompt)
+        return response, estimate_tokens(prompt) + estimate_tokens(response)
+
+    monkeypatch.setattr(AsyncLLMExecutor, "_litellm", complete)
+    results = RAGResults(results=[make_result(i) for i in range(200)])
+    max_tokens = 50000
+
+    with RAGChecker(async_llm=True) as evaluator:
+        report = evaluate_adaptive(evaluator, results, ci_half_width=0, batch_size=20, max_tokens=max_tokens)
+        assert report["num_tokens"] == sum(executor.counts["tokens"] for executor in evaluator.llm_executors.values())
+
+    assert report["stop_reason"] == "max_tokens"
+    per_result = report["num_tokens"] / report["sample_size"]
+    assert max_tokens <= report["num_tokens"] <= max_tokens + 2 * per_result
+
+
+def test_max_tokens_requires_async_llm(results):
+    with pytest.raises(ValueError):
+        evaluate_adaptive(RAGChecker(), results, max_tokens=1000)
@@ -0,0 +1,71 @@
+import copy
+import json
+import os
+
+import pytest
+
+from ragchecker import RAGChecker, RAGResults, sharding
+
+
+def as_dicts(results):
+    # the metrics of a result are in the order of a set of names, which differs across processes
+    return [json.loads(result.to_json()) for result in results.results]
+
+
+@pytest.fixture
+def stub_in_workers(tmp_path, monkeypatch):
+    """Make the spawned worker processes import the stub as refchecker, they inherit sys.path."""
+    shim = tmp_path / "shim" / "refchecker"
+    shim.mkdir(parents=True)
+    (shim / "__init__.py").write_text("from tests.stub_refchecker import install\n\ninstall()\n")
+    monkeypatch.syspath_prepend(str(shim.parent))
+    monkeypatch.syspath_prepend(os.path.dirname(os.path.dirname(__file__)))
+
+
+def test_sharded_evaluation_matches_one_process(results, tmp_path, stub_in_workers):
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker().evaluate(baseline)
+    save_path = str(tmp_path / "output.json")
+
+    metrics = sharding.evaluate_sharded({}, results, workers=2, shards_per_worker=2, save_path=save_path)
+
+    assert metrics == expected
+    assert as_dicts(results) == as_dicts(baseline)
+    with open(save_path) as f:
+        assert RAGResults.from_json(f.read()).metrics == expected
+    assert not any(".shard" in name for name in os.listdir(tmp_path))
+
+
+def test_resume_reuses_finished_shards(results, tmp_path, stub_in_workers, monkeypatch):
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker().evaluate(baseline)
+    save_path = str(tmp_path / "output.json")
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("crash before the merge")
+
+    with monkeypatch.context() as m:
+        m.setattr(sharding, "aggregate_metrics", crash)
+        with pytest.raises(RuntimeError):
+            sharding.evaluate_sharded({}, copy.deepcopy(results), workers=2, shards_per_worker=2, save_path=save_path)
+    shards = [k for k, indices in enumerate(sharding.shard_results(results, 4)) if indices]
+    assert all(os.path.exists(sharding.shard_path(save_path, k)) for k in shards)
+    os.remove(sharding.shard_path(save_path, shards[0]))
+
+    reused = []
+    load_shard = sharding._load_shard
+
+    def recording_load_shard(path, shard, shard_results):
+        evaluated = load_shard(path, shard, shard_results)
+        if evaluated is not None:
+            reused.append(shard)
+        return evaluated
+
+    monkeypatch.setattr(sharding, "_load_shard", recording_load_shard)
+    metrics = sharding.evaluate_sharded(
+        {}, results, workers=2, shards_per_worker=2, save_path=save_path, resume=True
+    )
+
+    assert reused == shards[1:]
+    assert metrics == expected
+    assert as_dicts(results) == as_dicts(baseline)
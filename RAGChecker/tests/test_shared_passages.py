@@ -0,0 +1,50 @@
+import copy
+import json
+import os
+
+import pytest
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.container import PassageTable, RetrievedDoc
+from ragchecker.jsonl import load_results
+
+from .conftest import make_result
+
+
+def results_sharing_passages():
+    """Results retrieving the passages of 4 distinct results each."""
+    results = [make_result(i % 4) for i in range(12)]
+    for i, result in enumerate(results):
+        result.query_id = str(i)
+    return RAGResults(results=results)
+
+
+def test_intern_keys_passages_by_doc_id_and_text():
+    table = PassageTable()
+    doc = table.intern(RetrievedDoc(doc_id="a", text="x"))
+    assert table.intern(RetrievedDoc(doc_id="a", text="x")) is doc
+    assert table.intern(RetrievedDoc(doc_id="a", text="y")) is not doc
+    assert table.intern(RetrievedDoc(doc_id=None, text="x")) is not doc
+    assert len(table) == 3
+
+
+@pytest.mark.parametrize("file_name", ["output.json", "output.jsonl"])
+def test_shared_passages_output_matches_the_baseline(tmp_path, file_name):
+    results = results_sharing_passages()
+    baseline = copy.deepcopy(results)
+    plain_path, shared_path = str(tmp_path / f"plain.{file_name}"), str(tmp_path / file_name)
+    RAGChecker().evaluate(baseline, save_path=plain_path)
+
+    RAGChecker(shared_passages=True).evaluate(results, save_path=shared_path)
+
+    assert os.path.getsize(shared_path) < os.path.getsize(plain_path)
+    if file_name.endswith(".json"):
+        with open(shared_path) as f:
+            assert len(json.load(f)["passages"]) == 12
+    loaded = load_results(shared_path)
+    assert [json.loads(result.to_json()) for result in loaded.results] == \
+        [json.loads(result.to_json()) for result in baseline.results]
+    # results retrieving the same passage share one object
+    for i, result in enumerate(loaded.results[4:], start=4):
+        for doc, same_doc in zip(result.retrieved_context, loaded.results[i % 4].retrieved_context):
+            assert doc is same_doc
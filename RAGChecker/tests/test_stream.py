@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.jsonl import iter_results, metrics_path, save_results
+
+from .conftest import make_result
+
+
+@pytest.fixture
+def input_path(tmp_path):
+    path = str(tmp_path / "input.jsonl")
+    save_results(RAGResults(results=[make_result(i) for i in range(10)]), path)
+    return path
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_stream_matches_evaluate(input_path, tmp_path):
+    output_path = str(tmp_path / "output.jsonl")
+    metrics = RAGChecker().evaluate_stream(input_path, output_path, window_size=3)
+
+    results = RAGResults(results=list(iter_results(input_path)))
+    assert metrics == RAGChecker().evaluate(results)
+    assert [r.metrics for r in iter_results(output_path)] == [r.metrics for r in results.results]
+    with open(metrics_path(output_path)) as f:
+        assert json.load(f) == metrics
+
+
+def test_stream_resume(input_path, tmp_path, monkeypatch):
+    expected_path = str(tmp_path / "expected.jsonl")
+    expected_metrics = RAGChecker().evaluate_stream(input_path, expected_path, window_size=3)
+
+    output_path = str(tmp_path / "output.jsonl")
+    partial_path = str(tmp_path / "output.partial.jsonl")
+    evaluate = RAGChecker.evaluate
+    evaluated = []
+
+    def crash_after_two_windows(self, results, **kwargs):
+        if len(evaluated) == 2:
+            raise RuntimeError("crash")
+        evaluated.append(len(results.results))
+        return evaluate(self, results, **kwargs)
+
+    monkeypatch.setattr(RAGChecker, "evaluate", crash_after_two_windows)
+    with pytest.raises(RuntimeError):
+        RAGChecker().evaluate_stream(input_path, output_path, window_size=3)
+    assert len(read_lines(partial_path)) == 6
+    # a record cut in the middle by the crash
+    with open(partial_path, "a", encoding="utf-8") as f:
+        f.write(read_lines(expected_path)[6][:40])
+
+    evaluated.clear()
+    monkeypatch.setattr(RAGChecker, "evaluate", lambda self, results, **kwargs: (
+        evaluated.append(len(results.results)), evaluate(self, results, **kwargs)
+    )[1])
+    metrics = RAGChecker().evaluate_stream(input_path, output_path, window_size=3, resume=True)
+
+    # only the results after the complete records are evaluated again
+    assert evaluated == [3, 1]
+    assert metrics == expected_metrics
+    assert read_lines(output_path) == read_lines(expected_path)
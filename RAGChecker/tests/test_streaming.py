@@ -0,0 +1,40 @@
+import copy
+import threading
+import time
+
+from ragchecker import RAGChecker
+
+from .stub_refchecker import respond
+
+
+class OrderLLM:
+    """Stub LLM API function recording whether each call extracts or checks claims, slowing down extraction."""
+    def __init__(self, extract_delay=0.01):
+        self.extract_delay = extract_delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompts, **kwargs):
+        extract = any("### Text:" in prompt for prompt in prompts)
+        with self._lock:
+            self.calls.append("extract" if extract else "check")
+        if extract:
+            time.sleep(self.extract_delay)
+        return [respond(prompt) for prompt in prompts]
+
+
+def test_streaming_matches_extracting_first(results):
+    baseline = copy.deepcopy(results)
+    expected = RAGChecker().evaluate(baseline)
+    llm = OrderLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm, streaming=True, batch_size_extractor=2, queue_size=2)
+
+    metrics = evaluator.evaluate(results)
+
+    assert metrics == expected
+    # checking starts before the last extraction batch
+    assert llm.calls.index("check") < len(llm.calls) - 1 - llm.calls[::-1].index("extract")
+    for result, expected_result in zip(results.results, baseline.results):
+        assert result.response_claims == expected_result.response_claims
+        for check_type in ["answer2response", "response2answer", "retrieved2response", "retrieved2answer"]:
+            assert getattr(result, check_type) == getattr(expected_result, check_type)
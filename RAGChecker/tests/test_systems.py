@@ -0,0 +1,62 @@
+import copy
+import json
+import os
+
+from ragchecker import RAGChecker, RAGResults
+from ragchecker.systems import evaluate_systems, load_systems, metrics_table
+
+from .conftest import CountingLLM, make_result
+
+
+def system_results(edit_odd_responses: bool) -> RAGResults:
+    """Results of a system on the queries of `make_result`, with the same retrieval for every system."""
+    results = [make_result(i) for i in range(12)]
+    if edit_odd_responses:
+        for result in results[1::2]:
+            result.response = "Oslo is a capital."
+    return RAGResults(results=results)
+
+
+def test_systems_share_identical_work(tmp_path):
+    systems = {"a": system_results(False), "b": system_results(True)}
+    separate = copy.deepcopy(systems)
+    separate_llm = CountingLLM()
+    expected = {
+        name: RAGChecker(custom_llm_api_func=separate_llm).evaluate(results) for name, results in separate.items()
+    }
+
+    llm = CountingLLM()
+    evaluator = RAGChecker(custom_llm_api_func=llm)
+    system_metrics = evaluate_systems(evaluator, systems, output_dir=str(tmp_path))
+
+    assert system_metrics == expected
+    for name, results in systems.items():
+        assert [json.loads(result.to_json()) for result in results.results] == \
+            [json.loads(result.to_json()) for result in separate[name].results]
+    assert 0 < llm.num_prompts < separate_llm.num_prompts
+    assert evaluator.stats["shared_gt_answer_claims"] == 12
+    assert evaluator.stats["shared_response_claims"] == 6
+    assert evaluator.stats["shared_retrieved2answer"] == 12
+
+    loaded = load_systems([os.path.join(tmp_path, "a.json"), os.path.join(tmp_path, "b.json")])
+    assert {name: results.metrics for name, results in loaded.items()} == expected
+    with open(os.path.join(tmp_path, "metrics.json")) as f:
+        assert json.load(f) == expected
+
+
+def test_metrics_table_has_a_column_per_system():
+    system_metrics = {
+        "bm25": {"overall_metrics": {"precision": 52.5, "f1": 44.6}, "generator_metrics": {}},
+        "dense_retriever": {"overall_metrics": {"precision": 60.0}, "generator_metrics": {"faithfulness": 75.0}},
+    }
+
+    lines = metrics_table(system_metrics).splitlines()
+
+    assert lines[0].split() == ["metric", "bm25", "dense_retriever"]
+    assert set(lines[1]) == {"-", " "}
+    assert [line.split() for line in lines[2:]] == [
+        ["precision", "52.5", "60.0"],
+        ["f1", "44.6", "-"],
+        ["faithfulness", "-", "75.0"],
+    ]
+    assert len({len(line) for line in lines}) == 1
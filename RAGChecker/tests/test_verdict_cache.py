@@ -0,0 +1,55 @@
+import copy
+
+from ragchecker import RAGChecker
+from ragchecker.cache import SQLiteCache, verdict_cache_key
+
+
+def clear_checks(results):
+    for result in results.results:
+        result.answer2response = result.response2answer = None
+        result.retrieved2response = result.retrieved2answer = None
+
+
+def test_cached_verdicts_match_the_checker(results, tmp_path):
+    baseline = copy.deepcopy(results)
+    RAGChecker().evaluate(baseline)
+
+    first = RAGChecker(cache_dir=str(tmp_path))
+    first.evaluate(results)
+    assert first.stats["checker_requests"] > 0
+    clear_checks(results)
+    second = RAGChecker(cache_dir=str(tmp_path))
+    metrics = second.evaluate(results)
+
+    assert second.stats["checker_requests"] == 0
+    assert metrics == baseline.metrics
+    for result, expected in zip(results.results, baseline.results):
+        assert result.retrieved2response == expected.retrieved2response
+        assert result.answer2response == expected.answer2response
+
+
+def test_verdicts_are_keyed_by_question(results, tmp_path):
+    RAGChecker(cache_dir=str(tmp_path)).evaluate(results, metrics=["precision"])
+    clear_checks(results)
+    for result in results.results:
+        result.query = "Another question?"
+    evaluator = RAGChecker(cache_dir=str(tmp_path))
+    evaluator.evaluate(results, metrics=["precision"])
+    assert evaluator.stats["checker_requests"] > 0
+
+    key = verdict_cache_key("m", "Question?", ["a", "b", "c"], "passage", True, True, 5)
+    assert key == verdict_cache_key("m", " Question? ", ["a", "b", "c"], "passage", True, True, 5)
+    assert key != verdict_cache_key("m", "Other?", ["a", "b", "c"], "passage", True, True, 5)
+
+
+def test_cache_size_is_kept_across_writers(tmp_path):
+    cache = SQLiteCache(str(tmp_path), "verdicts", max_entries=5)
+    other = SQLiteCache(str(tmp_path), "verdicts", max_entries=5)
+    cache.set_many({"a": 1, "b": 2})
+    other.set_many({"b": 3, "c": 4})
+    assert len(cache) == len(other) == 3
+    assert cache.get_many(["b"]) == {"b": 3}
+    other.set_many({f"k{i}": i for i in range(4)})
+    assert len(cache) == 5
+    count = cache._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+    assert count == 5
@@ -0,0 +1,47 @@
+import threading
+
+from ragchecker import RAGChecker
+from ragchecker.work_queue import WorkQueue, run_worker
+
+
+def test_workers_match_evaluate(results, tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    WorkQueue(path).submit(results, batch_size=4)
+    workers = [
+        threading.Thread(target=run_worker, args=(WorkQueue(path), RAGChecker(), f"worker-{k}", 0.05))
+        for k in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    merged = WorkQueue(path).merge()
+    assert merged.metrics == RAGChecker().evaluate(results)
+
+
+def test_checks_wait_for_extraction(results, tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60)
+    queue.submit(results, metrics=["precision"], batch_size=len(results.results))
+
+    batch_id, kind, target, leased = queue.lease("worker")
+    assert (kind, target) == ("extract", "response")
+    # the check batch waits on the extraction of the response claims
+    assert queue.lease("other") is None
+
+    RAGChecker().extract_claims(leased, extract_type="response")
+    extracted = [r.response_claims for r in leased]
+    assert queue.complete(batch_id, kind, target, leased)
+    _, kind, target, leased = queue.lease("other")
+    assert (kind, target) == ("check", "answer2response")
+    assert [r.response_claims for r in leased] == extracted
+
+
+def test_expired_lease_is_reissued(results, tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0)
+    queue.submit(results, metrics=["precision"], batch_size=len(results.results))
+    first = queue.lease("dead")
+    second = queue.lease("alive")
+    assert first[0] == second[0]
+    assert queue.complete(*second)
+    assert not queue.complete(*first)